@@ -0,0 +1,50 @@
+"""Endpoint для получения эмбеддингов"""
+from fastapi import APIRouter, HTTPException, Depends
+from api.schemas import EmbedRequest, EmbedResponse
+from api.dependencies import verify_api_key
+from services.embeddings import embedding_service
+import asyncio
+import base64
+import time
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/embed", response_model=EmbedResponse)
+async def embed_texts(
+    request: EmbedRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Батчевое кодирование текстов общей моделью схожести"""
+    try:
+        start_time = time.time()
+
+        vectors = await asyncio.to_thread(embedding_service.encode, request.texts)
+        vectors = vectors.astype(request.dtype)
+
+        if request.encoding == "base64":
+            # Little-endian байты каждого вектора: в JSON в разы компактнее списка чисел
+            embeddings = [
+                base64.b64encode(vector.astype(vector.dtype.newbyteorder('<')).tobytes()).decode("ascii")
+                for vector in vectors
+            ]
+        else:
+            embeddings = vectors.tolist()
+
+        processing_time = time.time() - start_time
+
+        return EmbedResponse(
+            embeddings=embeddings,
+            dimension=int(vectors.shape[1]),
+            dtype=request.dtype,
+            encoding=request.encoding,
+            processing_time=round(processing_time, 3)
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при получении эмбеддингов: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при получении эмбеддингов: {str(e)}"
+        )
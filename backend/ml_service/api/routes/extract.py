@@ -0,0 +1,31 @@
+"""Endpoint для извлечения статьи из URL (текст, заголовок, изображение, дата, язык)"""
+from fastapi import APIRouter, HTTPException, Depends
+from api.schemas import ExtractRequest, ExtractResponse
+from api.dependencies import verify_api_key
+from services.content_extractor import ContentExtractor
+import time
+
+router = APIRouter()
+content_extractor = ContentExtractor()
+
+
+@router.post("/extract", response_model=ExtractResponse)
+async def extract_article(
+    request: ExtractRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Загрузка страницы (через кэш страниц) и извлечение статьи за один разбор HTML"""
+    try:
+        start_time = time.time()
+
+        extracted = await content_extractor.extract_from_url(str(request.url))
+
+        return ExtractResponse(
+            **extracted,
+            processing_time=time.time() - start_time
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка извлечения: {str(e)}")
@@ -1,33 +1,83 @@
-"""Health check endpoint"""
+"""Health check endpoints"""
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from api.schemas import HealthResponse
 from config import settings
+from services.cpu_threads import cpu_threads
+from services.model_registry import model_registry, LOADING, FAILED, READY
 
 router = APIRouter()
 
+# Модели, без которых сервис не обслуживает основные запросы
+CORE_MODELS = ("paraphrase_ru", "summary_ru")
+
+
+def _is_ready(stats: dict) -> bool:
+    """Готов ли сервис принимать трафик
+
+    Без предзагрузки модели загружаются первым запросом, поэтому сервис
+    готов сразу после старта. С PRELOAD_MODELS=true - после загрузки
+    хотя бы одной основной модели.
+    """
+    if not stats["startup_complete"]:
+        return False
+    if not settings.preload_models:
+        return True
+    return any(stats["models"].get(name, {}).get("state") == READY for name in CORE_MODELS)
+
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Проверка состояния сервиса"""
-    from services.text_processor import TextProcessor
-    
-    # Проверяем состояние моделей
-    processor = TextProcessor()
-    models_status = {
-        "paraphrase_ru": processor.paraphrase_model_ru is not None,
-        "paraphrase_en": processor.paraphrase_model_en is not None,
-        "summary_ru": processor.summary_model_ru is not None,
-    }
-    
-    # Сервис здоров если хотя бы основные модели загружены
-    is_ready = models_status["paraphrase_ru"] or models_status["summary_ru"]
-    
+    """Проверка состояния сервиса (читает реестр моделей, модели не создаются)"""
+    stats = model_registry.stats()
+    models = stats["models"]
+    states = {name: entry["state"] for name, entry in models.items()}
+
+    models_status = {name: states.get(name) == READY for name in ("paraphrase_ru", "paraphrase_en", "summary_ru")}
+    is_loaded = any(models_status[name] for name in CORE_MODELS)
+
+    if is_loaded:
+        status = "ready"
+    elif LOADING in states.values():
+        status = "loading"
+    elif any(states.get(name) == FAILED for name in CORE_MODELS):
+        status = "error"
+    else:
+        status = "idle"  # Модели ещё не запрашивались (lazy loading)
+
     return HealthResponse(
-        status="ready" if is_ready else "loading",
-        model_loaded=is_ready,
+        status=status,
+        model_loaded=is_loaded,
         cache_enabled=settings.cache_enabled,
         model_name=settings.ml_model_name,
         version="1.0.0",
-        models_status=models_status  # Детальная информация о моделях
+        models_status=models_status,
+        models=models,
+        queue_depth=stats["queue_depth"],
+        inference=stats["inference"],
+        uptime_seconds=stats["uptime_seconds"],
+        threads=cpu_threads.effective()
     )
 
+
+@router.get("/health/live")
+async def liveness():
+    """Liveness: процесс жив и event loop отвечает"""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Readiness: сервис готов принимать запросы (503, пока нет)"""
+    stats = model_registry.stats()
+    ready = _is_ready(stats)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "startup_complete": stats["startup_complete"],
+            "preload_models": settings.preload_models,
+            "models": {name: entry["state"] for name, entry in stats["models"].items()},
+            "queue_depth": stats["queue_depth"]
+        }
+    )
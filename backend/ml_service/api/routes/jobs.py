@@ -0,0 +1,102 @@
+"""Endpoint для фоновых задач (длинная суммаризация и обработка)"""
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from api.schemas import JobCreateRequest, JobResponse, SummarizeRequest, ProcessRequest
+from api.dependencies import verify_api_key
+from api.routes.summarize import summarize_text
+from api.routes.process import process_news
+from api.routes.summarize_url import summarize_from_url, SummarizeUrlRequest
+from services.job_queue import job_queue, job_workers, check_webhook_url
+from config import settings
+import asyncio
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def _run_summarize(payload: dict) -> dict:
+    return jsonable_encoder(await summarize_text(SummarizeRequest(**payload), api_key=None))
+
+
+async def _run_process(payload: dict) -> dict:
+    return jsonable_encoder(await process_news(ProcessRequest(**payload), api_key=None))
+
+
+async def _run_summarize_url(payload: dict) -> dict:
+    return jsonable_encoder(await summarize_from_url(SummarizeUrlRequest(**payload)))
+
+
+# Тип задачи -> (схема payload, обработчик). Обработчики вызывают те же
+# функции, что и синхронные endpoints, поэтому результат задачи совпадает
+# с ответом соответствующего endpoint
+JOB_TYPES = {
+    "summarize": (SummarizeRequest, _run_summarize),
+    "process": (ProcessRequest, _run_process),
+    "summarize_url": (SummarizeUrlRequest, _run_summarize_url),
+}
+
+for _job_type, (_schema, _handler) in JOB_TYPES.items():
+    job_workers.register(_job_type, _handler)
+
+
+def _to_response(job: dict) -> JobResponse:
+    return JobResponse(
+        job_id=job["id"],
+        type=job["type"],
+        status=job["status"],
+        result=job.get("result"),
+        error=job.get("error"),
+        attempts=job["attempts"],
+        created_at=job["created_at"],
+        started_at=job.get("started_at"),
+        finished_at=job.get("finished_at")
+    )
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    request: JobCreateRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Постановка задачи в очередь: сразу возвращает id, результат - через GET или webhook"""
+    if not settings.jobs_enabled:
+        raise HTTPException(status_code=503, detail="Фоновые задачи отключены")
+
+    schema, _ = JOB_TYPES[request.type]
+    try:
+        # Проверяем payload сразу, чтобы не ставить в очередь заведомо ошибочную задачу
+        payload = jsonable_encoder(schema(**request.payload))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=jsonable_encoder(e.errors()))
+
+    webhook_url = str(request.webhook_url) if request.webhook_url else None
+    if webhook_url:
+        try:
+            await asyncio.to_thread(check_webhook_url, webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        job_id = job_queue.submit(request.type, payload, webhook_url)
+        job_workers.notify()
+        return _to_response(job_queue.get(job_id))
+    except Exception as e:
+        logger.error(f"Ошибка при постановке задачи: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при постановке задачи: {str(e)}"
+        )
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Статус и результат задачи"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Задача {job_id} не найдена")
+    return _to_response(job)
@@ -0,0 +1,11 @@
+"""Endpoint с метриками сервиса"""
+from fastapi import APIRouter
+from services.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Счётчики, наблюдения и статистика кэшей/пулов"""
+    return metrics.snapshot()
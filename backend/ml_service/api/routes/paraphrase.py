@@ -2,11 +2,16 @@
 from fastapi import APIRouter, HTTPException, Depends
 from api.schemas import ParaphraseRequest, ParaphraseResponse
 from api.dependencies import verify_api_key
-from services.text_processor import TextProcessor
+from services.text_processor import get_text_processor
+from services.semantic_cache import semantic_cache
+from config import settings
+import asyncio
 import time
+import logging
 
 router = APIRouter()
-text_processor = TextProcessor()
+text_processor = get_text_processor()
+logger = logging.getLogger(__name__)
 
 
 @router.post("/paraphrase", response_model=ParaphraseResponse)
@@ -18,15 +23,33 @@ async def paraphrase_text(
     try:
         start_time = time.time()
         
-        # TODO: Реальная обработка через модель
-        # Пока заглушка
-        paraphrased = await text_processor.paraphrase(
-            text=request.text,
-            max_length=request.max_length,
-            temperature=request.temperature,
-            top_p=request.top_p,
-            num_beams=request.num_beams
+        # Почти совпадающий по смыслу текст уже парафразировался - берём его результат
+        # Ключ - все параметры генерации: результат с другими параметрами не подходит
+        namespace = (
+            f"paraphrase:{request.max_length}:{request.num_beams}:"
+            f"{request.temperature}:{request.top_p}"
         )
+        vector = await asyncio.to_thread(semantic_cache.embed, request.text) if settings.semantic_cache_enabled else None
+        semantic_hit = semantic_cache.lookup(namespace, vector)
+        if semantic_hit:
+            paraphrased = semantic_hit[0]
+        else:
+            # В кэш попадает только результат модели, заглушка не кэшируется
+            try:
+                paraphrased = await text_processor.paraphrase(
+                    text=request.text,
+                    max_length=request.max_length,
+                    temperature=request.temperature,
+                    top_p=request.top_p,
+                    num_beams=request.num_beams,
+                    source=request.source_url,
+                    fallback=False
+                )
+            except Exception as e:
+                logger.warning(f"Парафраз моделью не удался, возвращается заглушка: {e}")
+                paraphrased = text_processor.paraphrase_stub(request.text)
+            else:
+                semantic_cache.add(namespace, vector, paraphrased)
         
         # Проверка схожести
         similarity_score = await text_processor.check_similarity(
@@ -41,7 +64,9 @@ async def paraphrase_text(
             original=request.text,
             similarity_score=similarity_score,
             processing_time=round(processing_time, 2),
-            cached=False
+            cached=bool(semantic_hit),
+            semantic_hit=bool(semantic_hit),
+            semantic_similarity=round(semantic_hit[1], 4) if semantic_hit else None
         )
     except Exception as e:
         raise HTTPException(
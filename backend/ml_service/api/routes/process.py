@@ -3,12 +3,14 @@ from fastapi import APIRouter, HTTPException, Depends
 from api.schemas import ProcessRequest, ProcessResponse
 from api.dependencies import verify_api_key
 from services.content_extractor import ContentExtractor
-from services.text_processor import TextProcessor
+from services.text_processor import get_text_processor
+from services.platform_variants import build_platform_variants
+from config import settings
 import time
 
 router = APIRouter()
 content_extractor = ContentExtractor()
-text_processor = TextProcessor()
+text_processor = get_text_processor()
 
 
 @router.post("/process", response_model=ProcessResponse)
@@ -65,7 +67,11 @@ async def process_news(
             }
         
         # Шаг 3: Парафразирование
-        paraphrased = await text_processor.paraphrase(text_to_paraphrase)
+        paraphrased = await text_processor.paraphrase(
+            text_to_paraphrase,
+            temperature=settings.ml_temperature if request.temperature is None else request.temperature,
+            source=str(request.url) if request.url else None
+        )
         
         # Проверка схожести
         similarity_score = await text_processor.check_similarity(
@@ -74,21 +80,13 @@ async def process_news(
         )
         
         # Шаг 4: Подготовка вариантов для платформ
-        platform_variants = {}
-        platform_limits = {
-            "telegram": 4096,
-            "vk": 10000,
-            "instagram": 2200
-        }
-        
-        for platform in request.platforms:
-            limit = platform_limits.get(platform, 4096)
-            variant = paraphrased[:limit] if len(paraphrased) > limit else paraphrased
-            platform_variants[platform] = {
-                "text": variant,
-                "length": len(variant),
-                "truncated": len(paraphrased) > limit
-            }
+        # Все варианты строятся из одного парафраза без дополнительных вызовов модели
+        platform_variants = build_platform_variants(
+            paraphrased,
+            request.platforms,
+            summary=summary_data["text"] if summary_data else None,
+            target_lengths=request.target_lengths
+        )
         
         processing_time = time.time() - start_time
         
@@ -1,11 +1,15 @@
 """Endpoint для проверки схожести"""
 from fastapi import APIRouter, HTTPException, Depends
-from api.schemas import SimilarityRequest, SimilarityResponse
+from api.schemas import SimilarityRequest, SimilarityResponse, SimilarityMatrixRequest, SimilarityMatrixResponse
 from api.dependencies import verify_api_key
-from services.text_processor import TextProcessor
+from services.text_processor import get_text_processor
+from services.embeddings import embedding_service
+import numpy as np
+import asyncio
+import time
 
 router = APIRouter()
-text_processor = TextProcessor()
+text_processor = get_text_processor()
 
 
 @router.post("/similarity", response_model=SimilarityResponse)
@@ -31,3 +35,73 @@ async def check_similarity(
             detail=f"Ошибка при проверке схожести: {str(e)}"
         )
 
+
+
+@router.post("/similarity/matrix", response_model=SimilarityMatrixResponse)
+async def similarity_matrix(
+    request: SimilarityMatrixRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Матрица косинусной схожести для одного или двух списков текстов
+
+    Каждый уникальный текст кодируется один раз, матрица считается одним
+    matmul нормированных векторов.
+    """
+    try:
+        start_time = time.time()
+        
+        # Пустой texts_b - это пустой список столбцов, а не сравнение texts между собой
+        self_comparison = request.texts_b is None
+        texts_b = request.texts if self_comparison else request.texts_b
+        unique_texts = list(dict.fromkeys(request.texts + texts_b))
+        positions = {text: i for i, text in enumerate(unique_texts)}
+        vectors = await asyncio.to_thread(embedding_service.encode, unique_texts)
+        
+        rows = vectors[[positions[text] for text in request.texts]]
+        cols = vectors[[positions[text] for text in texts_b]]
+        matrix = rows @ cols.T
+        
+        if self_comparison:
+            # Текст всегда похож сам на себя - исключаем диагональ из top-k и пар
+            np.fill_diagonal(matrix, -np.inf)
+        
+        response = {"shape": list(matrix.shape)}
+        
+        if request.top_k:
+            k = min(request.top_k, matrix.shape[1] - (1 if self_comparison else 0))
+            if k > 0:
+                top = np.argpartition(-matrix, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(matrix, top, axis=1)
+                order = np.argsort(-top_scores, axis=1)
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+                response["top_k"] = [
+                    [{"index": int(j), "score": round(float(score), 4)} for j, score in zip(row, row_scores)]
+                    for row, row_scores in zip(top, top_scores)
+                ]
+            else:
+                response["top_k"] = [[] for _ in range(matrix.shape[0])]
+        
+        if request.threshold is not None:
+            candidates = matrix >= request.threshold
+            if self_comparison:
+                # Матрица симметрична - достаточно пар i < j
+                candidates = np.triu(candidates, k=1)
+            i_idx, j_idx = np.nonzero(candidates)
+            response["pairs"] = [
+                {"i": int(i), "j": int(j), "score": round(float(matrix[i, j]), 4)}
+                for i, j in zip(i_idx, j_idx)
+            ]
+        
+        if not request.top_k and request.threshold is None:
+            if self_comparison:
+                np.fill_diagonal(matrix, 1.0)
+            response["matrix"] = np.round(matrix.astype(np.float64), 4).tolist()
+        
+        response["processing_time"] = round(time.time() - start_time, 3)
+        return SimilarityMatrixResponse(**response)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при вычислении матрицы схожести: {str(e)}"
+        )
@@ -0,0 +1,76 @@
+"""Endpoint для поиска дубликатов и кластеризации сюжетов"""
+from fastapi import APIRouter, HTTPException, Depends
+from api.schemas import StoryCheckRequest, StoryCheckResponse, StoryAssignRequest, StoryAssignResponse
+from api.dependencies import verify_api_key
+from services.embeddings import embedding_service
+from services.story_index import story_index
+from config import settings
+import asyncio
+import time
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/stories/check", response_model=StoryCheckResponse)
+async def check_story(
+    request: StoryCheckRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Есть ли среди статей за последние N дней дубликат этой"""
+    try:
+        start_time = time.time()
+        threshold = request.threshold if request.threshold is not None else settings.story_duplicate_threshold
+        
+        vector = (await asyncio.to_thread(embedding_service.encode, [request.text]))[0]
+        matches = story_index.search(vector, k=request.top_k, days=request.days or settings.story_duplicate_days)
+        
+        return StoryCheckResponse(
+            is_duplicate=bool(matches) and matches[0]["score"] >= threshold,
+            matches=matches,
+            threshold=threshold,
+            processing_time=round(time.time() - start_time, 3)
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при проверке дубликата: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при проверке дубликата: {str(e)}"
+        )
+
+
+@router.post("/stories/assign", response_model=StoryAssignResponse)
+async def assign_story(
+    request: StoryAssignRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Добавление статьи в индекс и назначение кластера сюжета"""
+    try:
+        start_time = time.time()
+        
+        vector = (await asyncio.to_thread(embedding_service.encode, [request.text]))[0]
+        result = story_index.assign(
+            request.id,
+            vector,
+            threshold=request.threshold if request.threshold is not None else settings.story_duplicate_threshold,
+            days=request.days or settings.story_duplicate_days,
+            timestamp=request.timestamp
+        )
+        
+        return StoryAssignResponse(**result, processing_time=round(time.time() - start_time, 3))
+    except Exception as e:
+        logger.error(f"Ошибка при добавлении статьи в индекс: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при добавлении статьи в индекс: {str(e)}"
+        )
+
+
+@router.get("/stories/clusters/{cluster_id}")
+async def get_cluster(
+    cluster_id: int,
+    api_key: str = Depends(verify_api_key)
+):
+    """Статьи кластера сюжета"""
+    return {"cluster_id": cluster_id, "members": story_index.cluster_members(cluster_id)}
@@ -2,12 +2,15 @@
 from fastapi import APIRouter, HTTPException, Depends
 from api.schemas import SummarizeRequest, SummarizeResponse
 from api.dependencies import verify_api_key
-from services.text_processor import TextProcessor
+from services.text_processor import get_text_processor
+from services.semantic_cache import semantic_cache
+from config import settings
+import asyncio
 import time
 import logging
 
 router = APIRouter()
-text_processor = TextProcessor()
+text_processor = get_text_processor()
 logger = logging.getLogger(__name__)
 
 
@@ -23,12 +26,35 @@ async def summarize_text(
         
         logger.info(f"Начало суммаризации текста длиной {original_length} символов")
         
-        # Реальная суммаризация через модель
-        summary = await text_processor.summarize(
-            text=request.text,
-            target_length=request.target_length,
-            language=request.language
-        )
+        semantic_hit = None
+        if request.mode == "extractive":
+            # Быстрый режим без модели: отбор самых информативных предложений
+            summary = text_processor.summarize_extractive(
+                text=request.text,
+                target_length=request.target_length
+            )
+        else:
+            # Почти совпадающий по смыслу текст уже суммаризировался - берём его результат
+            namespace = f"summary:{request.language}:{request.target_length}"
+            vector = await asyncio.to_thread(semantic_cache.embed, request.text) if settings.semantic_cache_enabled else None
+            semantic_hit = semantic_cache.lookup(namespace, vector)
+            if semantic_hit:
+                summary = semantic_hit[0]
+                logger.info(f"Семантический кэш: схожесть {semantic_hit[1]:.3f}")
+            else:
+                # Реальная суммаризация через модель; в кэш попадает только результат модели
+                try:
+                    summary = await text_processor.summarize(
+                        text=request.text,
+                        target_length=request.target_length,
+                        language=request.language,
+                        fallback=False
+                    )
+                except Exception as e:
+                    logger.warning(f"Суммаризация моделью не удалась, возвращается заглушка: {e}")
+                    summary = text_processor.summary_stub(request.text, request.target_length)
+                else:
+                    semantic_cache.add(namespace, vector, summary)
         
         summary_length = len(summary)
         compression_ratio = summary_length / original_length if original_length > 0 else 0
@@ -42,7 +68,9 @@ async def summarize_text(
             summary_length=summary_length,
             compression_ratio=round(compression_ratio, 3),
             processing_time=round(processing_time, 2),
-            cached=False
+            cached=bool(semantic_hit),
+            semantic_hit=bool(semantic_hit),
+            semantic_similarity=round(semantic_hit[1], 4) if semantic_hit else None
         )
     except Exception as e:
         logger.error(f"Ошибка при суммаризации: {str(e)}")
@@ -85,7 +85,7 @@ async def summarize_from_url(request: SummarizeUrlRequest):
     try:
         # Импортируем сервисы
         from services.content_extractor import ContentExtractor
-        from services.text_processor import TextProcessor
+        from services.text_processor import get_text_processor
         
         # Извлекаем контент из URL
         extractor = ContentExtractor()
@@ -106,7 +106,7 @@ async def summarize_from_url(request: SummarizeUrlRequest):
         logger.info(f"Извлечено {original_length} символов. Заголовок: {title}")
         
         # Суммаризация
-        processor = TextProcessor()
+        processor = get_text_processor()
         
         # Определяем язык
         language = processor._detect_language(original_text)
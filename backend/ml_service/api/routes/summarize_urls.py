@@ -0,0 +1,38 @@
+"""Endpoint для пакетной суммаризации статей по списку URL (потоковый NDJSON)"""
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from api.schemas import SummarizeUrlsRequest
+from api.dependencies import verify_api_key
+from config import settings
+from services.text_processor import get_text_processor
+from services.url_batch import summarize_urls
+import json
+
+router = APIRouter()
+text_processor = get_text_processor()
+
+
+@router.post("/summarize-urls")
+async def summarize_urls_stream(
+    request: SummarizeUrlsRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Пакетная суммаризация статей
+
+    Ответ - NDJSON: по одной строке на URL в порядке готовности
+    (поле index - позиция URL в запросе). Ошибка отдельной статьи
+    приходит строкой со status="error" и не прерывает остальные.
+    """
+    if len(request.urls) > settings.bulk_max_urls:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Слишком много URL: {len(request.urls)} (максимум {settings.bulk_max_urls})"
+        )
+
+    async def lines():
+        urls = [str(url) for url in request.urls]
+        async for result in summarize_urls(urls, text_processor, request.target_length):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
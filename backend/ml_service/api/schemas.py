@@ -1,6 +1,6 @@
 """Pydantic схемы для API"""
 from pydantic import BaseModel, HttpUrl, Field, validator
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Union
 from datetime import datetime
 
 
@@ -14,9 +14,15 @@ class ParaphraseRequest(BaseModel):
         examples=["Сегодня произошло важное событие в мире технологий."]
     )
     max_length: Optional[int] = Field(512, ge=50, le=1024, description="Максимальная длина результата")
-    temperature: Optional[float] = Field(0.7, ge=0.1, le=1.0, description="Температура генерации")
+    temperature: Optional[float] = Field(
+        0.7,
+        ge=0.0,
+        le=1.0,
+        description="Температура генерации (0 - детерминированный beam search: парафраз кэшируется по предложениям)"
+    )
     top_p: Optional[float] = Field(0.9, ge=0.1, le=1.0, description="Nucleus sampling")
     num_beams: Optional[int] = Field(5, ge=1, le=10, description="Количество beams")
+    source_url: Optional[str] = Field(None, description="URL или домен источника (статистика кэша по доменам)")
     
     class Config:
         json_schema_extra = {
@@ -37,6 +43,8 @@ class ParaphraseResponse(BaseModel):
     similarity_score: float = Field(..., ge=0.0, le=1.0, description="Семантическая схожесть")
     processing_time: float = Field(..., description="Время обработки в секундах")
     cached: bool = Field(False, description="Было ли взято из кэша")
+    semantic_hit: bool = Field(False, description="Результат взят из семантического кэша (почти совпадающий текст)")
+    semantic_similarity: Optional[float] = Field(None, description="Схожесть с закэшированным текстом")
 
 
 class SummarizeRequest(BaseModel):
@@ -49,13 +57,19 @@ class SummarizeRequest(BaseModel):
     )
     target_length: Optional[int] = Field(None, ge=50, le=2000, description="Целевая длина саммари")
     language: Optional[str] = Field(None, description="Язык текста (ru/en)")
+    mode: Optional[str] = Field(
+        "abstractive",
+        pattern="^(abstractive|extractive)$",
+        description="Режим: abstractive (модель) или extractive (быстрый отбор предложений)"
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
                 "text": "Сегодня в столице состоялась встреча представителей крупнейших технологических компаний страны. На повестке дня были вопросы развития искусственного интеллекта и внедрения новых технологий в различные сферы экономики. Эксперты отметили важность совместной работы государства и бизнеса для достижения поставленных целей. В ближайшие месяцы планируется запуск нескольких пилотных проектов, которые позволят оценить эффективность предложенных решений.",
                 "target_length": 200,
-                "language": "ru"
+                "language": "ru",
+                "mode": "abstractive"
             }
         }
 
@@ -68,6 +82,8 @@ class SummarizeResponse(BaseModel):
     compression_ratio: float = Field(..., description="Коэффициент сжатия")
     processing_time: float = Field(..., description="Время обработки в секундах")
     cached: bool = Field(False, description="Было ли взято из кэша")
+    semantic_hit: bool = Field(False, description="Результат взят из семантического кэша (почти совпадающий текст)")
+    semantic_similarity: Optional[float] = Field(None, description="Схожесть с закэшированным текстом")
 
 
 class ProcessRequest(BaseModel):
@@ -76,6 +92,12 @@ class ProcessRequest(BaseModel):
     text: Optional[str] = Field(None, min_length=1, max_length=50000, description="Текст новости")
     platforms: Optional[List[str]] = Field(["telegram", "vk", "instagram"], description="Целевые платформы")
     force_summarize: Optional[bool] = Field(False, description="Принудительная суммаризация")
+    temperature: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Температура парафраза (по умолчанию ML_TEMPERATURE; 0 - детерминированный beam search)"
+    )
     target_lengths: Optional[Dict[str, int]] = Field(None, description="Целевые длины для платформ")
     
     @validator('text', 'url')
@@ -129,12 +151,200 @@ class SimilarityResponse(BaseModel):
     threshold: float = Field(..., description="Использованный порог")
 
 
+class SimilarityMatrixRequest(BaseModel):
+    """Запрос на матрицу схожести (многие-ко-многим)"""
+    texts: List[str] = Field(..., min_length=1, max_length=2000, description="Тексты (строки матрицы)")
+    texts_b: Optional[List[str]] = Field(
+        None,
+        max_length=2000,
+        description="Тексты-кандидаты (столбцы). Если не указаны - texts сравниваются между собой; пустой список - матрица без столбцов"
+    )
+    top_k: Optional[int] = Field(None, ge=1, le=100, description="Вернуть только top-k столбцов для каждой строки")
+    threshold: Optional[float] = Field(None, ge=-1.0, le=1.0, description="Вернуть только пары со схожестью не ниже порога")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "texts": ["Сегодня хорошая погода", "Погода сегодня прекрасная", "Курс рубля упал"],
+                "threshold": 0.75
+            }
+        }
+
+
+class SimilarityMatrixResponse(BaseModel):
+    """Ответ с матрицей схожести
+
+    Без top_k и threshold возвращается полная матрица; иначе только
+    запрошенные части, чтобы ответ оставался небольшим при больших n.
+    """
+    shape: List[int] = Field(..., description="Размер матрицы [строки, столбцы]")
+    matrix: Optional[List[List[float]]] = Field(None, description="Полная матрица косинусной схожести")
+    top_k: Optional[List[List[Dict]]] = Field(None, description="Для каждой строки: [{index, score}] по убыванию")
+    pairs: Optional[List[Dict]] = Field(None, description="Пары {i, j, score} со схожестью не ниже порога")
+    processing_time: float = Field(..., description="Время обработки в секундах")
+
+
+class StoryCheckRequest(BaseModel):
+    """Запрос на проверку дубликата среди опубликованных статей"""
+    text: str = Field(..., min_length=1, max_length=50000, description="Текст статьи")
+    days: Optional[float] = Field(None, gt=0, description="Окно поиска в днях (по умолчанию из конфига)")
+    threshold: Optional[float] = Field(None, ge=0.0, le=1.0, description="Порог дубликата (по умолчанию из конфига)")
+    top_k: Optional[int] = Field(5, ge=1, le=50, description="Сколько ближайших статей вернуть")
+
+
+class StoryCheckResponse(BaseModel):
+    """Ответ проверки дубликата"""
+    is_duplicate: bool = Field(..., description="Есть ли статья со схожестью не ниже порога")
+    matches: List[Dict] = Field(..., description="Ближайшие статьи: {id, score, cluster_id, timestamp}")
+    threshold: float = Field(..., description="Использованный порог")
+    processing_time: float = Field(..., description="Время обработки в секундах")
+
+
+class StoryAssignRequest(BaseModel):
+    """Запрос на добавление статьи в индекс с назначением кластера"""
+    id: str = Field(..., min_length=1, description="Идентификатор статьи (например, URL)")
+    text: str = Field(..., min_length=1, max_length=50000, description="Текст статьи")
+    timestamp: Optional[float] = Field(None, description="Время публикации (unix), по умолчанию - текущее")
+    days: Optional[float] = Field(None, gt=0, description="Окно поиска в днях (по умолчанию из конфига)")
+    threshold: Optional[float] = Field(None, ge=0.0, le=1.0, description="Порог дубликата (по умолчанию из конфига)")
+
+
+class StoryAssignResponse(BaseModel):
+    """Ответ с назначенным кластером"""
+    id: str = Field(..., description="Идентификатор статьи")
+    cluster_id: int = Field(..., description="Кластер сюжета")
+    is_new_cluster: bool = Field(..., description="Открыт ли новый кластер")
+    duplicate_of: Optional[str] = Field(None, description="Ближайшая статья кластера, если это дубликат")
+    similarity: Optional[float] = Field(None, description="Схожесть с ближайшей статьёй")
+    already_indexed: bool = Field(False, description="Статья уже была в индексе")
+    processing_time: float = Field(..., description="Время обработки в секундах")
+
+
+class EmbedRequest(BaseModel):
+    """Запрос на получение эмбеддингов"""
+    texts: List[str] = Field(..., min_length=1, max_length=256, description="Тексты для кодирования")
+    dtype: Optional[str] = Field("float32", pattern="^(float32|float16)$", description="Тип значений вектора")
+    encoding: Optional[str] = Field(
+        "json",
+        pattern="^(json|base64)$",
+        description="json - списки чисел, base64 - little-endian байты вектора в base64"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "texts": ["Сегодня хорошая погода", "Погода сегодня прекрасная"],
+                "dtype": "float16",
+                "encoding": "base64"
+            }
+        }
+
+
+class EmbedResponse(BaseModel):
+    """Ответ с эмбеддингами (нормированные векторы)"""
+    embeddings: List[Union[List[float], str]] = Field(..., description="Векторы (списки чисел или base64)")
+    dimension: int = Field(..., description="Размерность векторов")
+    dtype: str = Field(..., description="Тип значений вектора")
+    encoding: str = Field(..., description="Формат векторов")
+    processing_time: float = Field(..., description="Время обработки в секундах")
+
+
+class ExtractRequest(BaseModel):
+    """Запрос на извлечение статьи по URL"""
+    url: HttpUrl = Field(..., description="URL статьи")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "url": "https://lenta.ru/news/2024/01/15/tech/"
+            }
+        }
+
+
+class ExtractResponse(BaseModel):
+    """Статья, извлечённая из страницы за один разбор HTML"""
+    url: str = Field(..., description="Исходный URL")
+    text: str = Field(..., description="Основной текст статьи")
+    title: str = Field("", description="Заголовок")
+    image: Optional[str] = Field(None, description="Главное изображение (og:image и т.п.)")
+    date: Optional[str] = Field(None, description="Дата публикации (YYYY-MM-DD)")
+    language: str = Field(..., description="Определённый язык текста")
+    language_hints: List[str] = Field([], description="Языки, объявленные страницей (lang, og:locale)")
+    processing_time: float = Field(..., description="Время обработки в секундах")
+
+
+class SummarizeUrlsRequest(BaseModel):
+    """Запрос на пакетную суммаризацию статей по списку URL"""
+    urls: List[HttpUrl] = Field(..., min_length=1, description="URL статей")
+    target_length: Optional[int] = Field(None, ge=50, le=2000, description="Желаемая длина саммари (в символах)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "urls": [
+                    "https://lenta.ru/news/2024/01/15/tech/",
+                    "https://ria.ru/20240115/economy.html"
+                ],
+                "target_length": 600
+            }
+        }
+
+
+class JobCreateRequest(BaseModel):
+    """Запрос на постановку фоновой задачи"""
+    type: str = Field(..., description="Тип задачи", pattern="^(summarize|process|summarize_url)$")
+    payload: Dict = Field(..., description="Тело запроса соответствующего endpoint (/summarize, /process, /summarize-url)")
+    webhook_url: Optional[HttpUrl] = Field(None, description="URL, на который придёт POST с результатом")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "type": "summarize_url",
+                "payload": {"url": "https://lenta.ru/news/2024/01/15/tech/", "target_length": 600},
+                "webhook_url": "https://example.com/hooks/ml"
+            }
+        }
+
+
+class JobResponse(BaseModel):
+    """Состояние фоновой задачи"""
+    job_id: str = Field(..., description="Идентификатор задачи")
+    type: str = Field(..., description="Тип задачи")
+    status: str = Field(..., description="Статус (queued/running/done/failed)")
+    result: Optional[Dict] = Field(None, description="Результат (ответ соответствующего endpoint)")
+    error: Optional[str] = Field(None, description="Текст ошибки")
+    attempts: int = Field(0, description="Количество попыток выполнения")
+    created_at: float = Field(..., description="Время постановки (unix)")
+    started_at: Optional[float] = Field(None, description="Время начала выполнения (unix)")
+    finished_at: Optional[float] = Field(None, description="Время завершения (unix)")
+
+
 class HealthResponse(BaseModel):
     """Ответ health check"""
-    status: str = Field(..., description="Статус сервиса (ready/loading/error)")
+    status: str = Field(
+        ...,
+        description=(
+            "Статус сервиса (HTTP 200 при любом статусе): ready - основная модель загружена, "
+            "loading - идёт загрузка, idle - модели ещё не запрашивались (загрузятся первым запросом), "
+            "error - загрузка основной модели не удалась (следующий запрос попробует снова). "
+            "Готовность к трафику - /health/ready"
+        )
+    )
     model_loaded: bool = Field(..., description="Загружена ли хотя бы одна модель")
     cache_enabled: bool = Field(..., description="Включен ли кэш")
     model_name: Optional[str] = Field(None, description="Имя модели")
     version: str = Field("1.0.0", description="Версия API")
     models_status: Optional[Dict[str, bool]] = Field(None, description="Статус каждой модели")
+    models: Optional[Dict[str, Dict]] = Field(
+        None,
+        description="Состояние моделей: state (not_loaded/loading/ready/failed), load_seconds, memory_mb, device, error"
+    )
+    queue_depth: int = Field(0, description="Вызовов инференса в работе и в ожидании свободного потока инференса")
+    inference: Optional[Dict[str, Dict[str, int]]] = Field(
+        None, description="Инференс по задачам: queued (ждут поток), in_flight, peak, total"
+    )
+    uptime_seconds: Optional[float] = Field(None, description="Время работы сервиса (секунды)")
+    threads: Optional[Dict] = Field(
+        None, description="Потоки CPU: доступные CPU, слоты инференса, intra-op/inter-op torch, токенизаторы"
+    )
 
@@ -0,0 +1 @@
+"""Бенчмарки ML Service"""
@@ -0,0 +1,23 @@
+"""Синтетический корпус для бенчмарков и калибровки (детерминированный)"""
+import random
+
+WORDS = (
+    "правительство компания рынок рост снижение заявил президент министр цены "
+    "нефть банк экономика новости технологии искусственный интеллект проект "
+    "город жители власти сообщили источник данные исследование эксперты год"
+).split()
+
+
+def make_corpus(count: int, seed: int = 42):
+    """Синтетические новостные предложения разной длины"""
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 60))).capitalize() + '.'
+        for _ in range(count)
+    ]
+
+
+def make_articles(count: int, sentences: int = 12, seed: int = 42):
+    """Синтетические статьи из предложений корпуса"""
+    corpus = make_corpus(count * sentences, seed)
+    return [' '.join(corpus[i * sentences:(i + 1) * sentences]) for i in range(count)]
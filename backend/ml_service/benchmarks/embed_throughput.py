@@ -0,0 +1,59 @@
+"""Бенчмарк пропускной способности кодирования эмбеддингов
+
+Запуск из папки ml_service:
+    python -m benchmarks.embed_throughput --batch-sizes 1 8 16 32 64 --texts 512
+
+Кэш эмбеддингов не используется (encode_uncached): измеряется чистая
+скорость модели схожести на разных размерах батча. Результат печатается
+таблицей и, при --output, сохраняется в JSON.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.corpus import make_corpus
+from config import settings
+from services.embeddings import embedding_service
+
+
+def run(batch_sizes, texts_count: int, repeats: int):
+    corpus = make_corpus(texts_count)
+    # Прогрев: загрузка модели и первый проход
+    embedding_service.encode_uncached(corpus[:8], batch_size=8)
+
+    results = []
+    for batch_size in batch_sizes:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            embedding_service.encode_uncached(corpus, batch_size=batch_size)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append({
+            "batch_size": batch_size,
+            "texts": texts_count,
+            "seconds": round(best, 3),
+            "texts_per_second": round(texts_count / best, 1)
+        })
+        print(f"batch={batch_size:>4}  {texts_count / best:>9.1f} текстов/с  ({best:.2f}с)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк /api/v1/embed (модель схожести)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16, 32, 64])
+    parser.add_argument("--texts", type=int, default=512, help="Количество текстов в корпусе")
+    parser.add_argument("--repeats", type=int, default=3, help="Повторов на размер батча (берётся лучший)")
+    parser.add_argument("--output", help="Путь для сохранения результатов в JSON")
+    args = parser.parse_args()
+
+    print(f"Модель: {settings.similarity_model}, устройство: {settings.ml_device}")
+    results = run(args.batch_sizes, args.texts, args.repeats)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": settings.similarity_model, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
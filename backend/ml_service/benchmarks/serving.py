@@ -0,0 +1,238 @@
+"""Сквозной бенчмарк HTTP API на синтетическом бэкенде
+
+Запуск из папки ml_service (модели и сеть не нужны):
+    python -m benchmarks.serving --concurrency 1 4 16 --requests 64 --output bench.json
+    python -m benchmarks.serving --compare bench.json
+
+Вызовы моделей заменяются детерминированным бэкендом с задержкой на
+токен (--token-latency-ms), остальной путь запроса - FastAPI, схемы,
+кэши, платформенные варианты - работает как в сервисе. Запросы идут
+через ASGI-транспорт httpx с заданной конкурентностью. Для каждого
+endpoint и уровня конкурентности считаются пропускная способность и
+p50/p95/p99 задержки; вместе с памятью процесса и коммитом git всё
+пишется в JSON, который можно сравнить с прогоном другого коммита.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.corpus import make_articles, make_corpus
+
+ENDPOINTS = ("paraphrase", "summarize", "process", "similarity")
+
+
+def install_synthetic_backend(token_latency: float, encode_factor: float = 0.1, dimension: int = 768):
+    """Замена вызовов моделей детерминированными функциями с задержкой на токен
+
+    Задержка выполняется синхронно (time.sleep), как и настоящий инференс
+    в обработчиках: блокировка event loop входит в измеряемую картину.
+    """
+    import services.text_processor as text_processor_module
+    from services.text_processor import TextProcessor
+    from services.embeddings import embedding_service
+
+    def tokens(text: str) -> int:
+        return len(text.split())
+
+    def load_model(self, *args, **kwargs):
+        return object(), object()
+
+    def paraphrase_texts(self, texts, language, model, tokenizer, **kwargs):
+        results = []
+        for text in texts:
+            time.sleep(token_latency * tokens(text) * (1 + encode_factor))
+            results.append(' '.join(reversed(text.split())))
+        return results
+
+    async def summarize(self, text, target_length=None, language=None):
+        summary = text[:target_length or 600]
+        time.sleep(token_latency * (tokens(text) * encode_factor + tokens(summary)))
+        return summary
+
+    async def check_similarity(self, text1, text2):
+        time.sleep(token_latency * (tokens(text1) + tokens(text2)) * encode_factor)
+        return 0.85
+
+    def encode_uncached(texts, batch_size=None):
+        time.sleep(token_latency * sum(tokens(text) for text in texts) * encode_factor)
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+            vectors.append(vector / np.linalg.norm(vector))
+        return np.stack(vectors)
+
+    # Путь парафраза (кэш предложений, батч недостающих) остаётся настоящим
+    text_processor_module.TRANSFORMERS_AVAILABLE = True
+    TextProcessor._detect_language = lambda self, text: "ru"
+    TextProcessor._load_paraphrase_model = load_model
+    TextProcessor._get_draft_model = lambda self, task: None
+    TextProcessor._paraphrase_texts = paraphrase_texts
+    TextProcessor.summarize = summarize
+    TextProcessor.check_similarity = check_similarity
+    embedding_service.encode_uncached = encode_uncached
+
+
+def make_payloads(endpoint: str, count: int, seed: int):
+    """Детерминированные тела запросов для endpoint
+
+    Для каждого уровня конкурентности берётся свой seed: иначе повторные
+    тексты попадали бы в кэши, прогретые предыдущим уровнем.
+    """
+    if endpoint == "paraphrase":
+        return [{"text": text} for text in make_articles(count, sentences=3, seed=seed)]
+    if endpoint == "summarize":
+        return [{"text": text, "target_length": 400} for text in make_articles(count, sentences=20, seed=seed)]
+    if endpoint == "process":
+        return [
+            {"text": text, "platforms": ["telegram", "vk", "twitter"], "force_summarize": True}
+            for text in make_articles(count, sentences=15, seed=seed)
+        ]
+    sentences = make_corpus(count * 2, seed=seed)
+    return [{"text1": sentences[2 * i], "text2": sentences[2 * i + 1]} for i in range(count)]
+
+
+async def drive(client, endpoint: str, payloads, concurrency: int):
+    """Отправка запросов с заданной конкурентностью, задержки в секундах"""
+    latencies, errors = [], 0
+    position = 0
+
+    async def worker():
+        nonlocal position, errors
+        while position < len(payloads):
+            payload = payloads[position]
+            position += 1
+            start = time.perf_counter()
+            response = await client.post(f"/api/v1/{endpoint}", json=payload)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def memory_usage():
+    """Текущая и пиковая RSS процесса в МБ (None, если недоступно)"""
+    current = peak = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        if sys.platform == "darwin":
+            peak /= 1024
+    except ImportError:
+        pass
+    return {
+        "rss_mb": round(current, 1) if current is not None else None,
+        "rss_peak_mb": round(peak, 1) if peak is not None else None
+    }
+
+
+def git_revision():
+    """Коммит и признак незакоммиченных изменений"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain"], text=True, stderr=subprocess.DEVNULL).strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def run(args):
+    import httpx
+    from main import app
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for endpoint in args.endpoints:
+            # Прогрев: импорт, первые аллокации
+            await drive(client, endpoint, make_payloads(endpoint, 2, seed=0), 1)
+            for concurrency in args.concurrency:
+                payloads = make_payloads(endpoint, args.requests, seed=concurrency)
+                latencies, errors, wall = await drive(client, endpoint, payloads, concurrency)
+                latencies_ms = np.array(latencies) * 1000
+                result = {
+                    "endpoint": endpoint,
+                    "concurrency": concurrency,
+                    "requests": len(latencies),
+                    "errors": errors,
+                    "throughput_rps": round(len(latencies) / wall, 2),
+                    "mean_ms": round(float(latencies_ms.mean()), 2),
+                    "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+                    "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+                    "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+                    "memory": memory_usage()
+                }
+                results.append(result)
+                print(
+                    f"{endpoint:<11} c={concurrency:<3} {result['throughput_rps']:>8.2f} rps  "
+                    f"p50 {result['p50_ms']:>8.1f}  p95 {result['p95_ms']:>8.1f}  p99 {result['p99_ms']:>8.1f} мс"
+                    + (f"  ошибок: {errors}" if errors else "")
+                )
+    return results
+
+
+def compare(current, baseline_path: str):
+    """Изменение пропускной способности и p95 относительно прошлого прогона"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+    print(f"\nСравнение с {baseline_path}:")
+    for result in current:
+        base = baseline.get((result["endpoint"], result["concurrency"]))
+        if not base:
+            continue
+        throughput = (result["throughput_rps"] / base["throughput_rps"] - 1) * 100 if base["throughput_rps"] else 0.0
+        p95 = (result["p95_ms"] / base["p95_ms"] - 1) * 100 if base["p95_ms"] else 0.0
+        print(f"{result['endpoint']:<11} c={result['concurrency']:<3} rps {throughput:+6.1f}%  p95 {p95:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк API ML Service")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="Запросов на endpoint и уровень конкурентности")
+    parser.add_argument("--token-latency-ms", type=float, default=2.0, help="Задержка синтетической модели на токен")
+    parser.add_argument("--output", help="Путь для сохранения результатов в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    install_synthetic_backend(args.token_latency_ms / 1000)
+    results = asyncio.run(run(args))
+
+    report = {
+        "meta": {
+            **git_revision(),
+            "backend": "synthetic",
+            "token_latency_ms": args.token_latency_ms,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results,
+        "memory": memory_usage()
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
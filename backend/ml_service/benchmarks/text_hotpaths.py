@@ -0,0 +1,159 @@
+"""Микробенчмарк текстовых функций на пути каждого запроса (ml_service и rewrite_service)
+
+Запуск из папки ml_service:
+    python -m benchmarks.text_hotpaths --output hotpaths.json
+    python -m benchmarks.text_hotpaths --filter clean --compare hotpaths.json
+
+Корпус фиксированный (benchmarks/data/text_hotpaths.json): русские и
+английские новости, ответы LLM с markdown и рассуждениями, сырые выходы
+парафразера, HTML-страницы. Для каждой функции измеряются операций/с
+(лучший из --repeats замеров) и память: пик аллокаций одного вызова
+(средний и максимальный по входам) и число блоков, оставшихся после
+прогона корпуса (tracemalloc).
+Функции rewrite_service пропускаются, если его зависимости не установлены.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "text_hotpaths.json")
+REWRITE_SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "rewrite_service"))
+
+
+def load_corpus():
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ml_service_cases(corpus):
+    """Функции ml_service: (имя, функция, входы)"""
+    from services.text_processor import TextProcessor
+
+    processor = TextProcessor()
+    news = corpus["news_ru"] + corpus["news_en"]
+    return [
+        ("ml._clean_paraphrased_text", processor._clean_paraphrased_text, corpus["paraphrase_outputs"]),
+        ("ml._trim_to_complete_sentence", lambda text: processor._trim_to_complete_sentence(text, 300), news),
+    ]
+
+
+def rewrite_service_cases(corpus):
+    """Функции rewrite_service (пусто, если сервис не импортируется)"""
+    sys.path.insert(0, REWRITE_SERVICE_DIR)
+    import logging
+    # Импорт server.py пишет в лог предупреждения о ненастроенных интеграциях
+    logging.disable(logging.WARNING)
+    try:
+        import server
+    except ImportError as e:
+        print(f"rewrite_service пропущен: {e}", file=sys.stderr)
+        return []
+    finally:
+        logging.disable(logging.NOTSET)
+        sys.path.remove(REWRITE_SERVICE_DIR)
+
+    html_texts = [server.convert_markdown_to_html(text) for text in corpus["llm_outputs"]]
+    keyword_inputs = list(zip(corpus["news_ru"] + corpus["news_en"], html_texts + html_texts[:2]))
+    return [
+        ("rewrite.clean_model_response", server.clean_model_response, corpus["llm_outputs"]),
+        ("rewrite.convert_markdown_to_html", server.convert_markdown_to_html, corpus["llm_outputs"]),
+        ("rewrite.extract_keywords_for_image_search",
+         lambda pair: server.extract_keywords_for_image_search(*pair), keyword_inputs),
+        ("rewrite.extract_text_from_html", server.extract_text_from_html,
+         [page.encode("utf-8") for page in corpus["html_pages"]]),
+        ("rewrite.clean_html_for_telegram", server.clean_html_for_telegram, html_texts),
+    ]
+
+
+def measure(fn, inputs, min_time: float, repeats: int):
+    """Операций/с (лучший замер), пик памяти на вызов и удержанные блоки"""
+    for item in inputs:
+        fn(item)
+
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            for item in inputs:
+                fn(item)
+            calls += len(inputs)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+
+    # Пик аллокаций замеряется отдельно для каждого вызова: пик одного
+    # вызова не зависит от размера корпуса, поэтому делить общий пик нельзя
+    peaks = []
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for item in inputs:
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            fn(item)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    return {
+        "ops_per_second": round(best, 1),
+        "inputs": len(inputs),
+        "peak_kb_per_call_max": round(max(peaks) / 1024, 2),
+        "peak_kb_per_call_mean": round(sum(peaks) / len(peaks) / 1024, 2),
+        "retained_blocks": retained_blocks
+    }
+
+
+def compare(results, baseline_path: str):
+    """Изменение операций/с относительно прошлого прогона"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    print(f"\nСравнение с {baseline_path}:")
+    for result in results:
+        base = baseline.get(result["name"])
+        if base and base["ops_per_second"]:
+            change = (result["ops_per_second"] / base["ops_per_second"] - 1) * 100
+            print(f"{result['name']:<45} {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк текстовых функций")
+    parser.add_argument("--filter", help="Подстрока имени функции")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Минимальная длительность замера, с")
+    parser.add_argument("--repeats", type=int, default=5, help="Замеров на функцию (берётся лучший)")
+    parser.add_argument("--output", help="Путь для сохранения результатов в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    cases = ml_service_cases(corpus) + rewrite_service_cases(corpus)
+    if args.filter:
+        cases = [case for case in cases if args.filter in case[0]]
+
+    results = []
+    for name, fn, inputs in cases:
+        result = {"name": name, **measure(fn, inputs, args.min_time, args.repeats)}
+        results.append(result)
+        print(
+            f"{name:<45} {result['ops_per_second']:>10.1f} оп/с  "
+            f"пик {result['peak_kb_per_call_mean']:>8.2f} КБ/вызов (макс. {result['peak_kb_per_call_max']:.2f})  "
+            f"удержано блоков: {result['retained_blocks']}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
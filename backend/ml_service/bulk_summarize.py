@@ -0,0 +1,267 @@
+"""Офлайн-суммаризация архива статей из JSONL
+
+Запуск из папки ml_service:
+    python bulk_summarize.py articles.jsonl summaries.jsonl --workers 2 --batch-size 8
+
+Каждая строка входа - JSON-объект с текстом (поле --text-field) и
+необязательным id (--id-field). Вход читается окнами по --window строк:
+внутри окна тексты сортируются по длине и режутся на батчи (меньше
+паддинга), батчи раздаются процессам-воркерам. В каждом воркере
+батчи идут через конвейер токенизация -> generate -> декодирование
+(этапы перекрываются), в конце печатается загрузка этапов. Результаты окна
+дописываются в выход, после чего сохраняется чекпойнт - смещение во
+входном файле и размер выхода. Повторный запуск с тем же выходом
+продолжает с чекпойнта. Память не зависит от размера корпуса.
+
+Заглушек вместо саммари в выходе нет. Если модель недоступна или батч
+упал, запуск останавливается до записи окна: чекпойнт остаётся на
+предыдущем окне, и после устранения причины запуск продолжается с него.
+Пустой результат модели для отдельной статьи записывается как
+{"id": ..., "error": ...}. Существующий выход без чекпойнта не
+перезаписывается без --overwrite.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+_processor = None
+_pipeline_options = {}
+
+
+def _init_worker(torch_threads, pipeline_options):
+    """Инициализация процесса-воркера: свой TextProcessor и число потоков torch
+
+    Потоки задаются через cpu_threads, как в сервисе: переменные OpenMP/MKL
+    и токенизаторов - до импорта torch, число потоков torch - после.
+    """
+    global _processor, _pipeline_options
+    from config import settings
+    from services.text_processor import TextProcessor, ensure_transformers
+
+    settings.torch_intra_op_threads = torch_threads
+    ensure_transformers()
+    _processor = TextProcessor()
+    _pipeline_options = pipeline_options
+
+
+def _summarize_batches(batches):
+    """Суммаризация группы батчей [(номер строки, текст)] конвейером в процессе-воркере
+
+    Возвращает пары (номер строки, саммари) и загрузку этапов конвейера
+    """
+    pipeline = _processor.summarize_pipeline(**_pipeline_options)
+    results = []
+    summaries = pipeline.run([text for _, text in batch] for batch in batches)
+    for batch, batch_summaries in zip(batches, summaries):
+        results.extend(
+            (index, summary) for (index, _), summary in zip(batch, batch_summaries) if summary is not None
+        )
+    return results, pipeline.stats()
+
+
+def read_window(f, size: int):
+    """Следующие size непустых строк входа (битые строки - как {"_error": ...})"""
+    records = []
+    while len(records) < size:
+        line = f.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            record = {"_error": f"Некорректный JSON: {e}"}
+        if not isinstance(record, dict):
+            record = {"_error": "Строка не является JSON-объектом"}
+        records.append(record)
+    return records
+
+
+def make_batches(records, text_field: str, batch_size: int):
+    """Батчи текстов близкой длины (сортировка по длине внутри окна)"""
+    items = [
+        (i, record[text_field])
+        for i, record in enumerate(records)
+        if "_error" not in record and isinstance(record.get(text_field), str) and record[text_field].strip()
+    ]
+    items.sort(key=lambda item: len(item[1]))
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def run(args):
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        if os.path.exists(args.output) and os.path.getsize(args.output) and not args.overwrite:
+            print(
+                f"Выход {args.output} уже существует, а чекпойнта {checkpoint_path} нет. "
+                f"Укажите другой выход или --overwrite",
+                file=sys.stderr
+            )
+            return 1
+        checkpoint = {"input_offset": 0, "output_size": 0, "processed": 0}
+    elif checkpoint["processed"]:
+        print(f"Продолжение с чекпойнта: обработано {checkpoint['processed']} записей", file=sys.stderr)
+
+    total_bytes = os.path.getsize(args.input)
+
+    # Выход обрезается до чекпойнта: записи после него будут посчитаны заново
+    output_mode = "r+b" if os.path.exists(args.output) else "wb"
+    out = open(args.output, output_mode)
+    out.truncate(checkpoint["output_size"])
+    out.seek(checkpoint["output_size"])
+
+    pipeline_options = {
+        "target_length": args.target_length,
+        "tokenize_workers": args.tokenize_threads,
+        "decode_workers": args.decode_threads,
+        "fallback": False
+    }
+    pool = None
+    if args.workers > 1:
+        ctx = multiprocessing.get_context("spawn")
+        pool = ctx.Pool(args.workers, initializer=_init_worker, initargs=(args.torch_threads, pipeline_options))
+    else:
+        _init_worker(args.torch_threads, pipeline_options)
+    pipeline_stats = []
+
+    start_time = time.time()
+    start_offset = checkpoint["input_offset"]
+    processed_now = 0
+    failed = False
+    try:
+        with open(args.input, "rb") as f:
+            f.seek(start_offset)
+            while True:
+                records = read_window(f, args.window)
+                if not records:
+                    break
+
+                batches = make_batches(records, args.text_field, args.batch_size)
+                # Каждый процесс получает свою группу батчей и гонит её через конвейер
+                groups = [group for group in (batches[i::args.workers] for i in range(args.workers)) if group]
+                summaries = {}
+                results = pool.imap_unordered(_summarize_batches, groups) if pool else map(_summarize_batches, groups)
+                try:
+                    for group_results, group_stats in results:
+                        summaries.update(group_results)
+                        pipeline_stats.append(group_stats)
+                except Exception as e:
+                    # Окно не записывается: чекпойнт остаётся на предыдущем окне
+                    failed = True
+                    print(
+                        f"\nОшибка модели: {e}. Остановлено на {checkpoint['processed']} записях, "
+                        f"повторный запуск продолжит с чекпойнта",
+                        file=sys.stderr
+                    )
+                    break
+
+                for i, record in enumerate(records):
+                    text = record.get(args.text_field) if "_error" not in record else None
+                    result = {"id": record.get(args.id_field)}
+                    if i in summaries:
+                        result.update(
+                            summary=summaries[i],
+                            original_length=len(text),
+                            summary_length=len(summaries[i])
+                        )
+                    elif "_error" in record:
+                        result["error"] = record["_error"]
+                    elif isinstance(text, str) and text.strip():
+                        result["error"] = "Модель вернула пустой или слишком короткий результат"
+                    else:
+                        result["error"] = f"Нет текста в поле '{args.text_field}'"
+                    out.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+                out.flush()
+                os.fsync(out.fileno())
+
+                processed_now += len(records)
+                checkpoint = {
+                    "input_offset": f.tell(),
+                    "output_size": out.tell(),
+                    "processed": checkpoint["processed"] + len(records)
+                }
+                save_checkpoint(checkpoint_path, checkpoint)
+
+                # Скорость и ETA считаются по байтам входа: число строк заранее неизвестно
+                elapsed = max(time.time() - start_time, 1e-6)
+                done_bytes = checkpoint["input_offset"] - start_offset
+                bytes_rate = done_bytes / elapsed
+                eta = (total_bytes - checkpoint["input_offset"]) / bytes_rate if bytes_rate else 0
+                print(
+                    f"\r{checkpoint['processed']} записей, {checkpoint['input_offset'] * 100 / total_bytes:5.1f}%, "
+                    f"{processed_now / elapsed:.2f} записей/с, ETA {format_eta(eta)}",
+                    end="", file=sys.stderr, flush=True
+                )
+    finally:
+        out.close()
+        if pool:
+            if failed:
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+    if failed:
+        return 1
+    elapsed = time.time() - start_time
+    print(f"\nГотово: {checkpoint['processed']} записей, {elapsed:.1f}с", file=sys.stderr)
+    if pipeline_stats:
+        from services.pipeline import merge_stats, format_stats
+        print(f"Загрузка этапов: {format_stats(merge_stats(pipeline_stats))}", file=sys.stderr)
+    return 0
+
+
+def main():
+    from config import settings
+
+    parser = argparse.ArgumentParser(description="Офлайн-суммаризация JSONL-архива статей")
+    parser.add_argument("input", help="Входной JSONL")
+    parser.add_argument("output", help="Выходной JSONL (дописывается)")
+    parser.add_argument("--text-field", default="text", help="Поле с текстом статьи")
+    parser.add_argument("--id-field", default="id", help="Поле с идентификатором статьи")
+    parser.add_argument("--target-length", type=int, default=None, help="Желаемая длина саммари (в символах)")
+    parser.add_argument("--workers", type=int, default=settings.inference_slots, help="Количество процессов-воркеров")
+    parser.add_argument("--torch-threads", type=int, default=settings.torch_intra_op_threads or None,
+                        help="Потоков torch на воркер (по умолчанию доступные CPU / --workers)")
+    parser.add_argument("--batch-size", type=int, default=settings.max_batch_size, help="Текстов в батче генерации")
+    parser.add_argument("--tokenize-threads", type=int, default=1, help="Потоков этапа токенизации")
+    parser.add_argument("--decode-threads", type=int, default=1, help="Потоков этапа декодирования")
+    parser.add_argument("--window", type=int, default=256, help="Строк входа между чекпойнтами")
+    parser.add_argument("--checkpoint", help="Файл чекпойнта (по умолчанию <output>.checkpoint)")
+    parser.add_argument("--overwrite", action="store_true", help="Перезаписать существующий выход без чекпойнта")
+    args = parser.parse_args()
+
+    if args.torch_threads is None:
+        from services.cpu_threads import available_cpus
+        # Квота cgroup и affinity, а не число ядер хоста
+        args.torch_threads = max(1, available_cpus() // max(1, args.workers))
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Калибровка хоста: подбор числа потоков torch, слотов инференса и размера батча
+
+Запуск из папки ml_service (модели должны быть доступны):
+    python calibrate.py --task summary --texts 32 --max-p95 20
+
+Модель прогоняется на синтетическом новостном корпусе по сетке
+(потоки torch x слоты x размер батча). Для каждой точки измеряются
+пропускная способность (текстов/с) и p95 задержки батча. Лучшая по
+пропускной способности точка (с p95 не выше --max-p95, если задан)
+записывается в профиль (ML_PROFILE_PATH), который ml_service
+применяет при старте к настройкам, не заданным явно.
+
+Для суммаризации затем подбирается окно сбора батча
+(BULK_BATCH_WINDOW_MS, /summarize-urls): тексты подаются по одному с
+частотой --arrival-rate, и для каждого окна из --windows измеряется p95
+задержки текста от поступления до готовности саммари.
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+
+from benchmarks.corpus import make_articles, make_corpus
+from config import settings
+from services.cpu_threads import available_cpus
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def default_threads():
+    cpus = available_cpus()
+    candidates = {cpus}
+    value = 1
+    while value < cpus:
+        candidates.add(value)
+        value *= 2
+    return sorted(candidates)
+
+
+def make_runner(processor, task: str, target_length: int):
+    """Функция обработки одного батча для выбранной задачи"""
+    if task == "summary":
+        return lambda batch: processor.summarize_batch(batch, target_length)
+
+    # Слоты вызывают токенизатор из нескольких потоков: _paraphrase_texts
+    # обращается к нему через _tokenize/_decode под общей блокировкой
+    model, tokenizer = processor._load_paraphrase_model('ru')
+    return lambda batch: processor._paraphrase_texts(batch, 'ru', model, tokenizer, max_length=settings.ml_max_length)
+
+
+def measure(run_batch, corpus, threads: int, slots: int, batch_size: int):
+    """Прогон корпуса: slots потоков разбирают батчи из общей очереди"""
+    import torch
+
+    torch.set_num_threads(threads)
+    batches = queue.Queue()
+    for i in range(0, len(corpus), batch_size):
+        batches.put(corpus[i:i + batch_size])
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                batch = batches.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            run_batch(batch)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(slots)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "torch_intra_op_threads": threads,
+        "inference_slots": slots,
+        "max_batch_size": batch_size,
+        "texts_per_second": round(len(corpus) / wall, 3),
+        "p50_seconds": round(percentile(latencies, 0.5), 3),
+        "p95_seconds": round(percentile(latencies, 0.95), 3)
+    }
+
+
+def measure_window(run_batch, corpus, slots: int, batch_size: int, window_ms: int, arrival_rate: float):
+    """Прогон с поступлением текстов по одному (как в /summarize-urls)
+
+    Тексты приходят равномерно с частотой arrival_rate. Первый ожидающий
+    текст открывает окно window_ms; всё, что пришло за окно (не больше
+    batch_size), уходит одним батчем, одновременно выполняется не больше
+    slots батчей. Задержка текста - от поступления до готовности саммари.
+    """
+    pending = []
+    cond = threading.Condition()
+    slot_limit = threading.Semaphore(slots)
+    latencies = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def produce():
+        for i, text in enumerate(corpus):
+            delay = start + i / arrival_rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with cond:
+                pending.append((time.perf_counter(), text))
+                cond.notify()
+
+    def run(batch):
+        try:
+            run_batch([text for _, text in batch])
+            finished = time.perf_counter()
+            with lock:
+                latencies.extend(finished - arrived for arrived, _ in batch)
+        finally:
+            slot_limit.release()
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    runners = []
+    dispatched = 0
+    while dispatched < len(corpus):
+        with cond:
+            while not pending:
+                cond.wait()
+            deadline = pending[0][0] + window_ms / 1000
+            while len(pending) < batch_size and time.perf_counter() < deadline:
+                cond.wait(max(0.0, deadline - time.perf_counter()))
+            batch, pending[:] = pending[:batch_size], pending[batch_size:]
+        dispatched += len(batch)
+        slot_limit.acquire()
+        runner = threading.Thread(target=run, args=(batch,))
+        runner.start()
+        runners.append(runner)
+    producer.join()
+    for runner in runners:
+        runner.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "bulk_batch_window_ms": window_ms,
+        "arrival_rate": arrival_rate,
+        "texts_per_second": round(len(corpus) / wall, 3),
+        "p50_seconds": round(percentile(latencies, 0.5), 3),
+        "p95_seconds": round(percentile(latencies, 0.95), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Калибровка параметров инференса под хост")
+    parser.add_argument("--task", choices=["summary", "paraphrase"], default="summary")
+    parser.add_argument("--texts", type=int, default=32, help="Текстов в корпусе на одну точку сетки")
+    parser.add_argument("--threads", type=int, nargs="+", default=default_threads(), help="Потоки torch")
+    parser.add_argument("--slots", type=int, nargs="+", default=[1, 2, 4], help="Параллельных инференсов")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--target-length", type=int, default=settings.summary_target_length)
+    parser.add_argument("--max-p95", type=float, default=None, help="Допустимая p95 задержка батча, с")
+    parser.add_argument("--windows", type=int, nargs="+", default=[0, 50, 100, 200, 500],
+                        help="Окна сбора батча суммаризации, мс (BULK_BATCH_WINDOW_MS)")
+    parser.add_argument("--arrival-rate", type=float, default=None,
+                        help="Текстов/с при подборе окна (по умолчанию 80%% лучшей пропускной способности)")
+    parser.add_argument("--output", default=settings.ml_profile_path or "./ml_profile.json", help="Путь профиля")
+    args = parser.parse_args()
+
+    from services.text_processor import TextProcessor, TRANSFORMERS_AVAILABLE
+    if not TRANSFORMERS_AVAILABLE:
+        print("Калибровка требует torch и transformers: на заглушках измерения бессмысленны", file=sys.stderr)
+        sys.exit(1)
+
+    processor = TextProcessor()
+    run_batch = make_runner(processor, args.task, args.target_length)
+    corpus = make_articles(args.texts) if args.task == "summary" else make_corpus(args.texts)
+
+    # Прогрев: загрузка модели и первый проход
+    run_batch(corpus[:1])
+
+    cpus = available_cpus()
+    results = []
+    for threads in args.threads:
+        for slots in args.slots:
+            if threads * slots > cpus:
+                continue
+            for batch_size in args.batch_sizes:
+                result = measure(run_batch, corpus, threads, slots, batch_size)
+                results.append(result)
+                print(
+                    f"threads={threads:<3} slots={slots:<2} batch={batch_size:<3} "
+                    f"{result['texts_per_second']:>8.2f} текстов/с  p95 {result['p95_seconds']:.2f}с"
+                )
+
+    candidates = [r for r in results if args.max_p95 is None or r["p95_seconds"] <= args.max_p95]
+    if not candidates:
+        print("Ни одна точка сетки не уложилась в --max-p95", file=sys.stderr)
+        sys.exit(1)
+    best = max(candidates, key=lambda r: r["texts_per_second"])
+
+    window_results = []
+    best_window = None
+    if args.task == "summary":
+        import torch
+
+        torch.set_num_threads(best["torch_intra_op_threads"])
+        arrival_rate = args.arrival_rate or round(best["texts_per_second"] * 0.8, 3)
+        for window_ms in args.windows:
+            result = measure_window(
+                run_batch, corpus, best["inference_slots"], best["max_batch_size"], window_ms, arrival_rate
+            )
+            window_results.append(result)
+            print(
+                f"window={window_ms:<4}мс rate={arrival_rate:.2f}/с "
+                f"{result['texts_per_second']:>8.2f} текстов/с  p95 текста {result['p95_seconds']:.2f}с"
+            )
+        best_window = min(window_results, key=lambda r: r["p95_seconds"])
+
+    profile = {
+        "torch_intra_op_threads": best["torch_intra_op_threads"],
+        "inference_slots": best["inference_slots"],
+        "max_batch_size": best["max_batch_size"],
+        **({"bulk_batch_window_ms": best_window["bulk_batch_window_ms"]} if best_window else {}),
+        "_calibration": {
+            "task": args.task,
+            "cpu_count": cpus,
+            "max_p95": args.max_p95,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "best": best,
+            "results": results,
+            "windows": window_results
+        }
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+
+    print(
+        f"\nРекомендуется: TORCH_INTRA_OP_THREADS={best['torch_intra_op_threads']}, "
+        f"INFERENCE_SLOTS={best['inference_slots']}, MAX_BATCH_SIZE={best['max_batch_size']}"
+        + (f", BULK_BATCH_WINDOW_MS={best_window['bulk_batch_window_ms']}" if best_window else "")
+    )
+    print(f"Профиль сохранён: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 """Конфигурация приложения"""
+from pathlib import Path
 from pydantic_settings import BaseSettings
 from typing import Optional
+import json
+import logging
 
 
 class Settings(BaseSettings):
@@ -19,7 +22,7 @@ class Settings(BaseSettings):
     ml_model_cache_dir: str = "./models_cache"
     ml_device: str = "cpu"  # cpu или cuda
     ml_max_length: int = 512
-    ml_temperature: float = 0.7
+    ml_temperature: float = 0.7  # парафраз /process и rewrite_service; 0 - детерминированный (кэш предложений)
     ml_top_p: float = 0.9
     
     # Автоматическая загрузка моделей с Hugging Face
@@ -35,10 +38,97 @@ class Settings(BaseSettings):
     summary_chunk_size: int = 900
     summary_target_length: int = 600
     
+    summary_max_input_tokens: int = 1024
+    
+    # Экстрактивное сжатие длинных текстов перед суммаризацией
+    extractive_precompress_enabled: bool = True
+    
+    # Assisted (speculative) decoding: небольшая черновая модель предлагает токены,
+    # основная проверяет их за один проход. Черновая модель должна иметь тот же
+    # словарь (токенизатор), что и основная модель соответствующей задачи
+    assisted_decoding_enabled: bool = False
+    draft_model_paraphrase_ru: Optional[str] = None
+    draft_model_summary_ru: Optional[str] = None
+    
+    # Кэш парафраза по предложениям (повторяющиеся подписи, дисклеймеры и т.п.)
+    paraphrase_sentence_cache_enabled: bool = True
+    paraphrase_sentence_cache_max_entries: int = 20000
+    paraphrase_sentence_cache_ttl: int = 86400  # 1 день
+    # Парафраз с temperature > 0 сэмплируется: из кэша повторяется один вариант
+    paraphrase_sentence_cache_allow_sampling: bool = False
+    
+    # Кэш выходов энкодера суммаризации (повторная суммаризация того же текста)
+    encoder_cache_enabled: bool = True
+    encoder_cache_max_entries: int = 32
+    encoder_cache_max_mb: int = 256
+    
+    # Профиль хоста (создаётся calibrate.py): значения из профиля применяются
+    # к настройкам ниже, если они не заданы явно через переменные окружения
+    ml_profile_path: Optional[str] = "./ml_profile.json"
+    torch_intra_op_threads: int = 0  # на слот инференса; 0 - доступные CPU / inference_slots
+    inference_slots: int = 1  # параллельных инференсов (воркеры задач, процессы bulk_summarize)
+    max_batch_size: int = 8  # текстов в батче генерации (bulk_summarize)
+    torch_inter_op_threads: int = 0  # 0 - один поток (generate() почти не распараллеливает операции)
+    tokenizers_parallelism: bool = False  # потоки Rust в быстрых токенизаторах (по числу intra-op потоков)
+    
     # Similarity Model
     similarity_model: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
     similarity_threshold: float = 0.75
     
+    # Эмбеддинги (/api/v1/embed): размер батча и LRU-кэш векторов
+    embedding_batch_size: int = 32
+    embedding_cache_max_entries: int = 10000
+    
+    # Семантический кэш результатов: повторное использование саммари/парафраза
+    # для почти совпадающих по смыслу текстов (порог - similarity_threshold)
+    semantic_cache_enabled: bool = False
+    semantic_cache_max_entries: int = 2000  # на каждое пространство ключей
+    semantic_cache_max_age: int = 86400  # 1 день
+    
+    # Индекс сюжетов (поиск дубликатов и кластеризация опубликованных статей)
+    story_index_dir: str = "./story_index"
+    story_index_block_size: int = 8192
+    story_duplicate_threshold: float = 0.85
+    story_duplicate_days: float = 3
+    
+    # HTTP-клиент загрузки страниц (общий пул соединений с keep-alive)
+    http_timeout: float = 60.0
+    http_connect_timeout: float = 10.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_max_connections_per_host: int = 6
+    http2_enabled: bool = False  # требует пакет h2 (httpx[http2])
+    http_max_page_kb: int = 2048  # страницы больше читаются до лимита и обрезаются по границе тега
+    
+    # Кэш загруженных страниц (память + диск, условные запросы по ETag/Last-Modified)
+    page_cache_enabled: bool = True
+    page_cache_dir: str = "./page_cache"
+    page_cache_max_entries: int = 256  # записей в памяти
+    page_cache_max_disk_mb: int = 512
+    page_cache_max_entry_kb: int = 4096  # страницы больше не кэшируются
+    page_cache_fresh_seconds: float = 600  # без повторной проверки на сайте
+    
+    # Извлечение текста из HTML в пуле процессов (0 - в потоке без отдельных процессов)
+    extraction_workers: int = 2
+    extraction_timeout: float = 20.0  # секунд на документ
+    
+    # Пакетная суммаризация по URL (/api/v1/summarize-urls)
+    bulk_max_urls: int = 200
+    bulk_max_concurrency: int = 16  # одновременных загрузок всего
+    bulk_per_host_concurrency: int = 2  # одновременных загрузок с одного сайта
+    bulk_batch_window_ms: int = 200  # окно сбора текстов в батч суммаризации
+    
+    # Фоновые задачи (/api/v1/jobs): очередь в SQLite переживает перезапуск
+    jobs_enabled: bool = True
+    jobs_db_path: str = "./jobs.sqlite3"
+    job_workers: Optional[int] = None  # воркеров, разбирающих очередь (по умолчанию inference_slots)
+    job_poll_interval: float = 1.0
+    job_max_attempts: int = 3  # попыток на задачу (повтор после ошибки и после перезапуска)
+    job_retry_backoff: float = 5.0  # задержка первого повтора, секунд (дальше удваивается)
+    job_webhook_timeout: float = 10.0
+    job_webhook_allowed_hosts: Optional[str] = None  # через запятую: хосты, разрешённые даже во внутренней сети
+    
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
@@ -60,5 +150,26 @@ class Settings(BaseSettings):
         case_sensitive = False
 
 
-settings = Settings()
+def apply_profile(settings: Settings) -> Settings:
+    """Применение профиля хоста к настройкам, не заданным явно"""
+    if not settings.ml_profile_path:
+        return settings
+    path = Path(settings.ml_profile_path)
+    if not path.exists():
+        return settings
+    try:
+        profile = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Не удалось прочитать профиль {path}: {e}")
+        return settings
+    
+    for name, value in profile.items():
+        # Служебные ключи профиля (результаты калибровки) начинаются с "_"
+        if name.startswith("_") or name not in Settings.model_fields or name in settings.model_fields_set:
+            continue
+        setattr(settings, name, value)
+    return settings
+
+
+settings = apply_profile(Settings())
 
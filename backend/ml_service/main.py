@@ -1,9 +1,13 @@
 """Главный файл FastAPI приложения"""
+# Замер времени импортов: устанавливается до импорта остальных модулей
+from utils.startup_timing import startup_timing
+startup_timing.install()
+
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
-from api.routes import paraphrase, summarize, summarize_url, process, similarity, health
+from api.routes import paraphrase, summarize, summarize_url, summarize_urls, process, extract, similarity, health, metrics, embed, stories, jobs
 from config import settings
 
 
@@ -11,65 +15,103 @@ from config import settings
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
     # Startup
-    print(f"ML Service запущен на {settings.api_host}:{settings.api_port}")
-    print(f"Модель: {settings.ml_model_name}")
-    print(f"Кэш: {'включен' if settings.cache_enabled else 'выключен'}")
-    print(f"Автозагрузка моделей: {'включена' if settings.auto_download_models else 'выключена'}")
-    
-    # Предзагрузка моделей при старте (если включена)
-    if settings.preload_models:
-        print("\n🔄 Предзагрузка моделей...")
-        print("Это может занять 10-20 минут при первом запуске...\n")
-        import gc
-        import time
-        import torch
-        from services.text_processor import TextProcessor
-        processor = TextProcessor()
+    try:
+        startup_timing.mark("imports")
+        print(f"ML Service запущен на {settings.api_host}:{settings.api_port}")
+        print(f"Модель: {settings.ml_model_name}")
+        print(f"Кэш: {'включен' if settings.cache_enabled else 'выключен'}")
+        print(f"Автозагрузка моделей: {'включена' if settings.auto_download_models else 'выключена'}")
         
-        def cleanup_memory():
-            """Очистка памяти после загрузки модели"""
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-            time.sleep(2)  # Небольшая пауза для освобождения памяти
+        # Потоки torch/OpenMP/токенизаторов на слот инференса (до первого импорта torch)
+        from services.cpu_threads import cpu_threads
+        cpu_threads.configure_environment()
+        print(cpu_threads.summary())
         
-        # Парафразирование (русская модель)
-        print("📥 Загрузка модели парафразирования (русский)...")
-        try:
-            processor._load_paraphrase_model('ru')
-            print("✅ Модель парафразирования (ru) загружена")
-            cleanup_memory()
-        except Exception as e:
-            print(f"❌ Ошибка загрузки модели парафразирования (ru): {e}")
-            cleanup_memory()
+        # Предзагрузка моделей при старте (если включена)
+        if settings.preload_models:
+            print("\n🔄 Предзагрузка моделей...")
+            print("Это может занять 10-20 минут при первом запуске...\n")
+            import gc
+            import time
+            from services.model_manager import import_torch
+            from services.text_processor import get_text_processor, ensure_transformers
+            processor = get_text_processor()
+            # torch импортируется через model_manager: потоки настраиваются до и после импорта
+            torch = import_torch() if ensure_transformers() else None
+            
+            def cleanup_memory():
+                """Очистка памяти после загрузки модели"""
+                gc.collect()
+                if torch is not None and torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                time.sleep(2)  # Небольшая пауза для освобождения памяти
+            
+            # Парафразирование (русская модель)
+            print("📥 Загрузка модели парафразирования (русский)...")
+            try:
+                processor._load_paraphrase_model('ru')
+                print("✅ Модель парафразирования (ru) загружена")
+                cleanup_memory()
+            except Exception as e:
+                print(f"❌ Ошибка загрузки модели парафразирования (ru): {e}")
+                cleanup_memory()
+            
+            # Парафразирование (английская модель)
+            print("📥 Загрузка модели парафразирования (английский)...")
+            try:
+                processor._load_paraphrase_model('en')
+                print("✅ Модель парафразирования (en) загружена")
+                cleanup_memory()
+            except Exception as e:
+                print(f"⚠️  Модель парафразирования (en) не загружена: {e}")
+                cleanup_memory()
+            
+            # Суммаризация (русская модель)
+            print("📥 Загрузка модели суммаризации (русский)...")
+            try:
+                processor._load_summary_model_ru()
+                print("✅ Модель суммаризации (ru) загружена")
+                cleanup_memory()
+            except Exception as e:
+                print(f"❌ Ошибка загрузки модели суммаризации (ru): {e}")
+                cleanup_memory()
+            
+            print("\n✨ Предзагрузка завершена! Все модели готовы к работе.\n")
+            startup_timing.mark("preload_models")
+        else:
+            print("⚡ Режим Lazy Loading: модели будут загружены при первом запросе\n")
         
-        # Парафразирование (английская модель)
-        print("📥 Загрузка модели парафразирования (английский)...")
-        try:
-            processor._load_paraphrase_model('en')
-            print("✅ Модель парафразирования (en) загружена")
-            cleanup_memory()
-        except Exception as e:
-            print(f"⚠️  Модель парафразирования (en) не загружена: {e}")
-            cleanup_memory()
+        # Общий HTTP-клиент для загрузки страниц
+        from services.http_client import http_client
+        from services.content_extractor import extraction_pool
+        await http_client.start()
+        startup_timing.mark("http_client")
         
-        # Суммаризация (русская модель)
-        print("📥 Загрузка модели суммаризации (русский)...")
-        try:
-            processor._load_summary_model_ru()
-            print("✅ Модель суммаризации (ru) загружена")
-            cleanup_memory()
-        except Exception as e:
-            print(f"❌ Ошибка загрузки модели суммаризации (ru): {e}")
-            cleanup_memory()
+        # Воркеры фоновых задач (очередь в SQLite, незавершённые задачи возвращаются в очередь)
+        if settings.jobs_enabled:
+            from services.job_queue import job_workers
+            job_workers.start()
+            startup_timing.mark("job_workers")
         
-        print("\n✨ Предзагрузка завершена! Все модели готовы к работе.\n")
-    else:
-        print("⚡ Режим Lazy Loading: модели будут загружены при первом запросе\n")
-    
-    print("Сервер готов к работе!")
+        from services.model_registry import model_registry
+        model_registry.startup_complete = True
+        
+        # Разбивка времени запуска (один раз; дальше импорты не замеряются)
+        from services.metrics import metrics as metrics_registry
+        print(startup_timing.report())
+        metrics_registry.register("startup", startup_timing.stats)
+        print("Сервер готов к работе!")
+    finally:
+        # Подмена __import__ снимается и при неудачном старте (report() при успехе уже снял её)
+        startup_timing.uninstall()
     yield
     # Shutdown
+    model_registry.startup_complete = False
+    if settings.jobs_enabled:
+        job_workers.stop()
+    model_registry.shutdown()
+    await http_client.close()
+    extraction_pool.shutdown()
     print("ML Service остановлен")
 
 
@@ -126,11 +168,17 @@ async def root():
         "test_page": "/test",
         "health": "/health",
         "endpoints": {
-            "health": "/health",
+            "health": "/health, /health/live, /health/ready",
+            "metrics": "/metrics",
             "paraphrase": "/api/v1/paraphrase (POST)",
             "summarize": "/api/v1/summarize (POST)",
+            "summarize_urls": "/api/v1/summarize-urls (POST, NDJSON)",
             "process": "/api/v1/process (POST)",
-            "similarity": "/api/v1/similarity (POST)"
+            "extract": "/api/v1/extract (POST)",
+            "similarity": "/api/v1/similarity (POST)",
+            "embed": "/api/v1/embed (POST)",
+            "stories": "/api/v1/stories/check, /api/v1/stories/assign (POST)",
+            "jobs": "/api/v1/jobs (POST), /api/v1/jobs/{job_id} (GET)"
         },
         "note": "POST endpoints требуют тело запроса. Используйте /docs или /test для тестирования"
     }
@@ -307,11 +355,17 @@ async def test_page():
 
 # Подключение роутов
 app.include_router(health.router, tags=["Health"])
+app.include_router(metrics.router, tags=["Metrics"])
 app.include_router(paraphrase.router, prefix="/api/v1", tags=["Paraphrase"])
 app.include_router(summarize.router, prefix="/api/v1", tags=["Summarize"])
 app.include_router(summarize_url.router, prefix="/api/v1", tags=["Summarize URL"])
+app.include_router(summarize_urls.router, prefix="/api/v1", tags=["Summarize URL"])
 app.include_router(process.router, prefix="/api/v1", tags=["Process"])
+app.include_router(extract.router, prefix="/api/v1", tags=["Extract"])
 app.include_router(similarity.router, prefix="/api/v1", tags=["Similarity"])
+app.include_router(embed.router, prefix="/api/v1", tags=["Embeddings"])
+app.include_router(stories.router, prefix="/api/v1", tags=["Stories"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["Jobs"])
 
 
 if __name__ == "__main__":
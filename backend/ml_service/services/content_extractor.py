@@ -1,83 +1,269 @@
 """Сервис для извлечения контента из URL"""
-import trafilatura
-import httpx
-from typing import Dict, Optional
-from langdetect import detect
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Set, Tuple
+import asyncio
+import multiprocessing
+import threading
+import time
 import logging
 
+from config import settings
+from services.html_extraction import extract_document
+from services.metrics import metrics
+from services.page_cache import page_cache
+from services.sentence_cache import source_domain
+
 logger = logging.getLogger(__name__)
 
 
+class _Slots:
+    """Семафор, общий для нескольких event loop
+
+    Пул извлечения вызывается из основного loop сервиса и из loop каждого
+    воркера фоновых задач, а asyncio.Semaphore привязан к одному loop и не
+    потокобезопасен. Здесь счётчик защищён threading.Lock, ожидающий
+    получает слот через future своего loop (call_soon_threadsafe).
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters: "deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]" = deque()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            if not queued and not waiter[1].cancelled():
+                # Слот уже получен, но вызов отменён - возвращаем слот следующему
+                # (отменённую future с переданным слотом освобождает _grant)
+                self._release()
+            raise
+
+    async def __aexit__(self, *exc_info):
+        self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:
+                    continue  # loop ожидающего уже закрыт
+            self._value += 1
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            # Ожидающий отменён после передачи слота: слот идёт следующему
+            self._release()
+        else:
+            future.set_result(None)
+
+
+class ExtractionPool:
+    """Пул процессов для извлечения текста из HTML
+
+    trafilatura, readability и BeautifulSoup - тяжёлые синхронные вызовы:
+    большая страница блокировала бы event loop на сотни миллисекунд.
+    Извлечение выполняется в отдельных процессах (spawn), туда уходят
+    только байты HTML, обратно - словарь с результатом.
+
+    Процесс, не уложившийся в таймаут документа, нельзя прервать точечно,
+    поэтому пул пересоздаётся (процессы завершаются). Документы, которые
+    выполнялись в пуле, пересозданном из-за чужого таймаута, заново
+    отправляются в новый пул: это не считается их ошибкой, и их таймаут
+    отсчитывается заново. Если пул сломался сам (процесс упал), документ
+    повторяется один раз. В пул одновременно отправляется не больше
+    workers документов: остальные ждут свободный процесс вне пула, поэтому
+    таймаут считается от начала извлечения, а не от постановки в очередь,
+    и пересоздание пула задевает только выполнявшиеся документы. Лимит
+    общий для основного loop и loop воркеров задач. При workers=0 извлечение идёт в потоке (без
+    отдельных процессов). Время извлечения считается по доменам (не больше
+    max_domains последних доменов).
+    """
+
+    # Сколько раз документ переотправляется из-за чужих таймаутов
+    MAX_RESUBMITS = 3
+
+    def __init__(self, workers: int, timeout: float, max_domains: int = 500):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_domains = max_domains
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        self._timed_out: Set[int] = set()  # поколения пулов, завершённых по таймауту
+        self._resubmitted = 0
+        self._slots = _Slots(max(1, workers))
+        self._lock = threading.Lock()
+        self._domains: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+
+    def _get_pool(self):
+        """Текущий пул и номер его поколения"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                self._generation += 1
+            return self._pool, self._generation
+
+    def _recycle(self, pool: ProcessPoolExecutor, generation: int, timed_out: bool = False) -> None:
+        """Завершение зависшего или сломанного пула (следующий вызов создаст новый)"""
+        with self._lock:
+            if timed_out:
+                # Документы в пуле живут не дольше нескольких поколений - старые не нужны
+                self._timed_out = {g for g in self._timed_out if g > self._generation - 16}
+                self._timed_out.add(generation)
+            if self._pool is not pool:
+                return
+            self._pool = None
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _record(self, domain: str, seconds: float, field: Optional[str] = None) -> None:
+        with self._lock:
+            stats = self._domains.get(domain)
+            if stats is None:
+                stats = self._domains[domain] = {
+                    "documents": 0, "seconds": 0.0, "max_seconds": 0.0, "timeouts": 0, "errors": 0
+                }
+                while len(self._domains) > self.max_domains:
+                    self._domains.popitem(last=False)
+            self._domains.move_to_end(domain)
+            stats["documents"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if field:
+                stats[field] += 1
+        metrics.observe("extraction.seconds", seconds)
+
+    async def extract(self, url: str, content: bytes, encoding: Optional[str]) -> Dict:
+        """Извлечение статьи (текст, заголовок, изображение, дата, язык) в процессе пула, с таймаутом"""
+        loop = asyncio.get_running_loop()
+        domain = source_domain(url)
+        start = time.perf_counter()
+        try:
+            if self.workers <= 0:
+                result = await asyncio.wait_for(
+                    asyncio.to_thread(extract_document, content, encoding, url),
+                    self.timeout
+                )
+            else:
+                result = await self._extract_in_pool(loop, url, content, encoding)
+        except asyncio.TimeoutError:
+            self._record(domain, time.perf_counter() - start, "timeouts")
+            raise ValueError(f"Извлечение текста не уложилось в {self.timeout:g} с")
+        except Exception:
+            self._record(domain, time.perf_counter() - start, "errors")
+            raise
+        self._record(domain, time.perf_counter() - start)
+        return result
+
+    async def _extract_in_pool(self, loop, url: str, content: bytes, encoding: Optional[str]) -> Dict:
+        async with self._slots:
+            return await self._submit(loop, url, content, encoding)
+
+    async def _submit(self, loop, url: str, content: bytes, encoding: Optional[str]) -> Dict:
+        crashes = resubmits = 0
+        while True:
+            pool, generation = self._get_pool()
+            future = loop.run_in_executor(pool, extract_document, content, encoding, url)
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self._recycle(pool, generation, timed_out=True)
+                raise
+            except BrokenProcessPool:
+                with self._lock:
+                    foreign_timeout = generation in self._timed_out
+                if foreign_timeout and resubmits < self.MAX_RESUBMITS:
+                    # Пул завершён из-за таймаута другого документа - не ошибка этого
+                    resubmits += 1
+                    with self._lock:
+                        self._resubmitted += 1
+                    continue
+                # Процесс пула упал - пул пересоздаётся, документ повторяется один раз
+                self._recycle(pool, generation)
+                crashes += 1
+                if crashes > 1 or foreign_timeout:
+                    raise
+
+    def stats(self) -> dict:
+        """Время извлечения по доменам"""
+        with self._lock:
+            domains = {
+                domain: dict(
+                    stats,
+                    seconds=round(stats["seconds"], 3),
+                    max_seconds=round(stats["max_seconds"], 3),
+                    avg_seconds=round(stats["seconds"] / stats["documents"], 3)
+                )
+                for domain, stats in self._domains.items()
+            }
+            return {
+                "workers": self.workers,
+                "timeout": self.timeout,
+                "pool_running": self._pool is not None,
+                "pool_generation": self._generation,
+                "resubmitted": self._resubmitted,
+                "domains": domains
+            }
+
+
+# Глобальный пул извлечения (останавливается в lifespan приложения)
+extraction_pool = ExtractionPool(workers=settings.extraction_workers, timeout=settings.extraction_timeout)
+metrics.register("html_extraction", extraction_pool.stats)
+
+
 class ContentExtractor:
     """Извлечение контента из веб-страниц"""
-    
+
     async def extract_from_url(self, url: str) -> Dict:
         """
         Извлечение текста из URL
-        
+
         Args:
             url: URL страницы
-            
+
         Returns:
-            Dict с текстом, заголовком, языком
+            Dict с текстом, заголовком, изображением, датой публикации и языком
         """
         try:
-            # Загрузка страницы с увеличенным таймаутом для медленных сайтов
-            timeout = httpx.Timeout(60.0, connect=10.0)  # 60 сек на запрос, 10 сек на подключение
-            async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                html_content = response.text
-            
-            # Извлечение текста с помощью trafilatura
-            extracted = trafilatura.extract(
-                html_content,
-                include_comments=False,
-                include_tables=False,
-                include_images=False,
-                include_links=False
-            )
-            
-            if not extracted:
-                # Fallback: попытка через readability
-                from readability import Document
-                doc = Document(html_content)
-                extracted = doc.summary()
-                # Удаление HTML тегов
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(extracted, 'html.parser')
-                extracted = soup.get_text()
-            
-            if not extracted:
-                raise ValueError("Не удалось извлечь текст из страницы")
-            
-            # Ограничение размера (защита от очень больших страниц)
-            max_length = 50000
-            if len(extracted) > max_length:
-                extracted = extracted[:max_length] + "..."
-            
-            # Определение языка
-            try:
-                language = detect(extracted)
-            except:
-                language = "ru"  # По умолчанию русский
-            
-            # Извлечение заголовка
-            try:
-                metadata = trafilatura.extract_metadata(html_content)
-                title = metadata.title if metadata and hasattr(metadata, 'title') else ''
-            except Exception as e:
-                logger.warning(f"Не удалось извлечь заголовок: {e}")
-                title = ''
-            
-            return {
-                "text": extracted.strip(),
-                "title": title or '',
-                "language": language,
-                "url": url
-            }
-            
+            # Загрузка страницы через кэш (повторные запросы - условные, без загрузки тела)
+            page = await page_cache.fetch(url)
+            cached = page.derived.get("article")
+            if cached:
+                return dict(cached, url=url)
+
+            # Разбор HTML - в пуле процессов, event loop не блокируется
+            result = await extraction_pool.extract(url, page.content, page.encoding)
+            result["url"] = url
+            await page_cache.set_derived(page, "article", result)
+            return result
+
         except Exception as e:
             logger.error(f"Ошибка при извлечении контента из {url}: {str(e)}")
             raise ValueError(f"Не удалось извлечь контент: {str(e)}")
-
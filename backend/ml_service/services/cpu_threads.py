@@ -0,0 +1,150 @@
+"""Потоки CPU для torch и токенизаторов
+
+По умолчанию torch запускает по потоку intra-op на каждое ядро хоста,
+OpenMP/MKL - свои пулы того же размера, а быстрые токенизаторы - пул
+потоков Rust. Когда параллельно работают несколько слотов инференса
+(воркеры задач, батчи /summarize-urls), потоков становится в разы
+больше, чем ядер в квоте контейнера, и пропускная способность резко
+падает. Здесь число потоков считается на один слот инференса от
+доступных процессу CPU (с учётом affinity и квоты cgroup) и
+одинаково применяется при каждой загрузке модели.
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+import os
+import sys
+import threading
+import logging
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def available_cpus() -> int:
+    """CPU, доступные процессу: affinity и квота cgroup (cpu.max / cfs_quota)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" или "max <period>"
+        value, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if value != "max":
+            quota = int(value) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            value = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+            period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+            if value > 0:
+                quota = value / period
+        except (OSError, ValueError):
+            pass
+
+    if quota:
+        cpus = min(cpus, max(1, int(quota)))
+    return max(1, cpus)
+
+
+class CpuThreads:
+    """Расчёт и применение числа потоков на слот инференса
+
+    intra-op: TORCH_INTRA_OP_THREADS или (доступные CPU / INFERENCE_SLOTS);
+    inter-op: TORCH_INTER_OP_THREADS или 1 (generate() почти не использует
+    параллелизм между операциями); токенизаторы: TOKENIZERS_PARALLELISM,
+    при включении - столько же потоков, сколько intra-op.
+
+    Делитель - только INFERENCE_SLOTS, без JOB_WORKERS: генерация из
+    запросов API, воркеров фоновых задач и /summarize-urls выполняется в
+    общем пуле потоков инференса (model_registry.run) размером
+    INFERENCE_SLOTS, поэтому одновременно torch генерирует не больше
+    INFERENCE_SLOTS вызовов при любом числе воркеров задач.
+
+    Переменные окружения OpenMP/MKL/токенизаторов читаются библиотеками
+    при импорте, поэтому configure_environment() вызывается до импорта
+    torch; apply_torch() - после импорта, при загрузке модели.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._applied = False
+        self._error: Optional[str] = None
+
+    def plan(self) -> Dict:
+        """Желаемое число потоков из настроек и доступных CPU"""
+        cpus = available_cpus()
+        # Столько же потоков в пуле инференса model_registry (воркеры задач ждут в нём)
+        slots = max(1, settings.inference_slots)
+        intra = settings.torch_intra_op_threads or max(1, cpus // slots)
+        return {
+            "cpus": cpus,
+            "inference_slots": slots,
+            "intra_op_threads": intra,
+            "inter_op_threads": settings.torch_inter_op_threads or 1,
+            "tokenizers_parallelism": settings.tokenizers_parallelism,
+            "tokenizers_threads": intra if settings.tokenizers_parallelism else 1
+        }
+
+    def configure_environment(self) -> None:
+        """Переменные окружения для OpenMP/MKL и токенизаторов (до импорта torch)
+
+        Явно заданные переменные окружения не перезаписываются.
+        """
+        plan = self.plan()
+        os.environ.setdefault("OMP_NUM_THREADS", str(plan["intra_op_threads"]))
+        os.environ.setdefault("MKL_NUM_THREADS", str(plan["intra_op_threads"]))
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "true" if plan["tokenizers_parallelism"] else "false")
+        if plan["tokenizers_parallelism"]:
+            os.environ.setdefault("RAYON_NUM_THREADS", str(plan["tokenizers_threads"]))
+
+    def apply_torch(self, torch) -> None:
+        """Применение числа потоков к torch (один раз на процесс)"""
+        with self._lock:
+            if self._applied:
+                return
+            self._applied = True
+            plan = self.plan()
+            torch.set_num_threads(plan["intra_op_threads"])
+            try:
+                # Допустимо только до первой параллельной операции torch
+                torch.set_num_interop_threads(plan["inter_op_threads"])
+            except RuntimeError as e:
+                self._error = str(e)
+                logger.warning(f"Не удалось задать число inter-op потоков torch: {e}")
+
+    def effective(self) -> Dict:
+        """Фактическая конфигурация (для старта, /health и /metrics)"""
+        config = self.plan()
+        config["environment"] = {
+            name: os.environ.get(name)
+            for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "TOKENIZERS_PARALLELISM", "RAYON_NUM_THREADS")
+        }
+        # torch не импортируется ради отчёта: до загрузки модели его может не быть
+        torch = sys.modules.get("torch")
+        if torch is not None and hasattr(torch, "get_num_threads"):
+            config["torch_intra_op_threads"] = torch.get_num_threads()
+            config["torch_inter_op_threads"] = torch.get_num_interop_threads()
+        if self._error:
+            config["error"] = self._error
+        return config
+
+    def summary(self) -> str:
+        """Строка для вывода при старте"""
+        plan = self.plan()
+        tokenizers = f"{plan['tokenizers_threads']} потоков" if plan["tokenizers_parallelism"] else "без параллелизма"
+        return (
+            f"Потоки CPU: доступно {plan['cpus']}, слотов инференса {plan['inference_slots']}, "
+            f"torch intra-op {plan['intra_op_threads']}, inter-op {plan['inter_op_threads']}, "
+            f"токенизаторы {tokenizers}"
+        )
+
+
+# Глобальная конфигурация потоков
+cpu_threads = CpuThreads()
+metrics.register("cpu_threads", cpu_threads.effective)
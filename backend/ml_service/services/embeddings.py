@@ -0,0 +1,108 @@
+"""Сервис эмбеддингов на общей модели схожести"""
+from collections import OrderedDict
+from typing import List
+import hashlib
+import threading
+import logging
+
+import numpy as np
+
+from config import settings
+from services.metrics import metrics
+from services.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    """Батчевое кодирование текстов с LRU-кэшем векторов
+
+    Использует общую модель схожести из model_manager, поэтому
+    дедупликации и поиску не нужны собственные копии модели.
+    Векторы нормированы (косинусная близость = скалярное произведение).
+    """
+
+    def __init__(self, max_entries: int, batch_size: int):
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def encode_uncached(self, texts: List[str], batch_size: int = None) -> np.ndarray:
+        """Кодирование моделью без кэша (матрица n x d, float32)"""
+        from services.model_manager import model_manager
+
+        model = model_manager.load_similarity_model()
+        with model_registry.inference("embed"):
+            vectors = model.encode(
+                texts,
+                batch_size=batch_size or self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        return vectors.astype(np.float32, copy=False)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Кодирование с кэшем: в модель уходят только уникальные промахи"""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = vector
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        hits = len(texts) - sum(1 for key in keys if key in missing)
+        metrics.increment("embeddings.cache_hits", hits)
+        metrics.increment("embeddings.cache_misses", len(texts) - hits)
+
+        if missing:
+            vectors = self.encode_uncached(list(missing.values()))
+            with self._lock:
+                for key, vector in zip(missing.keys(), vectors):
+                    # Копия строки: срез держал бы в памяти всю матрицу батча
+                    vector = vector.copy()
+                    found[key] = vector
+                    self._cache[key] = vector
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        with self._lock:
+            self._hits += hits
+            self._misses += len(texts) - hits
+
+        return np.stack([found[key] for key in keys])
+
+    def stats(self) -> dict:
+        """Статистика кэша эмбеддингов"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "batch_size": self.batch_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0
+            }
+
+
+# Глобальный сервис эмбеддингов
+embedding_service = EmbeddingService(
+    max_entries=settings.embedding_cache_max_entries,
+    batch_size=settings.embedding_batch_size
+)
+metrics.register("embeddings", embedding_service.stats)
@@ -0,0 +1,108 @@
+"""Кэш выходов энкодера seq2seq моделей"""
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+import hashlib
+import threading
+import logging
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class EncoderCache:
+    """LRU-кэш выходов энкодера с ограничением по числу записей и памяти
+
+    Ключ - (имя модели, хэш входных токенов). Одна и та же статья часто
+    суммаризируется несколько раз с разной target_length, при попадании
+    в кэш энкодер (до 1024 токенов для mBART) не запускается повторно,
+    выполняется только декодирование.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name: str, input_ids) -> Tuple[str, str]:
+        """Ключ кэша по имени модели и тензору input_ids"""
+        digest = hashlib.sha1(input_ids.cpu().numpy().tobytes()).hexdigest()
+        return model_name, f"{tuple(input_ids.shape)}:{digest}"
+
+    @staticmethod
+    def _size_of(hidden_state) -> int:
+        return hidden_state.numel() * hidden_state.element_size()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Any]:
+        """Копия закэшированного last_hidden_state энкодера (None при промахе)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                metrics.increment("encoder_cache.misses")
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            metrics.increment("encoder_cache.hits")
+            hidden_state = entry[0]
+        # Вызывающий получает свою копию: изменения тензора не попадут в кэш
+        return hidden_state.clone()
+
+    def put(self, key: Tuple[str, str], hidden_state) -> None:
+        """Сохранение last_hidden_state энкодера с вытеснением старых записей
+
+        Хранится отвязанная от графа копия тензора, а не BaseModelOutput:
+        generate() подменяет last_hidden_state в переданной обёртке
+        расширенным под num_beams тензором, поэтому при каждом использовании
+        нужна новая обёртка. get() тоже возвращает копию, так что изменения
+        тензора вызывающим кодом кэш не портят.
+        """
+        size = self._size_of(hidden_state)
+        if size > self.max_bytes:
+            return
+        hidden_state = hidden_state.detach().clone()
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (hidden_state, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Очистка кэша"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Статистика кэша"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0
+            }
+
+
+# Глобальный кэш энкодера (общий для всех экземпляров TextProcessor)
+encoder_cache = EncoderCache(
+    max_entries=settings.encoder_cache_max_entries,
+    max_bytes=settings.encoder_cache_max_mb * 1024 * 1024
+)
+metrics.register("encoder_cache", encoder_cache.stats)
@@ -0,0 +1,128 @@
+"""Экстрактивное сжатие текста (TF-IDF на NumPy)"""
+from typing import Callable, List, Optional
+import re
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?…])\s+')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Разбиение текста на предложения"""
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(text.strip()) if s.strip()]
+
+
+def tokenize_words(text: str) -> List[str]:
+    """Значимые слова предложения (в нижнем регистре, длиннее 3 символов)"""
+    return [w for w in _WORD_RE.findall(text.lower()) if len(w) > 3]
+
+
+def score_sentences(sentences: List[str], lead_bonus: float = 0.05) -> np.ndarray:
+    """Оценка информативности предложений
+
+    Каждое предложение - документ в TF-IDF матрице; оценка - косинусная
+    близость предложения к центроиду всего текста плюс небольшой бонус
+    за позицию ближе к началу (лид новости).
+    """
+    n = len(sentences)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    vocabulary = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for word in tokenize_words(sentence):
+            rows.append(i)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    positions = np.arange(n, dtype=np.float32)
+    lead = lead_bonus / (positions + 1.0)
+    if not vocabulary:
+        return lead
+
+    counts = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    np.add.at(counts, (np.array(rows), np.array(cols)), 1.0)
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1.0 + n) / (1.0 + document_frequency)) + 1.0
+    row_sums = counts.sum(axis=1, keepdims=True)
+    tfidf = np.divide(counts, row_sums, out=np.zeros_like(counts), where=row_sums > 0) * idf
+
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+    centroid = tfidf.mean(axis=0)
+    centroid_norm = np.linalg.norm(centroid)
+    if centroid_norm > 0:
+        centroid /= centroid_norm
+
+    return tfidf @ centroid + lead
+
+
+def select_sentences(
+    sentences: List[str],
+    scores: np.ndarray,
+    costs: List[int],
+    budget: int
+) -> List[int]:
+    """Жадный выбор лучших предложений в пределах бюджета
+
+    Returns:
+        Индексы выбранных предложений в исходном порядке
+    """
+    selected = []
+    total = 0
+    for index in np.argsort(-scores, kind="stable"):
+        cost = costs[index]
+        if total + cost <= budget:
+            selected.append(int(index))
+            total += cost
+    return sorted(selected)
+
+
+def compress_to_token_budget(
+    text: str,
+    max_tokens: int,
+    count_tokens: Callable[[List[str]], List[int]]
+) -> str:
+    """Сжатие длинного текста до самых информативных предложений
+
+    Используется перед абстрактивной суммаризацией, чтобы окно модели
+    заполнялось важными предложениями со всего текста, а не только лидом.
+
+    Args:
+        text: Исходный текст
+        max_tokens: Бюджет в токенах модели
+        count_tokens: Функция, возвращающая число токенов для каждого предложения
+    """
+    sentences = split_sentences(text)
+    if len(sentences) < 2:
+        return text
+
+    costs = count_tokens(sentences)
+    if sum(costs) <= max_tokens:
+        return text
+
+    selected = select_sentences(sentences, score_sentences(sentences), costs, max_tokens)
+    if not selected:
+        return text
+    logger.info(f"Экстрактивное сжатие: {len(sentences)} -> {len(selected)} предложений")
+    return ' '.join(sentences[i] for i in selected)
+
+
+def extractive_summary(text: str, target_length: Optional[int] = None) -> str:
+    """Быстрое экстрактивное саммари заданной длины (в символах)"""
+    sentences = split_sentences(text)
+    if not sentences:
+        return text.strip()
+
+    target_length = target_length or 600
+    costs = [len(s) + 1 for s in sentences]
+    selected = select_sentences(sentences, score_sentences(sentences), costs, target_length + 1)
+    if not selected:
+        # Даже лучшее предложение длиннее цели - берём его целиком
+        selected = [int(np.argmax(score_sentences(sentences)))]
+    return ' '.join(sentences[i] for i in selected)
@@ -0,0 +1,118 @@
+"""Извлечение статьи из HTML (выполняется в процессах пула извлечения)
+
+Модуль намеренно не импортирует настройки, кэши и модели: он загружается
+в каждом процессе пула, а через границу процессов передаются только
+байты HTML и словарь с результатом.
+"""
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _language_hints(tree) -> List[str]:
+    """Языки, объявленные страницей (<html lang>, og:locale, content-language)"""
+    hints = []
+    values = tree.xpath(
+        "/html/@lang | //meta[@property='og:locale']/@content"
+        " | //meta[translate(@http-equiv, 'CONTENT-LANGUAGE', 'content-language')='content-language']/@content"
+    )
+    for value in values:
+        code = str(value).strip().replace('_', '-').split('-')[0].lower()
+        if code and code not in hints:
+            hints.append(code)
+    return hints
+
+
+def _fallback_text(tree) -> str:
+    """Текст через readability по уже разобранному дереву (если trafilatura не справилась)"""
+    from lxml import html as lxml_html
+    from readability import Document
+
+    summary = Document(tree).summary(html_partial=True)
+    return lxml_html.fromstring(summary).text_content() if summary else ''
+
+
+def extract_document(content: bytes, encoding: Optional[str], url: Optional[str] = None,
+                     max_length: int = 50000) -> Dict:
+    """
+    Текст, заголовок, главное изображение, дата и язык статьи за один разбор HTML
+
+    Документ разбирается в дерево один раз; подсказки языка читаются из
+    дерева, trafilatura извлекает основной текст и метаданные (заголовок,
+    og:image, дату публикации) из него же, readability при неудаче
+    работает с тем же деревом.
+
+    Args:
+        content: тело страницы
+        encoding: кодировка из заголовков ответа (None - определяется по документу)
+        url: URL страницы (для абсолютных ссылок на изображение)
+        max_length: ограничение длины текста (защита от очень больших страниц)
+
+    Returns:
+        Dict с полями text, title, image, date, language, language_hints
+    """
+    import trafilatura
+    from trafilatura.metadata import extract_metadata
+    from trafilatura.utils import load_html
+    from langdetect import detect
+
+    tree = load_html(content.decode(encoding, errors="replace") if encoding else content)
+    if tree is None:
+        raise ValueError("Не удалось разобрать HTML страницы")
+
+    hints = _language_hints(tree)
+
+    # Основной текст и метаданные за один проход trafilatura (дерево копируется внутри)
+    document = trafilatura.bare_extraction(
+        tree,
+        url=url,
+        with_metadata=True,
+        include_comments=False,
+        include_tables=False,
+        include_images=False,
+        include_links=False
+    )
+    if document is not None and not isinstance(document, dict):
+        document = document.as_dict()
+
+    extracted = (document or {}).get("text") or ''
+    if not extracted:
+        # trafilatura не нашла основной текст: метаданные и текст - из того же дерева
+        try:
+            metadata = extract_metadata(tree, url)
+            document = metadata.as_dict() if metadata is not None and hasattr(metadata, "as_dict") else (metadata or {})
+        except Exception as e:
+            logger.warning(f"Не удалось извлечь метаданные: {e}")
+            document = {}
+        try:
+            extracted = _fallback_text(tree)
+        except Exception as e:
+            logger.warning(f"readability не смогла извлечь текст: {e}")
+
+    extracted = extracted.strip()
+    if not extracted:
+        raise ValueError("Не удалось извлечь текст из страницы")
+
+    if len(extracted) > max_length:
+        extracted = extracted[:max_length] + "..."
+
+    # Определение языка: по тексту, при неудаче - объявленный страницей
+    try:
+        language = detect(extracted)
+    except Exception:
+        language = hints[0] if hints else "ru"  # По умолчанию русский
+
+    image = document.get("image") or None
+    if image and url:
+        image = urljoin(url, image)
+
+    return {
+        "text": extracted,
+        "title": document.get("title") or '',
+        "image": image,
+        "date": document.get("date") or None,
+        "language": language,
+        "language_hints": hints
+    }
@@ -0,0 +1,233 @@
+"""Общий HTTP-клиент для загрузки страниц (пул соединений, keep-alive)"""
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import asyncio
+import threading
+import logging
+
+import httpx
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Типы содержимого, которые имеет смысл разбирать как статью (пустой - не указан сервером)
+HTML_CONTENT_TYPES = ("", "text/html", "application/xhtml+xml", "application/xml", "text/xml", "text/plain")
+
+
+def safe_cut(body: bytes) -> bytes:
+    """Обрезка HTML по границе тега
+
+    Срез по последнему '>' не разрывает тег и многобайтовый символ UTF-8
+    (байт '>' не встречается внутри многобайтовых последовательностей).
+    Если подходящей границы нет во второй половине, срез остаётся как есть.
+    """
+    position = body.rfind(b">")
+    return body[:position + 1] if position >= len(body) // 2 else body
+
+
+class PageDownload:
+    """Загруженная страница: статус, заголовки и тело, ограниченное по размеру"""
+
+    def __init__(self, response: httpx.Response, content: bytes = b"", truncated: bool = False):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.charset_encoding = response.charset_encoding
+        self.content = content
+        self.truncated = truncated
+
+    def raise_for_status(self) -> None:
+        self.response.raise_for_status()
+
+
+class HttpClientPool:
+    """Долгоживущий httpx.AsyncClient, общий для всех загрузок URL
+
+    Соединения (DNS, TCP, TLS) переиспользуются между запросами к одному
+    сайту. Клиент и семафоры привязаны к event loop, поэтому на каждый
+    loop (основной сервиса и loop каждого воркера фоновых задач) создаётся
+    свой экземпляр. Клиент основного loop открывается и закрывается в
+    lifespan приложения, остальные создаются при первом обращении.
+
+    Число одновременных запросов к одному хосту ограничено семафором
+    (httpx ограничивает только общий размер пула).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._host_limits: Dict[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._stats = {
+            "requests": 0,
+            "errors": 0,
+            "connections_opened": 0,
+            "tls_handshakes": 0,
+            "truncated_pages": 0,
+            "rejected_content_type": 0,
+            "rejected_binary": 0
+        }
+
+    def _create_client(self) -> httpx.AsyncClient:
+        http2 = settings.http2_enabled
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 включен, но пакет h2 не установлен (pip install httpx[http2]). Используется HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry
+            ),
+            http2=http2,
+            follow_redirects=True
+        )
+
+    def client(self) -> httpx.AsyncClient:
+        """Клиент текущего event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                client = self._create_client()
+                self._clients[loop] = client
+                self._host_limits[loop] = {}
+            return client
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            limits = self._host_limits.setdefault(loop, {})
+            semaphore = limits.get(host)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(settings.http_max_connections_per_host)
+                limits[host] = semaphore
+            return semaphore
+
+    async def start(self) -> None:
+        """Создание клиента текущего event loop (вызывается в lifespan)"""
+        self.client()
+
+    async def close(self) -> None:
+        """Закрытие клиента текущего event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.pop(loop, None)
+            self._host_limits.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += value
+
+    async def _trace(self, event: str, info: dict) -> None:
+        """Трассировка httpcore: считаем новые соединения и TLS-рукопожатия"""
+        if event == "connection.connect_tcp.complete":
+            self._count("connections_opened")
+        elif event == "connection.start_tls.complete":
+            self._count("tls_handshakes")
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str):
+        """Слот запроса к хосту: семафор хоста и учёт запросов в полёте"""
+        host = urlsplit(url).hostname or ""
+        async with self._host_semaphore(host):
+            with self._lock:
+                self._in_flight[host] = self._in_flight.get(host, 0) + 1
+                self._stats["requests"] += 1
+            try:
+                yield
+            except Exception:
+                self._count("errors")
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight[host] -= 1
+                    if not self._in_flight[host]:
+                        del self._in_flight[host]
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET через общий пул с ограничением параллельности на хост"""
+        client = self.client()
+        extensions = dict(kwargs.pop("extensions", None) or {}, trace=self._trace)
+        async with self._host_slot(url):
+            return await client.get(url, extensions=extensions, **kwargs)
+
+    async def fetch_page(self, url: str, headers: Optional[Dict[str, str]] = None,
+                         max_bytes: Optional[int] = None) -> PageDownload:
+        """Потоковая загрузка HTML-страницы с ограничением размера
+
+        Тело читается, только если ответ успешный и Content-Type похож на
+        HTML. Чтение останавливается на max_bytes (по умолчанию
+        HTTP_MAX_PAGE_KB), и страница обрезается по границе тега: огромная
+        страница или неверно размеченный бинарный файл не буферизуются
+        целиком. Бинарное содержимое (нулевые байты в начале) отклоняется.
+        """
+        max_bytes = max_bytes or settings.http_max_page_kb * 1024
+        client = self.client()
+        async with self._host_slot(url):
+            async with client.stream("GET", url, headers=headers, extensions={"trace": self._trace}) as response:
+                if not response.is_success:
+                    # 304 и ошибки: тело не нужно
+                    return PageDownload(response)
+
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                if content_type not in HTML_CONTENT_TYPES:
+                    self._count("rejected_content_type")
+                    raise ValueError(f"Неподдерживаемый тип содержимого: {content_type}")
+
+                body = bytearray()
+                truncated = False
+                async for chunk in response.aiter_bytes():
+                    if not body and b"\x00" in chunk[:1024]:
+                        self._count("rejected_binary")
+                        raise ValueError("Страница содержит бинарные данные")
+                    body += chunk
+                    if len(body) >= max_bytes:
+                        truncated = True
+                        break
+
+        if truncated:
+            self._count("truncated_pages")
+            logger.info(f"Страница {url} обрезана до {max_bytes // 1024} КБ")
+            return PageDownload(response, safe_cut(bytes(body[:max_bytes])), truncated=True)
+        return PageDownload(response, bytes(body))
+
+    def stats(self) -> dict:
+        """Статистика пула для /metrics"""
+        with self._lock:
+            clients = list(self._clients.values())
+            stats = dict(self._stats)
+            stats["in_flight_by_host"] = dict(self._in_flight)
+
+        connections = idle = 0
+        for client in clients:
+            try:
+                # Внутренний пул httpcore: публичного API для его состояния нет
+                pool_connections = client._transport._pool.connections
+            except AttributeError:
+                continue
+            connections += len(pool_connections)
+            idle += sum(1 for connection in pool_connections if connection.is_idle())
+
+        requests = stats["requests"]
+        stats.update(
+            clients=len(clients),
+            pool_connections=connections,
+            pool_idle_connections=idle,
+            connection_reuse_rate=round(1 - stats["connections_opened"] / requests, 3) if requests else 0.0
+        )
+        return stats
+
+
+# Глобальный HTTP-клиент (открывается в lifespan приложения)
+http_client = HttpClientPool()
+metrics.register("http_client", http_client.stats)
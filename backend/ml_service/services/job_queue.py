@@ -0,0 +1,336 @@
+"""Персистентная очередь фоновых задач (SQLite) и воркеры инференса"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+import asyncio
+import ipaddress
+import json
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict], Awaitable[Dict]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    webhook_url TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    run_after REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+
+def check_webhook_url(url: str) -> None:
+    """Проверка адреса webhook (защита от запросов во внутреннюю сеть)
+
+    Допускаются только http/https. Хосты из JOB_WEBHOOK_ALLOWED_HOSTS
+    разрешены всегда; для остальных все адреса, в которые разрешается
+    имя, должны быть публичными (не loopback, частные, link-local,
+    зарезервированные и т.п.).
+
+    Raises:
+        ValueError: адрес не допускается
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("Webhook должен быть http(s) URL")
+    host = parts.hostname.lower()
+    allowed = {name.strip().lower() for name in (settings.job_webhook_allowed_hosts or "").split(",") if name.strip()}
+    if host in allowed:
+        return
+    try:
+        infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80), proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"Не удалось разрешить хост webhook {host}: {e}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global:
+            raise ValueError(f"Webhook на внутренний адрес запрещён: {host} ({address})")
+
+
+class JobQueue:
+    """Очередь задач в SQLite
+
+    Статусы: queued -> running -> done | failed. Задачи переживают
+    перезапуск: при старте воркеров незавершённые (running) задачи этого
+    процесса возвращаются в очередь, пока не исчерпан лимит попыток.
+    Упавшая задача тоже возвращается в очередь с задержкой (retry), пока
+    не исчерпан лимит попыток. Рассчитано на один процесс сервиса с
+    несколькими воркерами.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.db_path = Path(db_path)
+        self.max_attempts = max_attempts
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    with sqlite3.connect(self.db_path) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(_SCHEMA)
+                        # Базы, созданные до появления отложенного повтора
+                        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                        if "run_after" not in columns:
+                            conn.execute("ALTER TABLE jobs ADD COLUMN run_after REAL NOT NULL DEFAULT 0")
+                    self._initialized = True
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, job_type: str, payload: Dict, webhook_url: Optional[str] = None) -> str:
+        """Постановка задачи в очередь, возвращает id задачи"""
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, type, payload, status, webhook_url, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, job_type, json.dumps(payload, ensure_ascii=False), webhook_url, time.time())
+            )
+        metrics.increment("jobs.submitted")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Задача по id (None, если не найдена)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim(self) -> Optional[Dict]:
+        """Атомарно взять самую старую задачу из очереди (отложенные повторы - по наступлении срока)"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' AND run_after <= ? ORDER BY created_at LIMIT 1",
+                    (time.time(),)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (time.time(), row["id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        job = dict(row, status="running", attempts=row["attempts"] + 1)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def complete(self, job_id: str, result: Dict) -> None:
+        """Задача выполнена"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Задача завершилась ошибкой"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id)
+            )
+
+    def retry(self, job_id: str, error: str, delay: float) -> None:
+        """Возврат упавшей задачи в очередь через delay секунд"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, run_after = ? WHERE id = ?",
+                (error, time.time() + delay, job_id)
+            )
+
+    def recover(self) -> int:
+        """Возврат прерванных задач в очередь после перезапуска"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Превышено число попыток', finished_at = ? "
+                "WHERE status = 'running' AND attempts >= ?",
+                (time.time(), self.max_attempts)
+            )
+            cursor = conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Количество задач по статусам"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class JobWorkers:
+    """Пул воркеров инференса, разбирающих очередь задач
+
+    Каждый воркер - отдельный поток со своим event loop: тяжёлый
+    синхронный инференс не блокирует основной event loop сервиса,
+    а torch отпускает GIL, так что воркеры работают параллельно.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int, poll_interval: float):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, JobHandler] = {}
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def register(self, job_type: str, handler: JobHandler) -> None:
+        """Регистрация обработчика типа задачи"""
+        self._handlers[job_type] = handler
+
+    @property
+    def job_types(self):
+        return sorted(self._handlers)
+
+    def notify(self) -> None:
+        """Разбудить воркеры после постановки задачи"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Запуск воркеров (и возврат прерванных задач в очередь)"""
+        if self._threads:
+            return
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info(f"Возвращено в очередь прерванных задач: {recovered}")
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Запущено воркеров задач: {self.workers}")
+
+    def stop(self, timeout: float = 30) -> None:
+        """Остановка воркеров (текущие задачи дорабатывают до timeout)"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while not self._stop.is_set():
+                try:
+                    job = self.queue.claim()
+                except Exception as e:
+                    logger.error(f"Ошибка чтения очереди задач: {e}")
+                    job = None
+                if job is None:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self._execute(loop, job)
+        finally:
+            from services.http_client import http_client
+            loop.run_until_complete(http_client.close())
+            loop.close()
+
+    def _execute(self, loop, job: Dict) -> None:
+        start_time = time.time()
+        handler = self._handlers.get(job["type"])
+        try:
+            if handler is None:
+                raise ValueError(f"Неизвестный тип задачи: {job['type']}")
+            result = loop.run_until_complete(handler(job["payload"]))
+            self.queue.complete(job["id"], result)
+            metrics.increment("jobs.done")
+            status, error = "done", None
+        except Exception as e:
+            error = str(getattr(e, "detail", None) or e)
+            # Ошибки запроса (4xx, неизвестный тип) повтор не исправит
+            retryable = handler is not None and getattr(e, "status_code", 500) >= 500
+            metrics.observe(f"jobs.{job['type']}.seconds", time.time() - start_time)
+            if retryable and job["attempts"] < self.queue.max_attempts:
+                delay = settings.job_retry_backoff * 2 ** (job["attempts"] - 1)
+                logger.warning(
+                    f"Задача {job['id']} ({job['type']}) завершилась ошибкой, повтор через {delay:g} с "
+                    f"(попытка {job['attempts']}/{self.queue.max_attempts}): {error}"
+                )
+                self.queue.retry(job["id"], error, delay)
+                metrics.increment("jobs.retried")
+                return
+            logger.error(f"Задача {job['id']} ({job['type']}) завершилась ошибкой: {error}")
+            self.queue.fail(job["id"], error)
+            metrics.increment("jobs.failed")
+            status, result = "failed", None
+        else:
+            metrics.observe(f"jobs.{job['type']}.seconds", time.time() - start_time)
+
+        if job.get("webhook_url"):
+            loop.run_until_complete(self._send_webhook(job["webhook_url"], {
+                "job_id": job["id"],
+                "type": job["type"],
+                "status": status,
+                "result": result,
+                "error": error
+            }))
+
+    @staticmethod
+    async def _send_webhook(url: str, body: Dict) -> None:
+        """POST результата на webhook через общий HTTP-клиент loop воркера
+
+        Адрес проверяется повторно при отправке (DNS мог измениться с
+        момента постановки задачи), редиректы не выполняются: иначе
+        внешний адрес мог бы перенаправить запрос во внутреннюю сеть.
+        """
+        from services.http_client import http_client
+        try:
+            await asyncio.to_thread(check_webhook_url, url)
+            response = await http_client.client().post(
+                url,
+                json=body,
+                timeout=settings.job_webhook_timeout,
+                follow_redirects=False
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Не удалось отправить webhook {url}: {e}")
+
+
+# Глобальная очередь задач и воркеры (запускаются в lifespan приложения)
+job_queue = JobQueue(settings.jobs_db_path, max_attempts=settings.job_max_attempts)
+job_workers = JobWorkers(
+    job_queue,
+    workers=settings.job_workers or settings.inference_slots,
+    poll_interval=settings.job_poll_interval
+)
+metrics.register("jobs", job_queue.stats)
@@ -0,0 +1,78 @@
+"""Метрики сервиса (in-process, без внешних зависимостей)"""
+from typing import Callable, Dict
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """Счётчики, наблюдения и снимки состояния компонентов
+
+    Компоненты (кэши, пулы и т.д.) регистрируют функцию, возвращающую
+    словарь со своей статистикой, а горячие пути увеличивают счётчики
+    и добавляют наблюдения (время, коэффициенты). Всё это отдаётся
+    одним JSON через /metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._observations: Dict[str, Dict[str, float]] = {}
+        self._providers: Dict[str, Callable[[], Dict]] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Увеличение счётчика"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """Добавление наблюдения (count/sum/min/max/last)"""
+        with self._lock:
+            stats = self._observations.get(name)
+            if stats is None:
+                self._observations[name] = {
+                    "count": 1,
+                    "sum": value,
+                    "min": value,
+                    "max": value,
+                    "last": value
+                }
+                return
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+            stats["last"] = value
+
+    def register(self, name: str, provider: Callable[[], Dict]) -> None:
+        """Регистрация источника статистики компонента"""
+        with self._lock:
+            self._providers[name] = provider
+
+    def snapshot(self) -> Dict:
+        """Снимок всех метрик"""
+        with self._lock:
+            counters = dict(self._counters)
+            observations = {}
+            for name, stats in self._observations.items():
+                observations[name] = dict(stats, avg=stats["sum"] / stats["count"])
+            providers = dict(self._providers)
+
+        components = {}
+        for name, provider in providers.items():
+            try:
+                components[name] = provider()
+            except Exception as e:
+                logger.warning(f"Не удалось получить метрики компонента {name}: {e}")
+                components[name] = {"error": str(e)}
+
+        return {
+            "counters": counters,
+            "observations": observations,
+            "components": components
+        }
+
+
+# Глобальный реестр метрик
+metrics = MetricsRegistry()
@@ -1,130 +1,253 @@
-"""Менеджер ML моделей"""
-from typing import Optional
+"""Менеджер ML моделей: единый слой загрузки по декларативным описаниям"""
+from pathlib import Path
+from typing import Dict, List, Optional
+import gc
+import threading
+import time
 import logging
 from config import settings
+from services.cpu_threads import cpu_threads
+from services.metrics import metrics
+from services.model_registry import model_registry, model_memory_mb
 
 logger = logging.getLogger(__name__)
 
 
+class ModelSpec:
+    """Описание модели: что загружать, откуда и куда
+
+    Args:
+        name: ключ модели (paraphrase_ru, summary_ru, draft_summary, similarity...)
+        task: задача (paraphrase, summary, draft, similarity)
+        language: язык ('ru', 'en'; None - многоязычная)
+        source: имя модели на Hugging Face; локальная копия ищется в
+            <ML_MODEL_CACHE_DIR>/<последняя часть имени>
+        backend: 'seq2seq' (transformers) или 'sentence_transformers'
+        dtype: 'auto' (float16 на CUDA, иначе float32), 'float32' или 'float16'
+        device: 'cpu' или 'cuda' (по умолчанию ML_DEVICE; без CUDA - cpu)
+        use_safetensors: формат весов (None - любой, False - только pytorch_model.bin)
+    """
+
+    def __init__(self, name: str, task: str, language: Optional[str], source: str,
+                 backend: str = "seq2seq", dtype: str = "auto", device: Optional[str] = None,
+                 use_safetensors: Optional[bool] = None):
+        self.name = name
+        self.task = task
+        self.language = language
+        self.source = source
+        self.backend = backend
+        self.dtype = dtype
+        self.device = device or settings.ml_device
+        self.use_safetensors = use_safetensors
+
+    @property
+    def path(self) -> Path:
+        """Каталог локальной копии модели"""
+        return Path(settings.ml_model_cache_dir) / self.source.split("/")[-1]
+
+    def local_files_exist(self) -> bool:
+        """Есть ли полная локальная копия (конфигурация и веса нужного формата)"""
+        weights = ["pytorch_model.bin"]
+        if self.use_safetensors is not False:
+            weights.append("model.safetensors")
+        return (self.path / "config.json").exists() and any((self.path / name).exists() for name in weights)
+
+    def describe(self) -> Dict:
+        return {
+            "task": self.task,
+            "language": self.language,
+            "source": self.source,
+            "backend": self.backend,
+            "dtype": self.dtype,
+            "device": self.device
+        }
+
+
+def default_specs() -> Dict[str, ModelSpec]:
+    """Модели сервиса из настроек (черновые - только если заданы)"""
+    specs = [
+        ModelSpec("paraphrase_ru", "paraphrase", "ru", settings.paraphrase_model_ru),
+        ModelSpec("paraphrase_en", "paraphrase", "en", settings.paraphrase_model_en),
+        # Веса mbart_ru_sum_gazeta загружаются из pytorch_model.bin (safetensors-версия несовместима)
+        ModelSpec("summary_ru", "summary", "ru", settings.summary_model_ru, use_safetensors=False),
+        ModelSpec("summary_en", "summary", "en", settings.summary_model_en),
+        ModelSpec("similarity", "similarity", None, settings.similarity_model,
+                  backend="sentence_transformers", dtype="float32"),
+    ]
+    if settings.draft_model_paraphrase_ru:
+        specs.append(ModelSpec("draft_paraphrase", "draft", "ru", settings.draft_model_paraphrase_ru))
+    if settings.draft_model_summary_ru:
+        specs.append(ModelSpec("draft_summary", "draft", "ru", settings.draft_model_summary_ru))
+    return {spec.name: spec for spec in specs}
+
+
+def import_torch():
+    """Импорт torch с настройкой потоков (переменные окружения - до импорта)"""
+    cpu_threads.configure_environment()
+    import torch
+    cpu_threads.apply_torch(torch)
+    return torch
+
+
 class ModelManager:
-    """Управление загрузкой и хранением ML моделей"""
-    
-    def __init__(self):
-        self.paraphrase_model = None
-        self.paraphrase_tokenizer = None
-        self.summary_model = None
-        self.summary_tokenizer = None
-        self.similarity_model = None
-        self._models_loaded = False
-    
-    def load_paraphrase_model(self):
-        """Загрузка модели для парафразирования"""
-        if self.paraphrase_model is not None:
-            return self.paraphrase_model, self.paraphrase_tokenizer
-        
-        try:
+    """Загрузка и хранение ML моделей
+
+    Каждая модель описывается ModelSpec и загружается один раз на процесс:
+    TextProcessor, эмбеддинги и скрипты получают один и тот же объект.
+    Параллельные запросы одной модели ждут первую загрузку, а не
+    запускают свою. manifest() показывает, какие модели в памяти,
+    откуда загружены и сколько занимают.
+    """
+
+    def __init__(self, specs: Optional[Dict[str, ModelSpec]] = None):
+        self._specs = specs
+        self._resident: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    @property
+    def specs(self) -> Dict[str, ModelSpec]:
+        if self._specs is None:
+            self._specs = default_specs()
+        return self._specs
+
+    def spec(self, name: str) -> Optional[ModelSpec]:
+        """Описание модели (None, если модель не настроена)"""
+        return self.specs.get(name)
+
+    def get(self, name: str):
+        """
+        Модель и токенизатор по ключу (загружаются при первом обращении)
+
+        Returns:
+            (model, tokenizer); для sentence_transformers tokenizer - None
+
+        Raises:
+            KeyError: модель не описана
+            FileNotFoundError: нет локальной копии и AUTO_DOWNLOAD_MODELS=False
+        """
+        resident = self._resident.get(name)
+        if resident is not None:
+            return resident["model"], resident["tokenizer"]
+
+        spec = self.spec(name)
+        if spec is None:
+            raise KeyError(f"Модель {name} не описана")
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            resident = self._resident.get(name)
+            if resident is not None:
+                return resident["model"], resident["tokenizer"]
+
+            started = model_registry.loading(name)
+            try:
+                model, tokenizer, location = self._load(spec)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки модели {name} ({spec.source}): {e}")
+                model_registry.failed(name, str(e), started)
+                raise
+
+            seconds = time.perf_counter() - started
+            self._resident[name] = {
+                "model": model,
+                "tokenizer": tokenizer,
+                "location": location,
+                "load_seconds": round(seconds, 2),
+                "loaded_at": time.time()
+            }
+            model_registry.loaded(name, model, started)
+            logger.info(f"Модель {name} загружена за {seconds:.1f} с ({location})")
+            return model, tokenizer
+
+    def _load(self, spec: ModelSpec):
+        torch = import_torch()
+        device = "cuda" if spec.device == "cuda" and torch.cuda.is_available() else "cpu"
+
+        if spec.backend == "sentence_transformers":
+            # sentence-transformers сам ищет модель в cache_folder и скачивает при отсутствии
+            from sentence_transformers import SentenceTransformer
+            location = spec.source
+            model = SentenceTransformer(location, device=device, cache_folder=settings.ml_model_cache_dir)
+            tokenizer = None
+        else:
+            if spec.local_files_exist():
+                location = str(spec.path)
+                options = {"local_files_only": True}
+                logger.info(f"Загрузка модели {spec.name} из локального кэша: {location}")
+            elif settings.auto_download_models:
+                location = spec.source
+                options = {"cache_dir": settings.ml_model_cache_dir}
+                logger.info(f"Модель {spec.name} не найдена локально. Загрузка с Hugging Face: {location}")
+            else:
+                raise FileNotFoundError(f"Модель не найдена в {spec.path} и AUTO_DOWNLOAD_MODELS=False")
+
             from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-            import torch
-            
-            logger.info(f"Загрузка модели парафразирования: {settings.ml_model_name}")
-            
-            # Определяем путь к модели
-            model_path = f"{settings.ml_model_cache_dir}/flan-t5-large"
-            
-            # Загрузка токенизатора
-            self.paraphrase_tokenizer = AutoTokenizer.from_pretrained(
-                model_path,
-                local_files_only=True
-            )
-            
-            # Загрузка модели
-            self.paraphrase_model = AutoModelForSeq2SeqLM.from_pretrained(
-                model_path,
-                local_files_only=True
-            )
-            
-            # Перемещение на устройство (CPU или CUDA)
-            device = settings.ml_device
-            self.paraphrase_model = self.paraphrase_model.to(device)
-            self.paraphrase_model.eval()
-            
-            logger.info("Модель парафразирования загружена успешно")
-            return self.paraphrase_model, self.paraphrase_tokenizer
-            
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке модели парафразирования: {e}")
-            raise
-    
+            tokenizer = AutoTokenizer.from_pretrained(location, **options)
+            if spec.use_safetensors is not None:
+                options["use_safetensors"] = spec.use_safetensors
+            model = AutoModelForSeq2SeqLM.from_pretrained(location, **options)
+
+        model.eval()
+        model = model.to(device)
+        if spec.dtype == "float16" or (spec.dtype == "auto" and device == "cuda"):
+            # float16 экономит память на GPU; если модель его не поддерживает, остаётся float32
+            try:
+                model = model.half()
+            except Exception as e:
+                logger.warning(f"Модель {spec.name} оставлена в float32: {e}")
+
+        # Очистка памяти после загрузки
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return model, tokenizer, location
+
+    def load_paraphrase_model(self, language: str = "en"):
+        """Модель парафразирования (по умолчанию английская, flan-t5-large)"""
+        return self.get(f"paraphrase_{language}")
+
     def load_summary_model(self, language: str = "ru"):
-        """Загрузка модели для суммаризации"""
-        if self.summary_model is not None:
-            return self.summary_model, self.summary_tokenizer
-        
-        try:
-            from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-            import torch
-            
-            # Выбор модели в зависимости от языка
-            model_name = settings.summary_model_ru if language == "ru" else settings.summary_model_en
-            logger.info(f"Загрузка модели суммаризации: {model_name}")
-            
-            # Определяем путь к модели
-            model_path = f"{settings.ml_model_cache_dir}/mbart_ru_sum_gazeta"
-            
-            # Загрузка токенизатора
-            self.summary_tokenizer = AutoTokenizer.from_pretrained(
-                model_path,
-                local_files_only=True
-            )
-            
-            # Загрузка модели
-            self.summary_model = AutoModelForSeq2SeqLM.from_pretrained(
-                model_path,
-                local_files_only=True
-            )
-            
-            # Перемещение на устройство
-            device = settings.ml_device
-            self.summary_model = self.summary_model.to(device)
-            self.summary_model.eval()
-            
-            logger.info("Модель суммаризации загружена успешно")
-            return self.summary_model, self.summary_tokenizer
-            
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке модели суммаризации: {e}")
-            raise
-    
+        """Модель суммаризации для языка"""
+        return self.get(f"summary_{language}")
+
     def load_similarity_model(self):
-        """Загрузка модели для проверки схожести"""
-        if self.similarity_model is not None:
-            return self.similarity_model
-        
-        try:
-            from sentence_transformers import SentenceTransformer
-            
-            logger.info("Загрузка модели схожести")
-            
-            # Загрузка модели
-            self.similarity_model = SentenceTransformer(
-                settings.similarity_model,
-                cache_folder=settings.ml_model_cache_dir
+        """Модель для проверки схожести"""
+        model, _ = self.get("similarity")
+        return model
+
+    def manifest(self) -> Dict:
+        """Модели в памяти: описание, откуда загружены, устройство, тип и объём весов"""
+        models: List[Dict] = []
+        for name, resident in list(self._resident.items()):
+            model = resident["model"]
+            entry = dict(self.specs[name].describe(), name=name)
+            try:
+                parameter = next(model.parameters())
+                entry["device"] = str(parameter.device)
+                entry["dtype"] = str(parameter.dtype).replace("torch.", "")
+            except Exception:
+                pass
+            entry.update(
+                location=resident["location"],
+                memory_mb=model_memory_mb(model),
+                load_seconds=resident["load_seconds"],
+                loaded_at=resident["loaded_at"]
             )
-            
-            logger.info("Модель схожести загружена успешно")
-            return self.similarity_model
-            
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке модели схожести: {e}")
-            raise
-    
+            models.append(entry)
+        return {
+            "models": models,
+            "total_memory_mb": round(sum(entry["memory_mb"] or 0 for entry in models), 1),
+            "configured": sorted(self.specs)
+        }
+
     @property
     def models_loaded(self) -> bool:
-        """Проверка загружены ли модели"""
-        return self.paraphrase_model is not None
+        """Загружена ли хотя бы одна модель"""
+        return bool(self._resident)
 
 
 # Глобальный экземпляр менеджера моделей
 model_manager = ModelManager()
-
-
+metrics.register("model_manifest", model_manager.manifest)
@@ -0,0 +1,194 @@
+"""Реестр состояния моделей (загрузка, память, очередь инференса)"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional
+import asyncio
+import threading
+import time
+import logging
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Состояния модели
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+def model_memory_mb(model) -> Optional[float]:
+    """Объём весов и буферов модели в МБ (None, если модель не torch)"""
+    try:
+        total = sum(
+            tensor.numel() * tensor.element_size()
+            for tensor in list(model.parameters()) + list(model.buffers())
+        )
+        return round(total / 2 ** 20, 1)
+    except Exception:
+        return None
+
+
+class ModelRegistry:
+    """Общее состояние моделей сервиса
+
+    Все модели загружаются через ModelManager: он отмечает начало,
+    успешное завершение или ошибку загрузки, а вызовы инференса
+    (TextProcessor, эмбеддинги) - вход и выход. /health читает только этот реестр: проверка не создаёт
+    процессоров и не трогает модели, поэтому остаётся дешёвой даже
+    во время загрузки или генерации.
+
+    Генерация из async-кода (запросы API, воркеры задач, пакетная
+    суммаризация) выполняется через run() в общем пуле из slots потоков:
+    event loop не блокируется (/health отвечает во время генерации),
+    одновременно работает не больше slots вызовов, а ожидающие поток
+    вызовы видны в queue_depth.
+    """
+
+    def __init__(self, slots: int = 1):
+        self.slots = max(1, slots)
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict] = {}
+        self._inference: Dict[str, Dict[str, int]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.started_at = time.time()
+        self.startup_complete = False
+
+    def _entry(self, name: str) -> Dict:
+        return self._models.setdefault(name, {
+            "state": NOT_LOADED,
+            "load_seconds": None,
+            "memory_mb": None,
+            "device": None,
+            "loaded_at": None,
+            "error": None
+        })
+
+    def loading(self, name: str) -> float:
+        """Отметка начала загрузки (возвращает время начала для loaded/failed)"""
+        with self._lock:
+            self._entry(name).update(state=LOADING, error=None)
+        return time.perf_counter()
+
+    def loaded(self, name: str, model, started: float) -> None:
+        """Модель загружена и готова к инференсу"""
+        seconds = time.perf_counter() - started
+        device = None
+        try:
+            device = str(next(model.parameters()).device)
+        except Exception:
+            pass
+        with self._lock:
+            self._entry(name).update(
+                state=READY,
+                load_seconds=round(seconds, 2),
+                memory_mb=model_memory_mb(model),
+                device=device,
+                loaded_at=time.time(),
+                error=None
+            )
+        metrics.observe("models.load_seconds", seconds)
+
+    def failed(self, name: str, error: str, started: Optional[float] = None) -> None:
+        """Загрузка не удалась (следующий запрос попробует снова)"""
+        with self._lock:
+            self._entry(name).update(
+                state=FAILED,
+                load_seconds=round(time.perf_counter() - started, 2) if started else None,
+                error=error
+            )
+        metrics.increment("models.load_errors")
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            entry = self._models.get(name)
+            return entry["state"] if entry else NOT_LOADED
+
+    def is_ready(self, names: Iterable[str]) -> bool:
+        """Готова ли хотя бы одна из перечисленных моделей"""
+        return any(self.state(name) == READY for name in names)
+
+    def _task_stats(self, task: str) -> Dict[str, int]:
+        return self._inference.setdefault(task, {"queued": 0, "in_flight": 0, "peak": 0, "total": 0})
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="inference")
+            return self._executor
+
+    async def run(self, task: str, fn: Callable, *args, **kwargs):
+        """Синхронный вызов инференса в пуле потоков инференса
+
+        Пока все slots потоков заняты, вызов ждёт в очереди (queued).
+        Отменённый до начала выполнения вызов из очереди снимается.
+        """
+        loop = asyncio.get_running_loop()
+        state = {"started": False, "cancelled": False}
+        with self._lock:
+            stats = self._task_stats(task)
+            stats["queued"] += 1
+
+        def call():
+            with self._lock:
+                if state["cancelled"]:
+                    return None
+                state["started"] = True
+                stats["queued"] -= 1
+            return fn(*args, **kwargs)
+
+        try:
+            return await loop.run_in_executor(self._get_executor(), call)
+        finally:
+            with self._lock:
+                if not state["started"]:
+                    state["cancelled"] = True
+                    stats["queued"] -= 1
+
+    def shutdown(self) -> None:
+        """Остановка пула потоков инференса (ожидающие вызовы отменяются)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @contextmanager
+    def inference(self, task: str):
+        """Учёт выполняющегося вызова модели (in_flight, пик и общее число)"""
+        with self._lock:
+            stats = self._task_stats(task)
+            stats["in_flight"] += 1
+            stats["peak"] = max(stats["peak"], stats["in_flight"])
+        try:
+            yield
+        finally:
+            with self._lock:
+                stats["in_flight"] -= 1
+                stats["total"] += 1
+
+    def _queue_depth(self) -> int:
+        return sum(stats["queued"] + stats["in_flight"] for stats in self._inference.values())
+
+    def queue_depth(self) -> int:
+        """Вызовы инференса в ожидании потока и в работе"""
+        with self._lock:
+            return self._queue_depth()
+
+    def stats(self) -> dict:
+        """Состояние моделей и очереди инференса (для /health и /metrics)"""
+        with self._lock:
+            return {
+                "models": {name: dict(entry) for name, entry in self._models.items()},
+                "inference": {task: dict(stats) for task, stats in self._inference.items()},
+                "queue_depth": self._queue_depth(),
+                "inference_slots": self.slots,
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "startup_complete": self.startup_complete
+            }
+
+
+# Глобальный реестр моделей
+model_registry = ModelRegistry(slots=settings.inference_slots)
+metrics.register("models", model_registry.stats)
@@ -0,0 +1,319 @@
+"""Кэш загруженных страниц с условными запросами (ETag / Last-Modified)"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+
+import httpx
+
+from config import settings
+from services.http_client import http_client
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Параметры, которые не меняют содержимое страницы (метки рекламных кампаний)
+_TRACKING_PARAMS = ("utm_", "yclid", "gclid", "fbclid", "_openstat")
+
+
+def normalize_url(url: str) -> str:
+    """Нормализация URL для ключа кэша
+
+    Схема и хост в нижнем регистре, без фрагмента, порта по умолчанию
+    и меток рекламных кампаний; параметры запроса отсортированы.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class PageEntry:
+    """Загруженная страница: тело, валидаторы и извлечённые из неё данные"""
+
+    def __init__(self, url: str, content: bytes, encoding: Optional[str],
+                 etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 fetched_at: Optional[float] = None, validated_at: Optional[float] = None,
+                 derived: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at or time.time()
+        self.validated_at = validated_at or self.fetched_at
+        self.derived = derived or {}
+        self.content_hash = hashlib.sha1(content).hexdigest()
+
+    @property
+    def text(self) -> str:
+        """HTML как строка (кодировка из заголовка Content-Type, иначе utf-8)"""
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def meta(self) -> Dict:
+        return {
+            "url": self.url,
+            "encoding": self.encoding,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "validated_at": self.validated_at,
+            "derived": self.derived
+        }
+
+
+class PageCache:
+    """Двухуровневый кэш страниц: LRU в памяти и каталог на диске
+
+    Одни и те же статьи загружаются повторно (/process, /summarize-url,
+    фоновые задачи). В течение fresh_for секунд после загрузки или
+    проверки страница отдаётся без обращения к сайту. Затем выполняется
+    условный запрос (If-None-Match / If-Modified-Since): ответ 304
+    продлевает запись без повторной загрузки тела. Если сайт валидаторы
+    не поддерживает, но тело не изменилось (тот же хэш), сохраняются
+    уже извлечённые данные (текст, заголовок). При ошибке проверки
+    отдаётся устаревшая копия.
+
+    Страницы больше max_entry_bytes не кэшируются. На диске запись -
+    пара файлов <sha1 ключа>.html (тело) и .json (метаданные); объём
+    каталога ограничен max_disk_bytes, вытесняются давно проверенные.
+    Чтение и запись файлов выполняются в потоке (asyncio.to_thread) без
+    блокировки: под блокировкой меняются только LRU в памяти и индекс
+    каталога, поэтому медленный диск не останавливает event loop.
+    """
+
+    def __init__(self, directory: str, max_entries: int, max_disk_bytes: int,
+                 max_entry_bytes: int, fresh_for: float):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.fresh_for = fresh_for
+        self._memory: "OrderedDict[str, PageEntry]" = OrderedDict()
+        self._disk: Dict[str, tuple] = {}  # ключ -> (размер, validated_at)
+        self._disk_loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.html", self.directory / f"{key}.json"
+
+    def _load_disk_index(self) -> None:
+        """Индекс каталога (размеры и время проверки) при первом обращении (в потоке)"""
+        if self._disk_loaded:
+            return
+        scanned = {}
+        if self.directory.exists():
+            for meta_path in self.directory.glob("*.json"):
+                html_path = meta_path.with_suffix(".html")
+                try:
+                    size = html_path.stat().st_size + meta_path.stat().st_size
+                    validated_at = json.loads(meta_path.read_text(encoding="utf-8"))["validated_at"]
+                except Exception:
+                    continue
+                scanned[meta_path.stem] = (size, validated_at)
+        with self._lock:
+            if not self._disk_loaded:
+                # Записи, сделанные во время сканирования, новее найденных
+                for key, value in scanned.items():
+                    self._disk.setdefault(key, value)
+                self._disk_loaded = True
+
+    def _read(self, key: str) -> Optional[PageEntry]:
+        html_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            return PageEntry(content=html_path.read_bytes(), **meta)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Повреждённая запись кэша страниц {key}: {e}")
+            return None
+
+    def _write(self, key: str, entry: PageEntry, with_content: bool = True) -> None:
+        """Запись на диск (в потоке); под блокировкой обновляется только индекс"""
+        html_path, meta_path = self._paths(key)
+        # Временный файл на поток: параллельные записи одного ключа не мешают друг другу
+        suffix = f".{threading.get_ident()}.tmp"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if with_content:
+                tmp = html_path.with_suffix(".html" + suffix)
+                tmp.write_bytes(entry.content)
+                os.replace(tmp, html_path)
+            tmp = meta_path.with_suffix(".json" + suffix)
+            tmp.write_text(json.dumps(entry.meta(), ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, meta_path)
+            size = html_path.stat().st_size + meta_path.stat().st_size
+        except OSError as e:
+            logger.warning(f"Не удалось записать кэш страницы {entry.url}: {e}")
+            return
+        with self._lock:
+            self._disk[key] = (size, entry.validated_at)
+            evicted = self._evict_disk()
+        for evicted_key in evicted:
+            for path in self._paths(evicted_key):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _evict_disk(self) -> list:
+        """Вытеснение из индекса (под блокировкой); возвращает ключи для удаления файлов"""
+        total = sum(size for size, _ in self._disk.values())
+        evicted = []
+        if total <= self.max_disk_bytes:
+            return evicted
+        for key, (size, _) in sorted(self._disk.items(), key=lambda item: item[1][1]):
+            del self._disk[key]
+            self._memory.pop(key, None)
+            evicted.append(key)
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+        return evicted
+
+    def _remember(self, key: str, entry: PageEntry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def lookup(self, url: str) -> Optional[PageEntry]:
+        """Запись кэша для URL (из памяти или с диска), без проверки свежести"""
+        key = self._key(url)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            disk_loaded = self._disk_loaded
+        if not disk_loaded:
+            await asyncio.to_thread(self._load_disk_index)
+        with self._lock:
+            if key not in self._disk:
+                return None
+        entry = await asyncio.to_thread(self._read, key)
+        if entry is not None:
+            with self._lock:
+                self._remember(key, entry)
+        return entry
+
+    def is_fresh(self, entry: PageEntry) -> bool:
+        return time.time() - entry.validated_at < self.fresh_for
+
+    async def store(self, entry: PageEntry) -> None:
+        """Сохранение загруженной страницы (слишком большие не кэшируются)"""
+        if len(entry.content) > self.max_entry_bytes:
+            metrics.increment("page_cache.too_large")
+            return
+        key = self._key(entry.url)
+        with self._lock:
+            self._remember(key, entry)
+        await asyncio.to_thread(self._write, key, entry)
+
+    async def touch(self, entry: PageEntry) -> None:
+        """Отметка успешной проверки (ответ 304 или неизменившееся тело)"""
+        entry.validated_at = time.time()
+        await self._write_meta(entry)
+
+    async def set_derived(self, entry: PageEntry, name: str, value: Any) -> None:
+        """Сохранение данных, извлечённых из страницы (JSON-совместимых)"""
+        entry.derived[name] = value
+        await self._write_meta(entry)
+
+    async def _write_meta(self, entry: PageEntry) -> None:
+        key = self._key(entry.url)
+        with self._lock:
+            on_disk = key in self._disk
+        if on_disk:
+            await asyncio.to_thread(self._write, key, entry, False)
+
+    async def fetch(self, url: str) -> PageEntry:
+        """Страница по URL: из кэша, после условного запроса или загрузкой"""
+        if not settings.page_cache_enabled:
+            response = await http_client.fetch_page(url)
+            response.raise_for_status()
+            return PageEntry(url, response.content, response.charset_encoding)
+
+        cached = await self.lookup(url)
+        if cached is not None and self.is_fresh(cached):
+            metrics.increment("page_cache.fresh_hits")
+            return cached
+
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            response = await http_client.fetch_page(url, headers=headers)
+            if response.status_code == 304 and cached is not None:
+                await self.touch(cached)
+                metrics.increment("page_cache.not_modified")
+                return cached
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            if cached is None:
+                raise
+            logger.warning(f"Не удалось проверить {url}, используется кэш: {e}")
+            metrics.increment("page_cache.stale_served")
+            return cached
+
+        entry = PageEntry(
+            url,
+            response.content,
+            response.charset_encoding,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified")
+        )
+        if cached is not None and cached.content_hash == entry.content_hash:
+            # Тело не изменилось: извлечённые данные остаются актуальными
+            entry.derived = cached.derived
+            metrics.increment("page_cache.unchanged")
+        else:
+            metrics.increment("page_cache.misses" if cached is None else "page_cache.changed")
+        await self.store(entry)
+        return entry
+
+    def stats(self) -> dict:
+        """Статистика кэша для /metrics (каталог не сканируется: индекс читается при первом обращении)"""
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_entries": len(self._disk),
+                "disk_mb": round(sum(size for size, _ in self._disk.values()) / 2 ** 20, 2),
+                "max_disk_mb": round(self.max_disk_bytes / 2 ** 20, 2),
+                "disk_index_loaded": self._disk_loaded,
+                "fresh_for": self.fresh_for
+            }
+
+
+# Глобальный кэш страниц
+page_cache = PageCache(
+    directory=settings.page_cache_dir,
+    max_entries=settings.page_cache_max_entries,
+    max_disk_bytes=settings.page_cache_max_disk_mb * 2 ** 20,
+    max_entry_bytes=settings.page_cache_max_entry_kb * 1024,
+    fresh_for=settings.page_cache_fresh_seconds
+)
+metrics.register("page_cache", page_cache.stats)
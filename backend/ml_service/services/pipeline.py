@@ -0,0 +1,183 @@
+"""Конвейер этапов обработки с ограниченными очередями (для батчевых нагрузок)"""
+from typing import Callable, Dict, Iterable, Iterator, List
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Failed:
+    """Ошибка элемента, которая проходит дальнейшие этапы без обработки"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class Stage:
+    """Этап конвейера: функция и число потоков, которые её выполняют"""
+
+    def __init__(self, name: str, fn: Callable, workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+
+
+class Pipeline:
+    """Этапы в отдельных потоках, связанные очередями ограниченного размера
+
+    Пока один этап обрабатывает элемент N, предыдущий уже готовит N+1,
+    а следующий дорабатывает N-1: например, токенизация и декодирование
+    перекрываются с generate(). torch отпускает GIL на время вычислений,
+    поэтому лёгкие этапы на Python реально идут параллельно.
+
+    Результаты возвращаются в исходном порядке. Ошибка элемента не
+    останавливает конвейер: она пробрасывается при выдаче этого элемента.
+    Загрузку этапов (доля времени, когда потоки этапа заняты работой)
+    показывает stats() - по ней подбирается число потоков.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 2):
+        self.stages = stages
+        self.queue_size = queue_size
+        self._wall_seconds = 0.0
+
+    def run(self, items: Iterable) -> Iterator:
+        """Прогон элементов через все этапы (генератор результатов по порядку)"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        stop = threading.Event()
+
+        def put(q, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed():
+            try:
+                for seq, item in enumerate(items):
+                    if not put(queues[0], (seq, item)):
+                        return
+            except Exception as e:
+                logger.error(f"Ошибка чтения входа конвейера: {e}")
+            for _ in range(self.stages[0].workers):
+                put(queues[0], _DONE)
+
+        def work(index: int, stage: Stage, remaining: List[int], lock: threading.Lock):
+            q_in, q_out = queues[index], queues[index + 1]
+            while not stop.is_set():
+                try:
+                    entry = q_in.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if entry is _DONE:
+                    break
+                seq, value = entry
+                if not isinstance(value, _Failed):
+                    start = time.perf_counter()
+                    try:
+                        value = stage.fn(value)
+                    except Exception as e:
+                        value = _Failed(e)
+                    stage.record(time.perf_counter() - start)
+                if not put(q_out, (seq, value)):
+                    return
+            # Последний поток этапа сообщает следующему этапу о конце входа
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                workers_next = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                for _ in range(workers_next):
+                    put(q_out, _DONE)
+
+        threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            remaining, lock = [stage.workers], threading.Lock()
+            for i in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=work,
+                    args=(index, stage, remaining, lock),
+                    name=f"pipeline-{stage.name}-{i}",
+                    daemon=True
+                ))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        pending: Dict[int, object] = {}
+        next_seq = 0
+        try:
+            while True:
+                entry = queues[-1].get()
+                if entry is _DONE:
+                    break
+                seq, value = entry
+                pending[seq] = value
+                while next_seq in pending:
+                    value = pending.pop(next_seq)
+                    next_seq += 1
+                    if isinstance(value, _Failed):
+                        raise value.error
+                    yield value
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join(1)
+            self._wall_seconds += time.perf_counter() - start
+
+    def stats(self) -> Dict:
+        """Загрузка этапов: элементы, время работы, доля занятости потоков"""
+        wall = self._wall_seconds
+        return {
+            "wall_seconds": round(wall, 3),
+            "stages": {
+                stage.name: {
+                    "workers": stage.workers,
+                    "items": stage.items,
+                    "busy_seconds": round(stage.busy_seconds, 3),
+                    "utilization": round(stage.busy_seconds / (wall * stage.workers), 3) if wall else 0.0
+                }
+                for stage in self.stages
+            }
+        }
+
+
+def merge_stats(stats: List[Dict]) -> Dict:
+    """Сумма статистики нескольких конвейеров (например, из разных процессов)"""
+    merged: Dict = {"wall_seconds": 0.0, "stages": {}}
+    for item in stats:
+        merged["wall_seconds"] += item["wall_seconds"]
+        for name, stage in item["stages"].items():
+            total = merged["stages"].setdefault(name, {"workers": stage["workers"], "items": 0, "busy_seconds": 0.0})
+            total["items"] += stage["items"]
+            total["busy_seconds"] += stage["busy_seconds"]
+    wall = merged["wall_seconds"]
+    for stage in merged["stages"].values():
+        stage["busy_seconds"] = round(stage["busy_seconds"], 3)
+        stage["utilization"] = round(stage["busy_seconds"] / (wall * stage["workers"]), 3) if wall else 0.0
+    merged["wall_seconds"] = round(wall, 3)
+    return merged
+
+
+def format_stats(stats: Dict) -> str:
+    """Короткая строка с загрузкой этапов для логов и CLI"""
+    return ", ".join(
+        f"{name}: {stage['utilization'] * 100:.0f}% ({stage['items']} шт., {stage['workers']} пот.)"
+        for name, stage in stats["stages"].items()
+    )
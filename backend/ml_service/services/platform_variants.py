@@ -0,0 +1,98 @@
+"""Построение вариантов текста для платформ из одного результата генерации"""
+from typing import Dict, List, Optional
+import logging
+
+from services.extractive import score_sentences, split_sentences, tokenize_words
+
+logger = logging.getLogger(__name__)
+
+# Лимиты длины постов на платформах (в символах)
+PLATFORM_LIMITS = {
+    "telegram": 4096,
+    "vk": 10000,
+    "instagram": 2200
+}
+DEFAULT_PLATFORM_LIMIT = 4096
+
+
+def rank_sentences(sentences: List[str], reference: Optional[str] = None) -> List[int]:
+    """Ранжирование предложений по информативности
+
+    К TF-IDF оценке предложения (см. services.extractive) добавляется
+    доля его слов, встречающихся в reference (например, в саммари).
+
+    Returns:
+        Индексы предложений от наиболее к наименее важному
+    """
+    if not sentences:
+        return []
+
+    scores = score_sentences(sentences)
+    reference_words = set(tokenize_words(reference)) if reference else set()
+    if reference_words:
+        for i, sentence in enumerate(sentences):
+            words = tokenize_words(sentence)
+            if words:
+                scores[i] += sum(1 for w in words if w in reference_words) / len(words)
+
+    return sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+
+
+def _trim_to_limit(sentences: List[str], ranking: List[int], limit: int) -> str:
+    """Выбор наиболее важных предложений, помещающихся в лимит
+
+    Предложения берутся по рангу, а выводятся в исходном порядке.
+    """
+    selected = []
+    total = 0
+    for index in ranking:
+        length = len(sentences[index]) + (1 if selected else 0)
+        if total + length <= limit:
+            selected.append(index)
+            total += length
+
+    if selected:
+        return ' '.join(sentences[i] for i in sorted(selected))
+
+    # Ни одно предложение не помещается целиком - режем лучшее по границе слова
+    best = sentences[ranking[0]]
+    cut = best[:max(limit - 1, 0)]
+    if ' ' in cut:
+        cut = cut[:cut.rfind(' ')]
+    return cut.rstrip(',;:- ') + '…'
+
+
+def build_platform_variants(
+    paraphrased: str,
+    platforms: List[str],
+    summary: Optional[str] = None,
+    target_lengths: Optional[Dict[str, int]] = None
+) -> Dict[str, Dict]:
+    """Варианты текста для всех платформ из одного парафраза
+
+    Дополнительных вызовов generate нет: предложения парафраза ранжируются
+    один раз (с учётом саммари, если оно есть), после чего для каждой
+    платформы выбирается лучший набор предложений в пределах её лимита
+    (или target_lengths[platform], если он меньше).
+    """
+    sentences = split_sentences(paraphrased)
+    ranking = rank_sentences(sentences, reference=summary) if sentences else []
+
+    variants = {}
+    for platform in platforms:
+        limit = PLATFORM_LIMITS.get(platform, DEFAULT_PLATFORM_LIMIT)
+        if target_lengths and target_lengths.get(platform):
+            limit = min(limit, target_lengths[platform])
+
+        if len(paraphrased) <= limit or not sentences:
+            text = paraphrased[:limit]
+        else:
+            text = _trim_to_limit(sentences, ranking, limit)
+
+        variants[platform] = {
+            "text": text,
+            "length": len(text),
+            "truncated": len(paraphrased) > limit
+        }
+
+    return variants
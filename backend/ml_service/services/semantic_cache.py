@@ -0,0 +1,134 @@
+"""Семантический кэш результатов (near-duplicate тексты)"""
+from typing import Any, Dict, Optional, Tuple
+import threading
+import time
+import logging
+
+import numpy as np
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Namespace:
+    """Индекс одного пространства ключей: нормированные векторы, время, результаты"""
+
+    def __init__(self):
+        self.vectors: Optional[np.ndarray] = None
+        self.timestamps = np.zeros(0, dtype=np.float64)
+        self.payloads = []
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def keep(self, mask: np.ndarray) -> None:
+        if self.vectors is None or mask.all():
+            return
+        self.vectors = self.vectors[mask]
+        self.timestamps = self.timestamps[mask]
+        self.payloads = [p for p, k in zip(self.payloads, mask) if k]
+
+
+class SemanticCache:
+    """Кэш результатов по смыслу входного текста
+
+    Разные каналы публикуют одну и ту же новость в слегка разной
+    формулировке. Входной текст кодируется моделью схожести, ближайший
+    сосед ищется среди недавних входов (один matmul по нормированным
+    векторам), и при косинусной близости не ниже порога сохранённый
+    результат используется повторно. Записи вытесняются по возрасту
+    и количеству.
+    """
+
+    def __init__(self, max_entries: int, max_age: int, threshold: float):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.threshold = threshold
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """Нормированный вектор текста (None, если модель схожести недоступна)"""
+        try:
+            from services.embeddings import embedding_service
+            return embedding_service.encode([text])[0]
+        except Exception as e:
+            logger.warning(f"Семантический кэш недоступен: {e}")
+            return None
+
+    def _evict(self, namespace: _Namespace, now: float) -> None:
+        namespace.keep(now - namespace.timestamps <= self.max_age)
+        overflow = len(namespace) - self.max_entries
+        if overflow > 0:
+            mask = np.ones(len(namespace), dtype=bool)
+            mask[np.argsort(namespace.timestamps, kind="stable")[:overflow]] = False
+            namespace.keep(mask)
+
+    def lookup(self, namespace_name: str, vector: Optional[np.ndarray]) -> Optional[Tuple[Any, float]]:
+        """Поиск результата для ближайшего по смыслу входа
+
+        Returns:
+            (результат, косинусная близость) или None
+        """
+        if vector is None:
+            return None
+        with self._lock:
+            namespace = self._namespaces.get(namespace_name)
+            if namespace is not None:
+                self._evict(namespace, time.time())
+            if namespace is None or not len(namespace):
+                self._misses += 1
+                metrics.increment("semantic_cache.misses")
+                return None
+            similarities = namespace.vectors @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self._misses += 1
+                metrics.increment("semantic_cache.misses")
+                return None
+            self._hits += 1
+            metrics.increment("semantic_cache.hits")
+            return namespace.payloads[best], similarity
+
+    def add(self, namespace_name: str, vector: Optional[np.ndarray], payload: Any) -> None:
+        """Сохранение результата для входа с данным вектором"""
+        if vector is None:
+            return
+        now = time.time()
+        with self._lock:
+            namespace = self._namespaces.setdefault(namespace_name, _Namespace())
+            if namespace.vectors is None:
+                namespace.vectors = vector[np.newaxis, :]
+            else:
+                namespace.vectors = np.vstack([namespace.vectors, vector])
+            namespace.timestamps = np.append(namespace.timestamps, now)
+            namespace.payloads.append(payload)
+            self._evict(namespace, now)
+
+    def stats(self) -> dict:
+        """Статистика кэша"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": {name: len(ns) for name, ns in self._namespaces.items()},
+                "threshold": self.threshold,
+                "max_entries": self.max_entries,
+                "max_age": self.max_age,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0
+            }
+
+
+# Глобальный семантический кэш (порог - similarity_threshold из конфига)
+semantic_cache = SemanticCache(
+    max_entries=settings.semantic_cache_max_entries,
+    max_age=settings.semantic_cache_max_age,
+    threshold=settings.similarity_threshold
+)
+metrics.register("semantic_cache", semantic_cache.stats)
@@ -0,0 +1,109 @@
+"""Кэш парафраза на уровне предложений"""
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+from urllib.parse import urlparse
+import re
+import threading
+import time
+import logging
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sentence(sentence: str) -> str:
+    """Нормализация предложения для ключа кэша"""
+    return _WHITESPACE_RE.sub(' ', sentence).strip().casefold()
+
+
+def source_domain(source: Optional[str]) -> str:
+    """Домен источника по URL или строке домена"""
+    if not source:
+        return "unknown"
+    netloc = urlparse(source).netloc if "://" in source else source
+    netloc = netloc.lower().split(':')[0]
+    return netloc[4:] if netloc.startswith("www.") else netloc or "unknown"
+
+
+class SentenceCache:
+    """LRU-кэш парафраза отдельных предложений с TTL
+
+    Новости одного источника повторяют одни и те же предложения (подписи,
+    дисклеймеры, «подписывайтесь на канал»), а окружающий текст всегда
+    разный, поэтому кэш целых документов их не ловит. Попадания и промахи
+    считаются по доменам источника (не больше max_domains последних
+    доменов: источник передаёт клиент).
+
+    Ключ - namespace (модель, язык и параметры генерации) и нормализованное
+    предложение: парафраз с другими max_length/num_beams/temperature/top_p
+    или другой моделью из кэша не берётся.
+    """
+
+    def __init__(self, max_entries: int, ttl: int, max_domains: int = 500):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_domains = max_domains
+        self._entries: "OrderedDict[Tuple[Hashable, str], Tuple[str, float]]" = OrderedDict()
+        self._domains: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, domain: str, field: str) -> None:
+        stats = self._domains.get(domain)
+        if stats is None:
+            stats = self._domains[domain] = {"hits": 0, "misses": 0}
+            while len(self._domains) > self.max_domains:
+                self._domains.popitem(last=False)
+        self._domains.move_to_end(domain)
+        stats[field] += 1
+        metrics.increment(f"sentence_cache.{field}")
+
+    def get(self, namespace: Hashable, sentence: str, source: Optional[str] = None) -> Optional[str]:
+        """Парафраз предложения из кэша (None при промахе или истёкшем TTL)"""
+        key = (namespace, normalize_sentence(sentence))
+        domain = source_domain(source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._count(domain, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count(domain, "hits")
+            return entry[0]
+
+    def put(self, namespace: Hashable, sentence: str, paraphrased: str) -> None:
+        """Сохранение парафраза предложения"""
+        key = (namespace, normalize_sentence(sentence))
+        with self._lock:
+            self._entries[key] = (paraphrased, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Статистика кэша с hit rate по доменам"""
+        with self._lock:
+            domains = {}
+            for domain, counts in self._domains.items():
+                total = counts["hits"] + counts["misses"]
+                domains[domain] = dict(counts, hit_rate=round(counts["hits"] / total, 3) if total else 0.0)
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "domains": domains
+            }
+
+
+# Глобальный кэш предложений
+sentence_cache = SentenceCache(
+    max_entries=settings.paraphrase_sentence_cache_max_entries,
+    ttl=settings.paraphrase_sentence_cache_ttl
+)
+metrics.register("sentence_cache", sentence_cache.stats)
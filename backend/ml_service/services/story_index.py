@@ -0,0 +1,262 @@
+"""Персистентный индекс эмбеддингов статей (дубликаты и кластеры сюжетов)"""
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import threading
+import time
+import logging
+
+import numpy as np
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StoryIndex:
+    """Индекс обработанных статей на диске
+
+    Файлы в каталоге индекса:
+    - vectors.f16 - нормированные векторы float16 подряд (читается через memmap)
+    - items.jsonl - по строке на вектор: {id, ts, cluster}
+    - meta.json - размерность векторов
+
+    Добавление инкрементальное (дозапись в конец файлов). Поиск - точный
+    блочный: векторы читаются блоками из memmap, для каждого блока один
+    matmul, top-k сливается между блоками. Для десятков тысяч статей это
+    миллисекунды и постоянная память.
+    """
+
+    def __init__(self, directory: str, block_size: int = 8192):
+        self.directory = Path(directory)
+        self.block_size = block_size
+        self._vectors_path = self.directory / "vectors.f16"
+        self._items_path = self.directory / "items.jsonl"
+        self._meta_path = self.directory / "meta.json"
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._timestamps = np.zeros(0, dtype=np.float64)
+        self._clusters = np.zeros(0, dtype=np.int64)
+        self._memmap = None
+
+    def _load(self) -> None:
+        """Чтение id map и метаданных (векторы остаются на диске)"""
+        if self._loaded:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._meta_path.exists():
+            self.dim = json.loads(self._meta_path.read_text(encoding="utf-8"))["dim"]
+
+        timestamps, clusters = [], []
+        # Смещение конца каждой целой строки items.jsonl (для обрезки хвоста)
+        ends: List[int] = []
+        if self._items_path.exists():
+            with open(self._items_path, "rb") as f:
+                offset = 0
+                for raw in f:
+                    try:
+                        if not raw.endswith(b"\n"):
+                            raise ValueError("строка без перевода строки")
+                        line = raw.strip()
+                        item = json.loads(line) if line else None
+                        if item is not None:
+                            story_id, ts, cluster = item["id"], item["ts"], item["cluster"]
+                    except (ValueError, KeyError, TypeError):
+                        # Недописанная строка после аварийного завершения
+                        logger.warning(f"Индекс сюжетов: повреждённая строка items.jsonl на смещении {offset}, хвост отброшен")
+                        break
+                    offset += len(raw)
+                    if item is None:
+                        continue
+                    self._rows[story_id] = len(self._ids)
+                    self._ids.append(story_id)
+                    timestamps.append(ts)
+                    clusters.append(cluster)
+                    ends.append(offset)
+
+        # Обрыв между записью вектора и строки items: векторов меньше, чем строк
+        if self.dim and len(self._ids):
+            vector_rows = self._vectors_path.stat().st_size // (self.dim * 2) if self._vectors_path.exists() else 0
+            if vector_rows < len(self._ids):
+                logger.warning(f"Индекс сюжетов: векторов {vector_rows} при {len(self._ids)} строках items, хвост отброшен")
+                for story_id in self._ids[vector_rows:]:
+                    del self._rows[story_id]
+                del self._ids[vector_rows:], timestamps[vector_rows:], clusters[vector_rows:], ends[vector_rows:]
+
+        # Дозапись идёт в конец файлов, поэтому повреждённый хвост обрезается сразу:
+        # иначе новые строки окажутся после него и будут потеряны при следующей загрузке
+        items_end = ends[-1] if ends else 0
+        if self._items_path.exists() and self._items_path.stat().st_size > items_end:
+            with open(self._items_path, "r+b") as f:
+                f.truncate(items_end)
+        self._timestamps = np.array(timestamps, dtype=np.float64)
+        self._clusters = np.array(clusters, dtype=np.int64)
+
+        # Векторов может быть больше, чем строк items (обрыв между двумя записями)
+        if self.dim and self._vectors_path.exists():
+            expected = len(self._ids) * self.dim * 2
+            if self._vectors_path.stat().st_size > expected:
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(expected)
+        self._loaded = True
+        logger.info(f"Индекс сюжетов загружен: {len(self._ids)} статей")
+
+    def _vectors(self) -> Optional[np.ndarray]:
+        """Актуальный memmap векторов"""
+        n = len(self._ids)
+        if n == 0:
+            return None
+        if self._memmap is None or self._memmap.shape[0] != n:
+            self._memmap = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(n, self.dim))
+        return self._memmap
+
+    def _search(self, vector: np.ndarray, k: int, since: Optional[float]):
+        """Блочный точный поиск top-k (вызывается под блокировкой)"""
+        vectors = self._vectors()
+        if vectors is None:
+            return []
+
+        query = vector.astype(np.float32)
+        start_row = 0
+        if since is not None:
+            # Статьи дописываются по времени, поэтому окно обычно - хвост файла
+            in_window = self._timestamps >= since
+            start_row = int(np.argmax(in_window)) if in_window.any() else len(self._ids)
+
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for block_start in range(start_row, len(self._ids), self.block_size):
+            block_end = min(block_start + self.block_size, len(self._ids))
+            scores = np.asarray(vectors[block_start:block_end], dtype=np.float32) @ query
+            if since is not None:
+                scores[self._timestamps[block_start:block_end] < since] = -np.inf
+            rows = np.arange(block_start, block_end)
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+
+        order = np.argsort(-best_scores)
+        return [
+            (int(best_rows[i]), float(best_scores[i]))
+            for i in order
+            if np.isfinite(best_scores[i])
+        ]
+
+    def _describe(self, row: int, score: float) -> Dict:
+        return {
+            "id": self._ids[row],
+            "score": round(score, 4),
+            "cluster_id": int(self._clusters[row]),
+            "timestamp": float(self._timestamps[row])
+        }
+
+    def search(self, vector: np.ndarray, k: int = 5, days: Optional[float] = None) -> List[Dict]:
+        """Ближайшие статьи (за последние days дней, если указано)"""
+        start = time.perf_counter()
+        with self._lock:
+            self._load()
+            since = time.time() - days * 86400 if days else None
+            results = [self._describe(row, score) for row, score in self._search(vector, k, since)]
+        metrics.observe("story_index.search_seconds", time.perf_counter() - start)
+        return results
+
+    def _append(self, story_id: str, vector: np.ndarray, timestamp: float, cluster: int) -> None:
+        """Дозапись статьи в файлы индекса (вызывается под блокировкой)"""
+        if self.dim is None:
+            self.dim = int(vector.shape[0])
+            self._meta_path.write_text(json.dumps({"dim": self.dim}), encoding="utf-8")
+        elif vector.shape[0] != self.dim:
+            raise ValueError(f"Размерность вектора {vector.shape[0]} не совпадает с индексом ({self.dim})")
+
+        with open(self._vectors_path, "ab") as f:
+            f.write(vector.astype("<f2").tobytes())
+        with open(self._items_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": story_id, "ts": timestamp, "cluster": cluster}, ensure_ascii=False) + "\n")
+
+        self._rows[story_id] = len(self._ids)
+        self._ids.append(story_id)
+        self._timestamps = np.append(self._timestamps, timestamp)
+        self._clusters = np.append(self._clusters, cluster)
+
+    def assign(
+        self,
+        story_id: str,
+        vector: np.ndarray,
+        threshold: float,
+        days: Optional[float] = None,
+        timestamp: Optional[float] = None
+    ) -> Dict:
+        """Добавление статьи с назначением кластера
+
+        Статья попадает в кластер ближайшей статьи (за последние days дней),
+        если схожесть не ниже threshold, иначе открывает новый кластер.
+        Повторное добавление того же id возвращает уже назначенный кластер.
+        """
+        with self._lock:
+            self._load()
+            if story_id in self._rows:
+                row = self._rows[story_id]
+                return {
+                    "id": story_id,
+                    "cluster_id": int(self._clusters[row]),
+                    "is_new_cluster": False,
+                    "duplicate_of": None,
+                    "similarity": None,
+                    "already_indexed": True
+                }
+
+            timestamp = time.time() if timestamp is None else timestamp
+            since = timestamp - days * 86400 if days else None
+            nearest = self._search(vector, 1, since)
+            if nearest and nearest[0][1] >= threshold:
+                row, similarity = nearest[0]
+                cluster = int(self._clusters[row])
+                duplicate_of = self._ids[row]
+            else:
+                similarity = nearest[0][1] if nearest else None
+                cluster = int(self._clusters.max()) + 1 if len(self._clusters) else 0
+                duplicate_of = None
+
+            self._append(story_id, vector, timestamp, cluster)
+            metrics.increment("story_index.assigned")
+            return {
+                "id": story_id,
+                "cluster_id": cluster,
+                "is_new_cluster": duplicate_of is None,
+                "duplicate_of": duplicate_of,
+                "similarity": round(similarity, 4) if similarity is not None else None,
+                "already_indexed": False
+            }
+
+    def cluster_members(self, cluster_id: int) -> List[str]:
+        """id статей кластера"""
+        with self._lock:
+            self._load()
+            return [self._ids[row] for row in np.nonzero(self._clusters == cluster_id)[0]]
+
+    def stats(self) -> dict:
+        """Статистика индекса"""
+        with self._lock:
+            if not self._loaded:
+                return {"loaded": False}
+            return {
+                "loaded": True,
+                "stories": len(self._ids),
+                "clusters": int(len(np.unique(self._clusters))),
+                "dim": self.dim,
+                "bytes_on_disk": self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+            }
+
+
+# Глобальный индекс сюжетов (файлы читаются при первом обращении)
+story_index = StoryIndex(settings.story_index_dir, block_size=settings.story_index_block_size)
+metrics.register("story_index", story_index.stats)
@@ -1,48 +1,112 @@
 """Сервис для обработки текста (парафразирование, суммаризация)"""
-from typing import Optional
+from typing import List, Optional
+import importlib.util
 import logging
 import os
-from pathlib import Path
+import threading
+
+from services.model_manager import model_manager, import_torch
+from services.model_registry import model_registry
 
 logger = logging.getLogger(__name__)
 
-# Попытка импортировать transformers (может быть не установлен)
-try:
-    from transformers import (
-        MBartForConditionalGeneration,
-        MBartTokenizer,  # Исправлено: MBart50Tokenizer -> MBartTokenizer для mbart_ru_sum_gazeta
-        T5ForConditionalGeneration,
-        T5Tokenizer,
-        AutoModelForSeq2SeqLM,
-        AutoTokenizer
-    )
-    import torch
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+# transformers и torch импортируются при первой загрузке модели (model_manager),
+# а не при импорте модуля: их импорт занимает несколько секунд, и в режиме
+# lazy loading он не должен задерживать старт сервиса. Доступность
+# проверяется по наличию пакетов, без импорта
+TRANSFORMERS_AVAILABLE = (
+    importlib.util.find_spec("transformers") is not None
+    and importlib.util.find_spec("torch") is not None
+)
+if not TRANSFORMERS_AVAILABLE:
     logger.warning("Transformers не установлен. Модели будут работать в режиме заглушек.")
 
+SIMILARITY_AVAILABLE = TRANSFORMERS_AVAILABLE and importlib.util.find_spec("sentence_transformers") is not None
+if TRANSFORMERS_AVAILABLE and not SIMILARITY_AVAILABLE:
+    logger.warning("sentence-transformers не установлен. Проверка схожести будет работать в режиме заглушки.")
+
+# Языковой код MBart для модели суммаризации (mbart_ru_sum_gazeta)
+SUMMARY_LANG_CODE = "ru_RU"
+
+torch = None
+_import_lock = threading.Lock()
+_processor_lock = threading.Lock()
+
+
+def ensure_transformers() -> bool:
+    """Импорт torch при первом обращении к моделям
+
+    Заполняет глобальное имя torch модуля; число потоков torch и
+    токенизаторов применяется один раз (cpu_threads).
+
+    Returns:
+        True, если пакеты доступны
+    """
+    global torch, TRANSFORMERS_AVAILABLE
+
+    if torch is not None or not TRANSFORMERS_AVAILABLE:
+        return TRANSFORMERS_AVAILABLE
+    with _import_lock:
+        if torch is not None:
+            return True
+        try:
+            torch = import_torch()
+        except ImportError as e:
+            TRANSFORMERS_AVAILABLE = False
+            logger.warning(f"Не удалось импортировать torch: {e}. Модели будут работать в режиме заглушек.")
+            return False
+        return True
+
+
+_text_processor: Optional["TextProcessor"] = None
+
+
+def get_text_processor() -> "TextProcessor":
+    """Общий экземпляр TextProcessor (создаётся при первом обращении)
+
+    Все endpoints, фоновые задачи и предзагрузка используют один
+    процессор, поэтому каждая модель загружается в память один раз.
+    """
+    global _text_processor
+    if _text_processor is None:
+        with _processor_lock:
+            if _text_processor is None:
+                _text_processor = TextProcessor()
+    return _text_processor
+
 
 class TextProcessor:
     """Обработка текста: парафразирование и суммаризация"""
     
     def __init__(self):
         """Инициализация процессора"""
-        # Модели парафразирования (русская и английская)
-        self.paraphrase_model_ru = None
-        self.paraphrase_tokenizer_ru = None
-        self.paraphrase_model_en = None
-        self.paraphrase_tokenizer_en = None
-        # Модели суммаризации
-        self.summary_model_ru = None
-        self.summary_tokenizer_ru = None
-        self.summary_model_en = None
-        self.summary_tokenizer_en = None
-        self.similarity_model = None
-        self.models_loaded = False
-        # Получаем путь к кэшу из конфига
-        from config import settings
-        self.models_cache_dir = Path(settings.ml_model_cache_dir)
+        # Модели загружаются и хранятся в model_manager (общие для всего процесса)
+        # Черновые модели для assisted decoding: task -> (model, tokenizer)
+        self.draft_models = {}
+        # Быстрые токенизаторы нельзя вызывать из нескольких потоков одновременно
+        # (запросы в пуле потоков, этапы конвейера батчевой суммаризации):
+        # все вызовы идут через _tokenize/_decode
+        self._tokenizer_lock = threading.Lock()
+    
+    def _tokenize(self, tokenizer, texts, lang_code: Optional[str] = None, **kwargs):
+        """Вызов токенизатора под общей блокировкой
+        
+        Языковые коды MBart (src_lang/tgt_lang) - изменяемое состояние
+        токенизатора, поэтому они задаются в той же критической секции,
+        что и токенизация: параллельный запрос не подменит язык между
+        установкой и использованием.
+        """
+        with self._tokenizer_lock:
+            if lang_code is not None:
+                for attribute in ('src_lang', 'tgt_lang'):
+                    if hasattr(tokenizer, attribute):
+                        setattr(tokenizer, attribute, lang_code)
+            return tokenizer(texts, **kwargs)
+    
+    def _decode(self, tokenizer, ids) -> List[str]:
+        """Декодирование батча под общей блокировкой токенизатора"""
+        with self._tokenizer_lock:
+            return tokenizer.batch_decode(ids, skip_special_tokens=True)
     
     def _detect_language(self, text: str) -> str:
         """Определение языка текста"""
@@ -84,90 +148,17 @@ class TextProcessor:
         return text.strip()
     
     def _load_paraphrase_model(self, language: str = 'ru'):
-        """Загрузка модели для парафразирования
+        """Модель для парафразирования (загружается model_manager один раз)
         
         Args:
             language: 'ru' для русского, 'en' для английского
         """
-        if not TRANSFORMERS_AVAILABLE:
+        if not ensure_transformers():
             logger.warning("Transformers не установлен, используется заглушка")
             return None, None
         
-        # Проверяем, загружена ли уже нужная модель
-        if language == 'ru':
-            if self.paraphrase_model_ru is not None:
-                return self.paraphrase_model_ru, self.paraphrase_tokenizer_ru
-        else:
-            if self.paraphrase_model_en is not None:
-                return self.paraphrase_model_en, self.paraphrase_tokenizer_en
-        
         try:
-            from config import settings
-            # Выбираем модель в зависимости от языка
-            if language == 'ru':
-                model_name = settings.paraphrase_model_ru
-            else:
-                model_name = settings.paraphrase_model_en
-            
-            # Используем последнюю часть имени модели для папки
-            model_folder = model_name.split('/')[-1]
-            model_path = self.models_cache_dir / model_folder
-            
-            logger.info(f"Загрузка модели парафразирования для языка '{language}': {model_name}")
-            
-            # Проверка наличия модели локально
-            config_exists = (model_path / "config.json").exists()
-            weights_exist = (model_path / "pytorch_model.bin").exists() or (model_path / "model.safetensors").exists()
-            local_model_exists = model_path.exists() and config_exists and weights_exist
-            
-            if local_model_exists:
-                logger.info(f"Загрузка модели из локального кэша: {model_path}")
-                # Используем AutoTokenizer для универсальности
-                tokenizer = AutoTokenizer.from_pretrained(str(model_path), local_files_only=True)
-                model = T5ForConditionalGeneration.from_pretrained(str(model_path), local_files_only=True)
-            elif settings.auto_download_models:
-                # Автоматическая загрузка с Hugging Face
-                logger.info(f"Модель не найдена локально. Загрузка с Hugging Face: {model_name}")
-                logger.info("Это может занять несколько минут...")
-                tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=str(self.models_cache_dir))
-                model = T5ForConditionalGeneration.from_pretrained(model_name, cache_dir=str(self.models_cache_dir))
-                logger.info("Модель загружена и сохранена в кэш")
-            else:
-                logger.error(f"Модель не найдена в {model_path} и AUTO_DOWNLOAD_MODELS=False")
-                return None, None
-            
-            # Переводим в режим оценки
-            model.eval()
-            
-            # Оптимизация памяти: отключаем градиенты
-            with torch.no_grad():
-                # Перемещаем на нужное устройство
-                device = settings.ml_device
-                if device == "cuda" and torch.cuda.is_available():
-                    model = model.to("cuda")
-                    # Для CUDA можно использовать float16 для экономии памяти
-                    try:
-                        model = model.half()
-                    except:
-                        pass  # Если не поддерживается, оставляем как есть
-            
-            # Сохраняем модель в соответствующую переменную
-            if language == 'ru':
-                self.paraphrase_model_ru = model
-                self.paraphrase_tokenizer_ru = tokenizer
-            else:
-                self.paraphrase_model_en = model
-                self.paraphrase_tokenizer_en = tokenizer
-            
-            # Очистка памяти после загрузки
-            import gc
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-            
-            logger.info(f"Модель парафразирования ({language}) загружена успешно")
-            return model, tokenizer
-            
+            return model_manager.get(f"paraphrase_{language}")
         except Exception as e:
             logger.error(f"Ошибка загрузки модели парафразирования: {str(e)}")
             return None, None
@@ -178,7 +169,9 @@ class TextProcessor:
         max_length: int = 512,
         temperature: float = 0.7,
         top_p: float = 0.9,
-        num_beams: int = 5
+        num_beams: int = 5,
+        source: Optional[str] = None,
+        fallback: bool = True
     ) -> str:
         """
         Парафразирование текста
@@ -186,7 +179,38 @@ class TextProcessor:
         Автоматически определяет язык и использует соответствующую модель:
         - Русский: cointegrated/rut5-base-paraphraser
         - Английский: google/flan-t5-large
+        
+        При включённом кэше предложений текст парафразируется по предложениям,
+        и в модель уходят только предложения, которых нет в кэше (подписи,
+        дисклеймеры, типовые лиды повторяются от статьи к статье). Ключ кэша
+        включает модель и параметры генерации. temperature=0 - детерминированный
+        beam search, такой парафраз кэшируется всегда. Сэмплированный парафраз
+        (temperature > 0) кэшируется, только если это явно разрешено
+        (PARAPHRASE_SENTENCE_CACHE_ALLOW_SAMPLING).
+        
+        Генерация выполняется в пуле потоков инференса (model_registry.run)
+        и не блокирует event loop.
+        
+        Args:
+            source: URL или домен источника (для статистики кэша по доменам)
+            fallback: False - без заглушки: ошибка модели пробрасывается,
+                недоступная модель - RuntimeError (результат можно кэшировать)
         """
+        return await model_registry.run(
+            "paraphrase", self._paraphrase_sync, text, max_length, temperature, top_p, num_beams, source, fallback
+        )
+    
+    def _paraphrase_sync(
+        self,
+        text: str,
+        max_length: int,
+        temperature: float,
+        top_p: float,
+        num_beams: int,
+        source: Optional[str],
+        fallback: bool = True
+    ) -> str:
+        """Синхронное парафразирование (см. paraphrase)"""
         if TRANSFORMERS_AVAILABLE:
             # Определяем язык текста
             language = self._detect_language(text)
@@ -199,153 +223,237 @@ class TextProcessor:
                 try:
                     from config import settings
                     
-                    # Формируем промпт в зависимости от модели
-                    if language == 'ru':
-                        # Для русской модели rut5-base-paraphraser не нужен префикс
-                        prompt = text
-                    else:
-                        # Для английской модели flan-t5-large используем префикс
-                        prompt = f"paraphrase: {text}"
-                    
-                    # Токенизация
-                    inputs = tokenizer(
-                        prompt,
-                        max_length=512,
-                        truncation=True,
-                        padding=True,
-                        return_tensors="pt"
+                    generation_params = dict(
+                        max_length=max_length,
+                        temperature=temperature,
+                        top_p=top_p,
+                        num_beams=num_beams
                     )
                     
-                    # Перемещаем на нужное устройство
-                    device = settings.ml_device
-                    if device == "cuda" and torch.cuda.is_available():
-                        inputs = {k: v.to("cuda") for k, v in inputs.items()}
+                    sampled = temperature > 0
+                    if not settings.paraphrase_sentence_cache_enabled or (
+                        sampled and not settings.paraphrase_sentence_cache_allow_sampling
+                    ):
+                        return self._paraphrase_texts([text], language, model, tokenizer, **generation_params)[0]
                     
-                    # Генерация
-                    with torch.no_grad():
-                        outputs = model.generate(
-                            **inputs,
-                            max_length=max_length,
-                            num_beams=num_beams,
-                            temperature=temperature,
-                            top_p=top_p,
-                            early_stopping=True,
-                            do_sample=True
-                        )
+                    from services.extractive import split_sentences
+                    from services.sentence_cache import sentence_cache
                     
-                    # Декодирование
-                    paraphrased = tokenizer.decode(outputs[0], skip_special_tokens=True)
+                    namespace = (
+                        model_manager.spec(f"paraphrase_{language}").source,
+                        language,
+                        max_length,
+                        num_beams,
+                        temperature,
+                        top_p
+                    )
+                    sentences = split_sentences(text) or [text]
+                    results = [sentence_cache.get(namespace, sentence, source) for sentence in sentences]
+                    missing = list(dict.fromkeys(
+                        sentence for sentence, result in zip(sentences, results) if result is None
+                    ))
                     
-                    # Постобработка: удаление лишних экранирований и чистка
-                    paraphrased = self._clean_paraphrased_text(paraphrased)
+                    if missing:
+                        paraphrased_missing = dict(zip(
+                            missing,
+                            self._paraphrase_texts(missing, language, model, tokenizer, **generation_params)
+                        ))
+                        for sentence, paraphrased_sentence in paraphrased_missing.items():
+                            sentence_cache.put(namespace, sentence, paraphrased_sentence)
+                        results = [
+                            result if result is not None else paraphrased_missing[sentence]
+                            for sentence, result in zip(sentences, results)
+                        ]
                     
-                    return paraphrased
+                    logger.info(f"Кэш предложений: {len(sentences) - len(missing)}/{len(sentences)} взято из кэша")
+                    return ' '.join(results)
                     
                 except Exception as e:
                     logger.error(f"Ошибка при парафразировании: {str(e)}")
+                    if not fallback:
+                        raise
                     # Fallback на заглушку
         
         # Заглушка если модель не загружена
+        if not fallback:
+            raise RuntimeError("Модель парафразирования недоступна")
+        return self.paraphrase_stub(text)
+    
+    @staticmethod
+    def paraphrase_stub(text: str) -> str:
+        """Заглушка парафраза (модель недоступна или упала)"""
         return f"[Парафраз] {text}"
     
+    def _paraphrase_texts(
+        self,
+        texts: List[str],
+        language: str,
+        model,
+        tokenizer,
+        max_length: int = 512,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        num_beams: int = 5
+    ) -> List[str]:
+        """Парафразирование списка текстов одним батчем"""
+        from config import settings
+        
+        # Формируем промпт в зависимости от модели
+        if language == 'ru':
+            # Для русской модели rut5-base-paraphraser не нужен префикс
+            prompts = list(texts)
+        else:
+            # Для английской модели flan-t5-large используем префикс
+            prompts = [f"paraphrase: {text}" for text in texts]
+        
+        draft_model = self._get_draft_model('paraphrase') if language == 'ru' else None
+        if draft_model is not None and len(prompts) > 1:
+            # Assisted decoding поддерживает только батч из одного текста
+            return [
+                self._paraphrase_texts([text], language, model, tokenizer, max_length, temperature, top_p, num_beams)[0]
+                for text in texts
+            ]
+        
+        # Токенизация
+        inputs = self._tokenize(
+            tokenizer,
+            prompts,
+            max_length=512,
+            truncation=True,
+            padding=True,
+            return_tensors="pt"
+        )
+        
+        # Перемещаем на нужное устройство
+        device = settings.ml_device
+        if device == "cuda" and torch.cuda.is_available():
+            inputs = {k: v.to("cuda") for k, v in inputs.items()}
+        
+        # Генерация: temperature=0 - детерминированный beam search без сэмплирования
+        generate_kwargs = dict(
+            **inputs,
+            max_length=max_length,
+            num_beams=num_beams,
+            early_stopping=True,
+            do_sample=temperature > 0
+        )
+        if temperature > 0:
+            generate_kwargs.update(temperature=temperature, top_p=top_p)
+        with torch.no_grad():
+            outputs = self._generate(model, generate_kwargs, draft_model, task='paraphrase')
+        
+        # Декодирование и постобработка: удаление лишних экранирований и чистка
+        decoded = self._decode(tokenizer, outputs)
+        return [self._clean_paraphrased_text(paraphrased) for paraphrased in decoded]
+    
+    def _get_draft_model(self, task: str):
+        """Черновая модель для assisted decoding (None, если режим выключен)"""
+        from config import settings
+        
+        if not settings.assisted_decoding_enabled:
+            return None
+        model, _ = self._load_draft_model(task)
+        return model
+    
+    def _load_draft_model(self, task: str):
+        """Небольшая черновая seq2seq модель для assisted decoding
+        
+        Черновая модель должна использовать тот же токенизатор (словарь),
+        что и основная: rut5-base-paraphraser для 'paraphrase',
+        mbart_ru_sum_gazeta для 'summary'. Не заданная в настройках или
+        не загрузившаяся модель больше не запрашивается.
+        
+        Args:
+            task: 'paraphrase' или 'summary'
+        """
+        if not ensure_transformers():
+            return None, None
+        
+        if task in self.draft_models:
+            return self.draft_models[task]
+        
+        name = f"draft_{task}"
+        if model_manager.spec(name) is None:
+            self.draft_models[task] = (None, None)
+            return None, None
+        
+        try:
+            self.draft_models[task] = model_manager.get(name)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки черновой модели ({task}): {str(e)}")
+            self.draft_models[task] = (None, None)
+        return self.draft_models[task]
+    
+    def _generate(self, model, generate_kwargs: dict, draft_model=None, task: str = 'paraphrase'):
+        """Вызов model.generate с опциональным assisted decoding
+        
+        Если передана черновая модель, она предлагает токены, а основная
+        проверяет их за один проход. Assisted decoding работает только
+        без beam search, поэтому num_beams принудительно равен 1.
+        
+        Для каждого запроса в метрики пишутся acceptance rate (доля принятых
+        черновых токенов) и ускорение - число токенов на один проход
+        основной модели (у обычного жадного декодирования оно равно 1).
+        """
+        with model_registry.inference(task):
+            if draft_model is None:
+                return model.generate(**generate_kwargs)
+            return self._generate_assisted(model, generate_kwargs, draft_model, task)
+    
+    def _generate_assisted(self, model, generate_kwargs: dict, draft_model, task: str):
+        """Assisted decoding с подсчётом принятых черновых токенов"""
+        import time
+        from services.metrics import metrics
+        
+        calls = {"main": 0, "draft": 0}
+        
+        def counter(name):
+            def hook(module, args, output):
+                calls[name] += 1
+            return hook
+        
+        handles = [
+            model.register_forward_hook(counter("main")),
+            draft_model.register_forward_hook(counter("draft"))
+        ]
+        start_time = time.time()
+        try:
+            outputs = model.generate(
+                **dict(generate_kwargs, num_beams=1, early_stopping=False),
+                assistant_model=draft_model
+            )
+        finally:
+            for handle in handles:
+                handle.remove()
+        elapsed = time.time() - start_time
+        
+        # Первый токен выхода - decoder_start_token
+        new_tokens = max(outputs.shape[-1] - 1, 0)
+        main_passes = max(calls["main"], 1)
+        accepted = max(new_tokens - main_passes, 0)
+        acceptance_rate = accepted / calls["draft"] if calls["draft"] else 0.0
+        speedup = new_tokens / main_passes
+        
+        metrics.increment(f"assisted.{task}.requests")
+        metrics.increment(f"assisted.{task}.draft_tokens", calls["draft"])
+        metrics.increment(f"assisted.{task}.accepted_tokens", accepted)
+        metrics.observe(f"assisted.{task}.acceptance_rate", acceptance_rate)
+        metrics.observe(f"assisted.{task}.speedup", speedup)
+        metrics.observe(f"assisted.{task}.seconds", elapsed)
+        logger.info(
+            f"Assisted decoding ({task}): {new_tokens} токенов за {main_passes} проходов основной модели, "
+            f"acceptance rate {acceptance_rate:.2f}, ускорение x{speedup:.2f}, {elapsed:.2f}с"
+        )
+        return outputs
+    
     def _load_summary_model_ru(self):
-        """Загрузка модели для суммаризации на русском"""
-        if not TRANSFORMERS_AVAILABLE:
+        """Модель для суммаризации на русском (загружается model_manager один раз)"""
+        if not ensure_transformers():
             logger.warning("Transformers не установлен, используется заглушка")
             return None, None
         
-        if self.summary_model_ru is not None:
-            return self.summary_model_ru, self.summary_tokenizer_ru
-        
         try:
-            from config import settings
-            model_path = self.models_cache_dir / "mbart_ru_sum_gazeta"
-            
-            # Проверка наличия модели локально
-            local_model_exists = model_path.exists() and (model_path / "pytorch_model.bin").exists()
-            
-            if local_model_exists:
-                logger.info(f"Загрузка модели из локального кэша: {model_path}")
-                # Проверяем наличие всех необходимых файлов
-                required_files = ["pytorch_model.bin", "config.json", "tokenizer_config.json"]
-                missing_files = [f for f in required_files if not (model_path / f).exists()]
-                if missing_files:
-                    logger.warning(f"Отсутствуют файлы модели: {missing_files}. Попробуем загрузить с Hugging Face.")
-                    local_model_exists = False
-                else:
-                    # Используем AutoTokenizer для автоматического определения правильного класса токенизатора
-                    logger.info("Загрузка токенизатора...")
-                    tokenizer = AutoTokenizer.from_pretrained(str(model_path), local_files_only=True)
-                    logger.info("Токенизатор загружен. Загрузка модели (это может занять время, модель ~2-3 GB)...")
-                    # Загружаем модель с ignore_mismatched_sizes=False для строгой проверки
-                    # ВАЖНО: Используем use_safetensors=False чтобы загрузить pytorch_model.bin, а не safetensors
-                    model = MBartForConditionalGeneration.from_pretrained(
-                        str(model_path), 
-                        local_files_only=True,
-                        ignore_mismatched_sizes=False,
-                        use_safetensors=False  # Принудительно используем pytorch_model.bin
-                    )
-                    logger.info("Модель загружена из кэша")
-            elif settings.auto_download_models:
-                # Автоматическая загрузка с Hugging Face
-                logger.info("Модель не найдена локально. Загрузка с Hugging Face: IlyaGusev/mbart_ru_sum_gazeta")
-                logger.info("Это может занять несколько минут...")
-                model_name = "IlyaGusev/mbart_ru_sum_gazeta"
-                # Используем AutoTokenizer для автоматического определения правильного класса токенизатора
-                logger.info("Скачивание токенизатора...")
-                tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=str(self.models_cache_dir))
-                logger.info("Токенизатор скачан. Скачивание модели (~2-3 GB, это может занять время)...")
-                # ВАЖНО: Используем use_safetensors=False для совместимости
-                model = MBartForConditionalGeneration.from_pretrained(
-                    model_name, 
-                    cache_dir=str(self.models_cache_dir),
-                    use_safetensors=False
-                )
-                logger.info("Модель скачана и сохранена в кэш")
-            else:
-                logger.error(f"Модель не найдена в {model_path} и AUTO_DOWNLOAD_MODELS=False")
-                return None, None
-            
-            # Переводим в режим оценки
-            logger.info("Перевод модели в режим оценки...")
-            model.eval()
-            logger.info("Модель переведена в режим оценки")
-            
-            # Оптимизация памяти: отключаем градиенты и перемещаем на устройство
-            with torch.no_grad():
-                device = settings.ml_device
-                if device == "cuda" and torch.cuda.is_available():
-                    model = model.to("cuda")
-                    # Для CUDA можно использовать float16 для экономии памяти
-                    try:
-                        model = model.half()
-                    except:
-                        pass  # Если не поддерживается, оставляем как есть
-            
-            # Проверка: пробуем закодировать/декодировать тестовый текст
-            try:
-                logger.info("Тестирование токенизатора...")
-                test_text = "Тест"
-                with torch.no_grad():
-                    test_inputs = tokenizer(test_text, return_tensors="pt")
-                    test_decoded = tokenizer.decode(test_inputs["input_ids"][0], skip_special_tokens=True)
-                logger.info(f"Токенизатор работает корректно. Тестовый текст '{test_text}' -> '{test_decoded}'")
-            except Exception as e:
-                logger.warning(f"Предупреждение при тестировании токенизатора: {e}")
-            
-            logger.info("Сохранение модели в память...")
-            self.summary_model_ru = model
-            self.summary_tokenizer_ru = tokenizer
-            
-            # Очистка памяти после загрузки
-            import gc
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-            
-            logger.info("✅ Модель суммаризации загружена успешно")
-            return model, tokenizer
-            
+            return model_manager.get("summary_ru")
         except Exception as e:
             logger.error(f"Ошибка загрузки модели суммаризации: {str(e)}")
             return None, None
@@ -354,13 +462,27 @@ class TextProcessor:
         self,
         text: str,
         target_length: Optional[int] = None,
-        language: Optional[str] = None
+        language: Optional[str] = None,
+        fallback: bool = True
     ) -> str:
         """
         Суммаризация текста
         
-        Использует mbart_ru_sum_gazeta для русского языка
+        Использует mbart_ru_sum_gazeta для русского языка. Генерация
+        выполняется в пуле потоков инференса (model_registry.run) и не
+        блокирует event loop. С fallback=False вместо заглушки ошибка модели
+        пробрасывается, а недоступная модель или другой язык - RuntimeError.
         """
+        return await model_registry.run("summary", self._summarize_sync, text, target_length, language, fallback)
+    
+    def _summarize_sync(
+        self,
+        text: str,
+        target_length: Optional[int],
+        language: Optional[str],
+        fallback: bool = True
+    ) -> str:
+        """Синхронная суммаризация (см. summarize)"""
         # Определение языка
         if language is None:
             language = "ru"  # По умолчанию русский
@@ -372,62 +494,53 @@ class TextProcessor:
             
             if model is not None and tokenizer is not None:
                 try:
+                    from config import settings
+                    
                     logger.info("Подготовка текста к обработке...")
-                    # Настройка языка для MBart (если токенизатор поддерживает)
-                    # Модель mbart_ru_sum_gazeta уже обучена на русском, но может требовать языковую настройку
-                    if hasattr(tokenizer, 'src_lang'):
-                        # Устанавливаем русский язык как исходный
-                        tokenizer.src_lang = "ru_RU"
+                    # Длинный текст сначала сжимаем экстрактивно, иначе окно
+                    # модели заполнится лидом, а остальное будет обрезано
+                    text = self._precompress_for_summary(text, tokenizer)
                     
                     logger.info("Разбиение текста на токены...")
-                    # Токенизация с правильной настройкой языка
-                    inputs = tokenizer(
+                    # Токенизация с русским языком MBart (модель mbart_ru_sum_gazeta
+                    # уже обучена на русском, но может требовать языковую настройку)
+                    inputs = self._tokenize(
+                        tokenizer,
                         text,
-                        max_length=1024,
+                        lang_code=SUMMARY_LANG_CODE,
+                        max_length=settings.summary_max_input_tokens,
                         truncation=True,
                         padding=True,
                         return_tensors="pt"
                     )
                     
-                    # Для MBart моделей нужно добавить языковой токен в decoder_input_ids
-                    # Но для mbart_ru_sum_gazeta это может быть не нужно, так как модель уже специализирована
-                    # Проверяем, есть ли метод для установки целевого языка
-                    if hasattr(tokenizer, 'tgt_lang'):
-                        tokenizer.tgt_lang = "ru_RU"
-                    
-                    # Генерация саммари
-                    # Преобразуем target_length из символов в примерное количество токенов (1 токен ≈ 4 символа)
-                    # Добавляем запас, чтобы модель могла закончить предложение
-                    max_tokens = int((target_length or 200) * 1.5) if target_length else 300
-                    min_tokens = max(30, int((target_length or 200) * 0.3)) if target_length else 50
-                    
                     logger.info(f"Генерация сокращенного текста (это может занять 10-30 секунд)...")
+                    draft_model = self._get_draft_model('summary')
                     with torch.no_grad():
-                        # Для MBart может потребоваться decoder_start_token_id
+                        if draft_model is not None:
+                            # Черновой модели нужны исходные токены: она считает свой энкодер
+                            model_inputs = {
+                                "input_ids": inputs["input_ids"],
+                                "attention_mask": inputs["attention_mask"]
+                            }
+                        else:
+                            # Выходы энкодера берём из кэша: для одного и того же текста
+                            # с другой target_length выполняется только декодирование
+                            model_inputs = {
+                                "encoder_outputs": self._encode_for_summary(model, inputs),
+                                "attention_mask": inputs["attention_mask"]
+                            }
+                        
                         generate_kwargs = {
-                            "input_ids": inputs["input_ids"],
-                            "max_length": max_tokens,
-                            "min_length": min_tokens,
-                            "num_beams": 4,
-                            "early_stopping": True,
-                            "length_penalty": 1.2,
-                            "no_repeat_ngram_size": 3,
-                            "do_sample": False
+                            **model_inputs,
+                            **self._summary_generation_params(tokenizer, target_length)
                         }
                         
-                        # Добавляем decoder_start_token_id если токенизатор его поддерживает
-                        if hasattr(tokenizer, 'lang_code_to_id') and hasattr(tokenizer, 'tgt_lang'):
-                            try:
-                                decoder_start_token_id = tokenizer.lang_code_to_id.get(tokenizer.tgt_lang, tokenizer.eos_token_id)
-                                generate_kwargs["decoder_start_token_id"] = decoder_start_token_id
-                            except:
-                                pass
-                        
-                        summary_ids = model.generate(**generate_kwargs)
+                        summary_ids = self._generate(model, generate_kwargs, draft_model, task='summary')
                     
                     logger.info("Преобразование результата в текст...")
                     # Декодирование
-                    summary = tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+                    summary = self._decode(tokenizer, summary_ids[:1])[0]
                     
                     # Проверка на мусор: если в результате есть нечитаемые символы - возвращаем ошибку
                     if not summary or len(summary.strip()) < 10:
@@ -441,13 +554,238 @@ class TextProcessor:
                     
                 except Exception as e:
                     logger.error(f"Ошибка при суммаризации: {str(e)}")
+                    if not fallback:
+                        raise
                     # Fallback на заглушку
         
         # Заглушка если модель не загружена или другой язык
+        if not fallback:
+            raise RuntimeError(f"Модель суммаризации для языка {language} недоступна")
+        return self.summary_stub(text, target_length)
+    
+    @staticmethod
+    def summary_stub(text: str, target_length: Optional[int] = None) -> str:
+        """Заглушка саммари: начало текста (модель недоступна, упала или другой язык)"""
         if target_length:
             return text[:target_length] + "..."
         return text[:600] + "..."
     
+    def _summary_generation_params(self, tokenizer, target_length: Optional[int] = None) -> dict:
+        """Параметры generate() для модели суммаризации"""
+        # Преобразуем target_length из символов в примерное количество токенов (1 токен ≈ 4 символа)
+        # Добавляем запас, чтобы модель могла закончить предложение
+        max_tokens = int((target_length or 200) * 1.5) if target_length else 300
+        min_tokens = max(30, int((target_length or 200) * 0.3)) if target_length else 50
+        
+        params = {
+            "max_length": max_tokens,
+            "min_length": min_tokens,
+            "num_beams": 4,
+            "early_stopping": True,
+            "length_penalty": 1.2,
+            "no_repeat_ngram_size": 3,
+            "do_sample": False
+        }
+        
+        # Для MBart может потребоваться decoder_start_token_id. Код языка берётся
+        # константой, а не из tokenizer.tgt_lang: атрибут меняется другими потоками
+        if hasattr(tokenizer, 'lang_code_to_id') and hasattr(tokenizer, 'tgt_lang'):
+            try:
+                params["decoder_start_token_id"] = tokenizer.lang_code_to_id.get(SUMMARY_LANG_CODE, tokenizer.eos_token_id)
+            except:
+                pass
+        
+        return params
+    
+    def summarize_batch(self, texts: List[str], target_length: Optional[int] = None) -> List[str]:
+        """
+        Суммаризация списка русских текстов одним батчем (для офлайн-обработки)
+        
+        Батч лучше собирать из текстов близкой длины: паддинг идёт
+        до самого длинного текста. Если модель недоступна или батч
+        упал, возвращаются те же заглушки, что и в summarize().
+        """
+        if not texts:
+            return []
+        batch = self._summary_batch_tokenize(texts)
+        batch = self._summary_batch_generate(batch, target_length)
+        return self._summary_batch_decode(batch, target_length)
+    
+    def summarize_pipeline(
+        self,
+        target_length: Optional[int] = None,
+        tokenize_workers: int = 1,
+        decode_workers: int = 1,
+        queue_size: int = 2,
+        fallback: bool = True
+    ):
+        """
+        Конвейер батчевой суммаризации: токенизация -> generate -> декодирование
+        
+        Токенизация батча N+1 и декодирование с постобработкой батча N-1
+        идут параллельно с generate() батча N. pipeline.run(батчи текстов)
+        выдаёт списки саммари в исходном порядке, pipeline.stats() -
+        загрузку этапов. Вызовы токенизатора сериализуются, поэтому
+        потоки этапов выигрывают на постобработке и экстрактивной части,
+        а не на самой токенизации. Токенизатор общий с запросами API:
+        все вызовы идут через _tokenize/_decode под одной блокировкой.
+        
+        Конвейер рассчитан на офлайн-поток батчей (bulk_summarize.py).
+        Онлайн-пути его не используют: /summarize-urls собирает батчи по
+        окну времени и вызывает summarize_batch (SummaryBatcher), задачи
+        очереди суммаризируют по одному тексту - непрерывного потока
+        батчей, который конвейер мог бы перекрыть, там нет.
+        
+        Args:
+            fallback: False - без заглушек: ошибка модели пробрасывается при
+                выдаче батча, а пустой результат модели возвращается как None
+        """
+        from services.pipeline import Pipeline, Stage
+        
+        # Модель загружается заранее, а не первым потоком этапа
+        self._load_summary_model_ru()
+        
+        return Pipeline([
+            Stage("tokenize", self._summary_batch_tokenize, tokenize_workers),
+            Stage("generate", lambda batch: self._summary_batch_generate(batch, target_length), 1),
+            Stage("decode", lambda batch: self._summary_batch_decode(batch, target_length, fallback), decode_workers)
+        ], queue_size=queue_size)
+    
+    def _summary_batch_tokenize(self, texts: List[str]) -> dict:
+        """Этап батчевой суммаризации: экстрактивное сжатие и токенизация"""
+        batch = {"texts": texts, "inputs": None, "error": None}
+        model, tokenizer = self._load_summary_model_ru() if TRANSFORMERS_AVAILABLE else (None, None)
+        if model is None or tokenizer is None:
+            batch["error"] = "Модель суммаризации недоступна"
+            return batch
+        
+        try:
+            from config import settings
+            
+            batch["inputs"] = self._tokenize(
+                tokenizer,
+                [self._precompress_for_summary(text, tokenizer) for text in texts],
+                lang_code=SUMMARY_LANG_CODE,
+                max_length=settings.summary_max_input_tokens,
+                truncation=True,
+                padding=True,
+                return_tensors="pt"
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при токенизации батча: {str(e)}")
+            batch["error"] = f"Ошибка токенизации: {str(e)}"
+        return batch
+    
+    def _summary_batch_generate(self, batch: dict, target_length: Optional[int] = None) -> dict:
+        """Этап батчевой суммаризации: generate() (ids остаются None при ошибке)"""
+        batch["ids"] = None
+        if batch["inputs"] is None:
+            return batch
+        
+        try:
+            model, tokenizer = self._load_summary_model_ru()
+            generate_kwargs = {
+                "input_ids": batch["inputs"]["input_ids"],
+                "attention_mask": batch["inputs"]["attention_mask"],
+                **self._summary_generation_params(tokenizer, target_length)
+            }
+            with torch.no_grad():
+                batch["ids"] = self._generate(model, generate_kwargs, task='summary')
+        except Exception as e:
+            logger.error(f"Ошибка при батчевой суммаризации: {str(e)}")
+            batch["error"] = f"Ошибка генерации: {str(e)}"
+        return batch
+    
+    def _summary_batch_decode(
+        self,
+        batch: dict,
+        target_length: Optional[int] = None,
+        fallback: bool = True
+    ) -> List[Optional[str]]:
+        """Этап батчевой суммаризации: декодирование и постобработка
+        
+        С fallback=False вместо заглушек: RuntimeError, если батч не
+        сгенерирован, и None для пустого результата модели.
+        """
+        def stub(text):
+            if not fallback:
+                return None
+            return self.summary_stub(text, target_length)
+        
+        if batch.get("ids") is None:
+            if not fallback:
+                raise RuntimeError(batch.get("error") or "Батч не сгенерирован")
+            return [stub(text) for text in batch["texts"]]
+        
+        _, tokenizer = self._load_summary_model_ru()
+        decoded = self._decode(tokenizer, batch["ids"])
+        
+        summaries = []
+        for text, summary in zip(batch["texts"], decoded):
+            if not summary or len(summary.strip()) < 10:
+                logger.warning("Модель вернула пустой или слишком короткий результат")
+                summaries.append(stub(text))
+            else:
+                summaries.append(self._trim_to_complete_sentence(summary, target_length))
+        return summaries
+    
+    def _precompress_for_summary(self, text: str, tokenizer) -> str:
+        """Экстрактивное сжатие текста до бюджета токенов модели суммаризации"""
+        from config import settings
+        from services.extractive import compress_to_token_budget
+        
+        if not settings.extractive_precompress_enabled:
+            return text
+        
+        # Запас под служебные токены (bos/eos/язык)
+        budget = settings.summary_max_input_tokens - 4
+        if len(text) <= budget:
+            # Токен почти всегда не короче символа - такой текст помещается в окно
+            return text
+        
+        def count_tokens(sentences):
+            encoded = self._tokenize(tokenizer, sentences, add_special_tokens=False)["input_ids"]
+            return [len(ids) + 1 for ids in encoded]
+        
+        return compress_to_token_budget(text, budget, count_tokens)
+    
+    def summarize_extractive(self, text: str, target_length: Optional[int] = None) -> str:
+        """Быстрая экстрактивная суммаризация без модели (миллисекунды)"""
+        from services.extractive import extractive_summary
+        
+        return extractive_summary(text, target_length)
+    
+    def _encode_for_summary(self, model, inputs):
+        """Выходы энкодера модели суммаризации (с кэшированием)
+        
+        Возвращает новый BaseModelOutput для передачи в generate()
+        """
+        from config import settings
+        from transformers.modeling_outputs import BaseModelOutput
+        from services.encoder_cache import encoder_cache
+        
+        if not settings.encoder_cache_enabled:
+            return model.get_encoder()(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                return_dict=True
+            )
+        
+        key = encoder_cache.make_key(settings.summary_model_ru, inputs["input_ids"])
+        hidden_state = encoder_cache.get(key)
+        if hidden_state is None:
+            encoder_outputs = model.get_encoder()(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                return_dict=True
+            )
+            hidden_state = encoder_outputs.last_hidden_state
+            encoder_cache.put(key, hidden_state)
+        else:
+            logger.info("Выходы энкодера взяты из кэша")
+        
+        return BaseModelOutput(last_hidden_state=hidden_state)
+    
     def _trim_to_complete_sentence(self, text: str, max_length: Optional[int] = None) -> str:
         """
         Обрезает текст до последнего законченного предложения
@@ -510,10 +848,18 @@ class TextProcessor:
         """
         Проверка семантической схожести
         
-        TODO: Реальная реализация через sentence-transformers
-        Пока возвращает заглушку
+        Косинусная близость эмбеддингов общей модели схожести
+        (embedding_service: векторы нормированы и кэшируются). Кодирование
+        выполняется в потоке и не блокирует event loop. Без
+        sentence-transformers (requirements-minimal) - заглушка.
         """
-        # Заглушка - возвращает фиксированное значение
-        # В реальной реализации здесь будет загрузка модели и вычисление схожести
-        return 0.85
+        if not SIMILARITY_AVAILABLE:
+            return 0.85
+        
+        import asyncio
+        from services.embeddings import embedding_service
+        
+        vectors = await asyncio.to_thread(embedding_service.encode, [text1, text2])
+        similarity = float(vectors[0] @ vectors[1])
+        return round(min(max(similarity, 0.0), 1.0), 4)
 
@@ -0,0 +1,144 @@
+"""Пакетная суммаризация статей по списку URL (утренний дайджест и т.п.)"""
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import time
+import logging
+
+from config import settings
+from services.content_extractor import ContentExtractor
+from services.metrics import metrics
+from services.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryBatcher:
+    """Сбор текстов в батчи суммаризации по окну времени
+
+    Тексты приходят по мере загрузки страниц. Первый текст открывает окно
+    batch_window секунд; всё, что пришло за окно (но не больше max_batch),
+    суммаризируется одним вызовом summarize_batch в пуле потоков инференса. Одновременно
+    выполняется не больше slots батчей.
+    """
+
+    def __init__(self, processor, target_length: Optional[int], window: float, max_batch: int, slots: int):
+        self.processor = processor
+        self.target_length = target_length
+        self.window = window
+        self.max_batch = max_batch
+        self._slots = asyncio.Semaphore(slots)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def submit(self, text: str) -> str:
+        """Саммари текста (ожидание своего батча)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        async with self._slots:
+            start = time.perf_counter()
+            try:
+                summaries = await model_registry.run(
+                    "summary", self.processor.summarize_batch, texts, self.target_length
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        metrics.observe("url_batch.batch_size", len(texts))
+        metrics.observe("url_batch.batch_seconds", time.perf_counter() - start)
+        for (_, future), summary in zip(batch, summaries):
+            if not future.done():
+                future.set_result(summary)
+
+
+async def summarize_urls(urls: List[str], processor, target_length: Optional[int] = None) -> AsyncIterator[Dict]:
+    """
+    Загрузка, извлечение и суммаризация списка статей
+
+    Страницы загружаются параллельно (не больше BULK_MAX_CONCURRENCY всего
+    и BULK_PER_HOST_CONCURRENCY на один сайт), русские тексты собираются
+    в батчи суммаризации. Результаты выдаются по мере готовности, а не в
+    порядке входа: поле index указывает позицию URL в запросе.
+
+    Yields:
+        Dict с результатом (status="ok") или ошибкой (status="error") для каждого URL
+    """
+    extractor = ContentExtractor()
+    global_limit = asyncio.Semaphore(settings.bulk_max_concurrency)
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+    batcher = SummaryBatcher(
+        processor,
+        target_length,
+        window=settings.bulk_batch_window_ms / 1000,
+        max_batch=settings.max_batch_size,
+        slots=settings.inference_slots
+    )
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def handle(index: int, url: str) -> None:
+        start = time.perf_counter()
+        host = urlsplit(url).hostname or ""
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(settings.bulk_per_host_concurrency))
+        try:
+            async with global_limit, host_limit:
+                extracted = await extractor.extract_from_url(url)
+            text = extracted["text"]
+            language = extracted.get("language", "ru")
+            if language == "ru":
+                summary = await batcher.submit(text)
+            else:
+                summary = await processor.summarize(text, target_length=target_length, language=language)
+            result = {
+                "index": index,
+                "url": url,
+                "status": "ok",
+                "title": extracted.get("title", ""),
+                "summary": summary,
+                "language": language,
+                "original_length": len(text),
+                "summary_length": len(summary),
+                "processing_time": round(time.perf_counter() - start, 3)
+            }
+            metrics.increment("url_batch.ok")
+        except Exception as e:
+            logger.warning(f"Пакетная суммаризация: ошибка для {url}: {e}")
+            result = {
+                "index": index,
+                "url": url,
+                "status": "error",
+                "error": str(e),
+                "processing_time": round(time.perf_counter() - start, 3)
+            }
+            metrics.increment("url_batch.errors")
+        await results.put(result)
+
+    tasks = [asyncio.create_task(handle(index, url)) for index, url in enumerate(urls)]
+    try:
+        for _ in tasks:
+            yield await results.get()
+    finally:
+        # Клиент отключился: незавершённые загрузки не нужны
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,102 @@
+"""Отчёт о времени запуска сервиса (импорты и этапы startup)"""
+from typing import Dict, List, Optional
+import builtins
+import sys
+import threading
+import time
+
+
+class StartupTiming:
+    """Время импорта модулей и этапов запуска
+
+    install() подменяет builtins.__import__ и замеряет импорт каждого
+    ещё не загруженного модуля. Собственное время модуля (без вложенных
+    импортов) суммируется по пакетам верхнего уровня: так видно, какая
+    зависимость или какой модуль сервиса замедляет холодный старт.
+    report() один раз формирует разбивку и снимает подмену, после чего
+    импорты больше не замеряются; uninstall() снимает подмену без отчёта
+    (вызывается в finally при старте, чтобы неудачный запуск не оставил её).
+    """
+
+    def __init__(self, top: int = 12):
+        self.top = top
+        self._original_import = builtins.__import__
+        self._installed = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._packages: Dict[str, float] = {}
+        self._stages: Dict[str, float] = {}
+        self._started = self._last_mark = time.perf_counter()
+        self._report: Optional[Dict] = None
+
+    def install(self) -> None:
+        """Начало замера импортов (вызывается до импорта остальных модулей)"""
+        if self._installed or self._report is not None:
+            return
+        self._installed = True
+        self._started = self._last_mark = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self) -> None:
+        """Восстановление исходного __import__ (повторный вызов ничего не делает)"""
+        if self._installed:
+            builtins.__import__ = self._original_import
+            self._installed = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        stack: List[float] = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)  # время вложенных импортов
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            package = name.split(".")[0]
+            with self._lock:
+                self._packages[package] = self._packages.get(package, 0.0) + elapsed - nested
+
+    def mark(self, name: str) -> None:
+        """Конец этапа запуска (длительность считается от предыдущей отметки)"""
+        now = time.perf_counter()
+        self._stages[name] = now - self._last_mark
+        self._last_mark = now
+
+    def report(self) -> str:
+        """Разбивка времени запуска одной строкой (формируется один раз)
+
+        Снимает подмену __import__; повторные вызовы возвращают ту же строку.
+        """
+        if self._report is None:
+            self.uninstall()
+            with self._lock:
+                packages = sorted(self._packages.items(), key=lambda item: item[1], reverse=True)
+            self._report = {
+                "total_seconds": round(time.perf_counter() - self._started, 3),
+                "imports_seconds": round(sum(seconds for _, seconds in packages), 3),
+                "imports": {package: round(seconds, 3) for package, seconds in packages[:self.top]},
+                "stages": {name: round(seconds, 3) for name, seconds in self._stages.items()}
+            }
+        imports = ", ".join(f"{package} {seconds:.2f}" for package, seconds in self._report["imports"].items())
+        stages = ", ".join(f"{name} {seconds:.2f}" for name, seconds in self._report["stages"].items())
+        return (
+            f"Время запуска: {self._report['total_seconds']:.2f} с, "
+            f"импорты {self._report['imports_seconds']:.2f} с ({imports}); этапы: {stages or '-'}"
+        )
+
+    def stats(self) -> Dict:
+        """Отчёт для /metrics (пустой, пока запуск не завершён)"""
+        return self._report or {}
+
+
+# Глобальный замер запуска (устанавливается первой строкой main.py)
+startup_timing = StartupTiming()
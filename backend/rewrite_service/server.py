@@ -54,6 +54,15 @@ yandex_env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'yand
 if os.path.exists(yandex_env_path):
     load_dotenv(yandex_env_path, override=True)
 
+# Максимальный размер загружаемой страницы (больше - дочитывается до лимита и обрезается)
+PAGE_MAX_KB = int(os.getenv('PAGE_MAX_KB', '2048'))
+
+# Типы содержимого, которые имеет смысл разбирать как статью (пустой - не указан сервером)
+HTML_CONTENT_TYPES = ('', 'text/html', 'application/xhtml+xml', 'application/xml', 'text/xml', 'text/plain')
+
+# Извлечение статей через ML Service (/api/v1/extract), локальное - как запасной вариант
+ML_EXTRACTION_ENABLED = os.getenv('ML_EXTRACTION_ENABLED', 'true').lower() == 'true'
+
 app = Flask(__name__)
 CORS(app)  # Разрешаем CORS для запросов с сайта
 
@@ -419,89 +428,206 @@ def clean_model_response(text):
     return result
 
 
-def extract_text_from_url(url):
-    """Извлекает текст статьи из URL (улучшенная версия)"""
-    try:
-        # Используем более полные заголовки для обхода защиты от ботов
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        # Используем сессию для сохранения cookies
-        session = requests.Session()
+def extract_text_from_html(html_content):
+    """Извлекает и очищает текст статьи из HTML (без загрузки страницы)"""
+    soup = BeautifulSoup(html_content, 'lxml')
+    
+    # Удаляем скрипты и стили
+    for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
+        script.decompose()
+    
+    # Извлекаем текст из основных тегов
+    text_parts = []
+    for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'article', 'div']):
+        text = tag.get_text(strip=True)
+        if text and len(text) > 20:  # Игнорируем короткие фрагменты
+            text_parts.append(text)
+    
+    article_text = '\n\n'.join(text_parts)
+    
+    if not article_text or len(article_text) < 100:
+        # Если не удалось извлечь текст, пробуем получить весь текст страницы
+        article_text = soup.get_text(separator='\n', strip=True)
+    
+    return clean_article_text(article_text)
+
+
+def clean_article_text(article_text):
+    """Очищает извлечённый текст статьи от рекламных и служебных фраз"""
+    # Очищаем текст от нежелательных фраз (реклама, регистрация и т.д.)
+    unwanted_phrases = [
+        r'\*\*OMG[^\*]*\*\*',  # **OMG, это реально!**
+        r'🚨\s*\*\*[^\*]*Регистрация пройдена успешно[^\*]*\*\*\s*🚨',  # 🚨 **Регистрация пройдена успешно!** 🚨
+        r'Перейти по ссылке из письма[^\.]*\.',  # Перейти по ссылке из письма...
+        r'если не видите[^\.]*\.',  # если не видите, ищите в спаме
+        r'ищите в спаме',
+        r'---\s*###\s*📅',  # --- ### 📅
+        r'Регистрация пройдена успешно[!\.]*',
+        r'Пожалуйста[^\.]*перейдите[^\.]*\.',
+        r'Перейдите по ссылке[^\.]*\.',
+    ]
+    
+    for pattern in unwanted_phrases:
+        article_text = re.sub(pattern, '', article_text, flags=re.IGNORECASE | re.MULTILINE)
+    
+    # Убираем лишние пробелы после очистки
+    article_text = re.sub(r'\s+', ' ', article_text)
+    article_text = re.sub(r'\n\s*\n', '\n\n', article_text)
+    article_text = article_text.strip()
+    
+    return article_text[:50000]  # Ограничиваем длину
+
+
+def download_article_page(url):
+    """Загружает страницу статьи (заголовки браузера, повтор при 403)"""
+    # Используем более полные заголовки для обхода защиты от ботов
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Cache-Control': 'max-age=0'
+    }
+    
+    # Используем сессию для сохранения cookies
+    session = requests.Session()
+    session.headers.update(headers)
+    
+    # stream=True: тело читается потоково и с ограничением размера (read_page_body)
+    response = session.get(url, timeout=30, allow_redirects=True, stream=True)
+    
+    # Обрабатываем ошибки 403 более корректно
+    if response.status_code == 403:
+        response.close()
+        logger.warning(f"Получен 403 Forbidden для {url}, пробуем с другими заголовками...")
+        # Пробуем с другим User-Agent
+        headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0'
+        headers['Referer'] = 'https://www.google.com/'
         session.headers.update(headers)
+        response = session.get(url, timeout=30, allow_redirects=True, stream=True)
         
-        response = session.get(url, timeout=30, allow_redirects=True)
-        
-        # Обрабатываем ошибки 403 более корректно
         if response.status_code == 403:
-            logger.warning(f"Получен 403 Forbidden для {url}, пробуем с другими заголовками...")
-            # Пробуем с другим User-Agent
-            headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0'
-            headers['Referer'] = 'https://www.google.com/'
-            session.headers.update(headers)
-            response = session.get(url, timeout=30, allow_redirects=True)
-            
-            if response.status_code == 403:
-                error_msg = f"Сайт {url} блокирует доступ (403 Forbidden). Возможно, требуется авторизация или сайт защищен от автоматических запросов."
-                logger.error(error_msg)
-                raise requests.exceptions.HTTPError(error_msg, response=response)
-        
+            response.close()
+            error_msg = f"Сайт {url} блокирует доступ (403 Forbidden). Возможно, требуется авторизация или сайт защищен от автоматических запросов."
+            logger.error(error_msg)
+            raise requests.exceptions.HTTPError(error_msg, response=response)
+    
+    return response
+
+
+def safe_cut(body):
+    """Обрезка HTML по последнему '>' (не разрывает тег и символ UTF-8)"""
+    position = body.rfind(b'>')
+    return body[:position + 1] if position >= len(body) // 2 else body
+
+
+def read_page_body(response, max_bytes=None):
+    """Потоковое чтение тела страницы (response получен с stream=True)
+
+    Content-Type проверяется до чтения тела, бинарное содержимое
+    отклоняется по первому фрагменту, чтение останавливается на
+    max_bytes (PAGE_MAX_KB), и страница обрезается по границе тега.
+    """
+    max_bytes = max_bytes or PAGE_MAX_KB * 1024
+    try:
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in HTML_CONTENT_TYPES:
+            raise ValueError(f"Неподдерживаемый тип содержимого: {content_type}")
+
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=65536):
+            if not body and b'\x00' in chunk[:1024]:
+                raise ValueError("Страница содержит бинарные данные")
+            body += chunk
+            if len(body) >= max_bytes:
+                logger.info(f"Страница {response.url} обрезана до {max_bytes // 1024} КБ")
+                return safe_cut(bytes(body[:max_bytes]))
+        return bytes(body)
+    finally:
+        response.close()
+
+
+def fetch_article_page(url):
+    """HTML страницы статьи (локальное извлечение, когда ML Service недоступен)
+
+    Страницы кэширует ML Service (services/page_cache.py); здесь страница
+    загружается один раз на извлечение статьи (extract_article).
+    """
+    response = download_article_page(url)
+    if not response.ok:
+        response.close()
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        # Удаляем скрипты и стили
-        for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            script.decompose()
-        
-        # Извлекаем текст из основных тегов
-        text_parts = []
-        for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'article', 'div']):
-            text = tag.get_text(strip=True)
-            if text and len(text) > 20:  # Игнорируем короткие фрагменты
-                text_parts.append(text)
-        
-        article_text = '\n\n'.join(text_parts)
-        
-        if not article_text or len(article_text) < 100:
-            # Если не удалось извлечь текст, пробуем получить весь текст страницы
-            article_text = soup.get_text(separator='\n', strip=True)
-        
-        # Очищаем текст от нежелательных фраз (реклама, регистрация и т.д.)
-        unwanted_phrases = [
-            r'\*\*OMG[^\*]*\*\*',  # **OMG, это реально!**
-            r'🚨\s*\*\*[^\*]*Регистрация пройдена успешно[^\*]*\*\*\s*🚨',  # 🚨 **Регистрация пройдена успешно!** 🚨
-            r'Перейти по ссылке из письма[^\.]*\.',  # Перейти по ссылке из письма...
-            r'если не видите[^\.]*\.',  # если не видите, ищите в спаме
-            r'ищите в спаме',
-            r'---\s*###\s*📅',  # --- ### 📅
-            r'Регистрация пройдена успешно[!\.]*',
-            r'Пожалуйста[^\.]*перейдите[^\.]*\.',
-            r'Перейдите по ссылке[^\.]*\.',
-        ]
-        
-        for pattern in unwanted_phrases:
-            article_text = re.sub(pattern, '', article_text, flags=re.IGNORECASE | re.MULTILINE)
-        
-        # Убираем лишние пробелы после очистки
-        article_text = re.sub(r'\s+', ' ', article_text)
-        article_text = re.sub(r'\n\s*\n', '\n\n', article_text)
-        article_text = article_text.strip()
-        
-        return article_text[:50000]  # Ограничиваем длину
+    return read_page_body(response)
+
+
+def extract_article_via_ml(url):
+    """Статья из ML Service (/api/v1/extract): текст, заголовок, изображение, дата и язык
+    за одну загрузку и один разбор HTML. None, если ML Service недоступен или не справился
+    (тогда используется локальное извлечение)."""
+    if not ML_EXTRACTION_ENABLED:
+        return None
+    try:
+        response = requests.post(
+            f"{os.getenv('ML_SERVICE_URL', 'http://localhost:8000')}/api/v1/extract",
+            json={'url': url},
+            headers={'X-API-Key': os.getenv('API_KEY', 'your-api-key-here')},
+            timeout=60
+        )
+        if response.status_code == 200:
+            return response.json()
+        logger.warning(f"ML Service не извлёк статью {url}: {response.status_code} - {response.text[:200]}")
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"ML Service недоступен для извлечения {url}: {e}")
+    return None
+
+
+def extract_article(url):
+    """Статья по URL: {'text', 'title', 'image'} за одно обращение к ML Service
+
+    Поля, которые ML Service не вернул (или весь ответ, если он недоступен),
+    извлекаются локально из одной загрузки страницы. Ошибка загрузки
+    пробрасывается, только если не удалось получить текст статьи.
+    """
+    ml_article = extract_article_via_ml(url) or {}
+    article = {
+        'text': clean_article_text(ml_article['text']) if ml_article.get('text') else None,
+        'title': ml_article['title'][:500] if ml_article.get('title') else None,
+        'image': ml_article.get('image') or None
+    }
+    if all(article.values()):
+        return article
+
+    try:
+        page = fetch_article_page(url)
     except Exception as e:
-        logger.error(f"Ошибка извлечения текста из URL {url}: {e}")
-        raise
+        if not article['text']:
+            logger.error(f"Ошибка извлечения текста из URL {url}: {e}")
+            raise
+        logger.warning(f"Не удалось загрузить страницу {url} для заголовка и изображения: {e}")
+        return article
+
+    if not article['text']:
+        article['text'] = extract_text_from_html(page)
+    for name, extract in (
+        ('title', extract_title_from_html),
+        ('image', lambda content: extract_image_from_html(content, url))
+    ):
+        if not article[name]:
+            try:
+                article[name] = extract(page)
+            except Exception as e:
+                logger.error(f"Ошибка извлечения поля {name} из URL {url}: {e}")
+    return article
+
+
+def extract_text_from_url(url):
+    """Извлекает текст статьи из URL (улучшенная версия)"""
+    return extract_article(url)['text']
 
 
 def extract_article_text(url):
@@ -509,103 +635,95 @@ def extract_article_text(url):
     return extract_text_from_url(url)
 
 
+def extract_title_from_html(html_content):
+    """Заголовок страницы из тега <title>"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    title_tag = soup.find('title')
+    return title_tag.get_text().strip()[:500] if title_tag else None
+
+
+def extract_title_from_url(url):
+    """Заголовок статьи по URL (None, если страница недоступна)"""
+    try:
+        return extract_article(url)['title']
+    except Exception:
+        return None
+
+
 def extract_image_from_url(url):
     """Извлекает изображение из статьи (og:image, article:image, или первое крупное изображение)"""
     try:
-        # Используем те же заголовки, что и для извлечения текста
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        session = requests.Session()
-        session.headers.update(headers)
-        response = session.get(url, timeout=30, allow_redirects=True)
-        
-        # Обрабатываем ошибки 403
-        if response.status_code == 403:
-            logger.warning(f"Получен 403 Forbidden при извлечении изображения из {url}, пробуем с другими заголовками...")
-            headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0'
-            headers['Referer'] = 'https://www.google.com/'
-            session.headers.update(headers)
-            response = session.get(url, timeout=30, allow_redirects=True)
-        
-        response.raise_for_status()
+        return extract_article(url)['image']
+    except Exception as e:
+        logger.error(f"Ошибка извлечения изображения из URL {url}: {e}")
+        return None
+
+
+def extract_image_from_html(html_content, url):
+    """Ищет изображение статьи в HTML (URL страницы нужен для относительных ссылок)"""
+    soup = BeautifulSoup(html_content, 'lxml')
+    
+    # Приоритет 1: Open Graph изображение
+    og_image = soup.find('meta', property='og:image')
+    if og_image and og_image.get('content'):
+        image_url = og_image.get('content')
+        # Если относительный URL, делаем абсолютным
+        if image_url.startswith('//'):
+            image_url = 'https:' + image_url
+        elif image_url.startswith('/'):
+            image_url = urljoin(url, image_url)
+        logger.info(f"Найдено og:image: {image_url}")
+        return image_url
+    
+    # Приоритет 2: article:image
+    article_image = soup.find('meta', property='article:image')
+    if article_image and article_image.get('content'):
+        image_url = article_image.get('content')
+        if image_url.startswith('//'):
+            image_url = 'https:' + image_url
+        elif image_url.startswith('/'):
+            image_url = urljoin(url, image_url)
+        logger.info(f"Найдено article:image: {image_url}")
+        return image_url
+    
+    # Приоритет 3: Первое крупное изображение в статье
+    images = soup.find_all('img')
+    for img in images:
+        src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+        if not src:
+            continue
         
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        # Приоритет 1: Open Graph изображение
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            image_url = og_image.get('content')
-            # Если относительный URL, делаем абсолютным
-            if image_url.startswith('//'):
-                image_url = 'https:' + image_url
-            elif image_url.startswith('/'):
-                image_url = urljoin(url, image_url)
-            logger.info(f"Найдено og:image: {image_url}")
-            return image_url
+        # Пропускаем маленькие изображения (иконки, логотипы)
+        width = img.get('width')
+        height = img.get('height')
+        if width and height:
+            try:
+                if int(width) < 200 or int(height) < 200:
+                    continue
+            except (ValueError, TypeError):
+                pass
         
-        # Приоритет 2: article:image
-        article_image = soup.find('meta', property='article:image')
-        if article_image and article_image.get('content'):
-            image_url = article_image.get('content')
-            if image_url.startswith('//'):
-                image_url = 'https:' + image_url
-            elif image_url.startswith('/'):
-                image_url = urljoin(url, image_url)
-            logger.info(f"Найдено article:image: {image_url}")
-            return image_url
+        # Пропускаем логотипы и иконки по классам/alt
+        img_class = img.get('class', [])
+        img_alt = (img.get('alt') or '').lower()
+        if any(skip in str(img_class).lower() or skip in img_alt for skip in ['logo', 'icon', 'avatar', 'button']):
+            continue
         
-        # Приоритет 3: Первое крупное изображение в статье
-        images = soup.find_all('img')
-        for img in images:
-            src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
-            if not src:
-                continue
-            
-            # Пропускаем маленькие изображения (иконки, логотипы)
-            width = img.get('width')
-            height = img.get('height')
-            if width and height:
-                try:
-                    if int(width) < 200 or int(height) < 200:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-            
-            # Пропускаем логотипы и иконки по классам/alt
-            img_class = img.get('class', [])
-            img_alt = (img.get('alt') or '').lower()
-            if any(skip in str(img_class).lower() or skip in img_alt for skip in ['logo', 'icon', 'avatar', 'button']):
-                continue
-            
-            # Делаем URL абсолютным
-            if src.startswith('//'):
-                image_url = 'https:' + src
-            elif src.startswith('/'):
-                image_url = urljoin(url, src)
-            elif not src.startswith('http'):
-                image_url = urljoin(url, src)
-            else:
-                image_url = src
-            
-            logger.info(f"Найдено изображение в статье: {image_url}")
-            return image_url
+        # Делаем URL абсолютным
+        if src.startswith('//'):
+            image_url = 'https:' + src
+        elif src.startswith('/'):
+            image_url = urljoin(url, src)
+        elif not src.startswith('http'):
+            image_url = urljoin(url, src)
+        else:
+            image_url = src
         
-        logger.warning(f"Изображение не найдено в статье: {url}")
-        return None
-    except Exception as e:
-        logger.error(f"Ошибка извлечения изображения из URL {url}: {e}")
-        return None
+        logger.info(f"Найдено изображение в статье: {image_url}")
+        return image_url
+    
+    logger.warning(f"Изображение не найдено в статье: {url}")
+    return None
 
 
 def extract_keywords_for_image_search(article_text, rewritten_text=None):
@@ -999,6 +1117,22 @@ def generate_image_with_kandinsky(prompt, api_key=None, project_id=None):
     return generate_image_with_kandinsky_direct(prompt)
 
 
+def clean_html_for_telegram(text):
+    """Убирает HTML теги из текста, оставляя только текст (для отправки в Telegram)"""
+    # Убираем все HTML теги
+    text = re.sub(r'<[^>]+>', '', text)
+    # Заменяем множественные пробелы на одинарные
+    text = re.sub(r'\s+', ' ', text)
+    # Заменяем HTML entities
+    text = text.replace('&nbsp;', ' ')
+    text = text.replace('&amp;', '&')
+    text = text.replace('&lt;', '<')
+    text = text.replace('&gt;', '>')
+    text = text.replace('&quot;', '"')
+    text = text.replace('&#39;', "'")
+    return text.strip()
+
+
 def convert_markdown_to_html(text):
     """Конвертирует markdown в HTML, убирая синтаксис, но сохраняя структуру"""
     # Сначала убираем markdown синтаксис из текста
@@ -1085,10 +1219,15 @@ def convert_markdown_to_html(text):
     return result
 
 
-def rewrite_article_with_ml(article_text, model_type):
-    """Рерайтит статью через ML Service (RUT5 или FLAN-T5)"""
+def rewrite_article_with_ml(article_text, model_type, source_url=None):
+    """Рерайтит статью через ML Service (RUT5 или FLAN-T5)
+    
+    source_url передаётся в ML Service для статистики кэша предложений по доменам.
+    ML_TEMPERATURE=0 - детерминированный парафраз (работает кэш предложений ML Service)
+    """
     ML_SERVICE_URL = os.getenv('ML_SERVICE_URL', 'http://localhost:8000')
     API_KEY = os.getenv('API_KEY', 'your-api-key-here')
+    ML_TEMPERATURE = float(os.getenv('ML_TEMPERATURE', '0.7'))
     
     # RUT5 работает с небольшими фрагментами текста
     # Разбиваем длинный текст на предложения и обрабатываем частями
@@ -1137,8 +1276,9 @@ def rewrite_article_with_ml(article_text, model_type):
                     json={
                         "text": chunk,
                         "max_length": 512,
-                        "temperature": 0.7,
-                        "top_p": 0.9
+                        "temperature": ML_TEMPERATURE,
+                        "top_p": 0.9,
+                        "source_url": source_url
                     },
                     headers={
                         "Content-Type": "application/json",
@@ -1375,6 +1515,8 @@ def rewrite_article():
             pass
         
         # Определяем, используем ли мы URL или прямой текст
+        # Текст, изображение и заголовок статьи берутся из одного извлечения
+        article = None
         if article_text_direct:
             # Используем прямой текст
             article_text = article_text_direct.strip()
@@ -1384,7 +1526,8 @@ def rewrite_article():
             logger.info(f"Начало обработки статьи: URL={article_url}, стиль={style}, провайдер={provider}")
             logger.info(f"Извлечение текста из URL: {article_url}")
             try:
-                article_text = extract_text_from_url(article_url)
+                article = extract_article(article_url)
+                article_text = article['text']
                 logger.info(f"Текст статьи извлечен, длина: {len(article_text)} символов")
             except Exception as e:
                 logger.error(f"Ошибка извлечения текста из {article_url}: {e}")
@@ -1403,7 +1546,7 @@ def rewrite_article():
                 rewritten_text = rewrite_article_with_yandex(article_text, style)
             elif provider in ['rut5', 'flant5']:
                 # Используем ML service для парафразирования
-                rewritten_text = rewrite_article_with_ml(article_text, provider)
+                rewritten_text = rewrite_article_with_ml(article_text, provider, source_url=article_url or None)
             
             logger.info(f"Статья обработана, длина результата: {len(rewritten_text)} символов")
             
@@ -1420,9 +1563,8 @@ def rewrite_article():
         
         # 1. Изображение из оригинальной статьи (только если был передан URL)
         original_image = None
-        if article_url:
-            logger.info("Извлечение изображения из оригинальной статьи...")
-            original_image = extract_image_from_url(article_url)
+        if article:
+            original_image = article['image']
             logger.info(f"Оригинальное изображение: {'найдено' if original_image else 'не найдено'}")
         else:
             logger.info("Пропускаем извлечение изображения из статьи (передан прямой текст)")
@@ -1497,18 +1639,8 @@ def rewrite_article():
                     start_time = time.time()
                     user_url = None
                     if article_url:
-                        # Пытаемся извлечь заголовок из URL
-                        title = None
-                        try:
-                            # Пытаемся получить заголовок из HTML
-                            response = requests.get(article_url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                            if response.status_code == 200:
-                                soup = BeautifulSoup(response.text, 'html.parser')
-                                title_tag = soup.find('title')
-                                if title_tag:
-                                    title = title_tag.get_text().strip()[:500]
-                        except:
-                            pass
+                        # Заголовок из уже извлечённой статьи
+                        title = article['title'] if article else None
                         
                         user_url = save_user_url(
                             user_id=user.id,
@@ -1638,25 +1770,8 @@ def send_article():
         success_count = 0
         failed_channels = []
         
-        # Функция для очистки HTML тегов из текста для Telegram
-        def clean_html_for_telegram(text):
-            """Убирает HTML теги из текста, оставляя только текст"""
-            import re
-            # Убираем все HTML теги
-            text = re.sub(r'<[^>]+>', '', text)
-            # Заменяем множественные пробелы на одинарные
-            text = re.sub(r'\s+', ' ', text)
-            # Заменяем HTML entities
-            text = text.replace('&nbsp;', ' ')
-            text = text.replace('&amp;', '&')
-            text = text.replace('&lt;', '<')
-            text = text.replace('&gt;', '>')
-            text = text.replace('&quot;', '"')
-            text = text.replace('&#39;', "'")
-            return text.strip()
-        
         # Очищаем текст от HTML тегов перед отправкой
-        clean_article_text = clean_html_for_telegram(article_text)
+        caption_text = clean_html_for_telegram(article_text)
         
         # Асинхронная функция для отправки сообщений
         async def send_messages():
@@ -1677,7 +1792,7 @@ def send_article():
                                 await current_bot.send_photo(
                                     chat_id=channel['id'],
                                     photo=image_url,
-                                    caption=clean_article_text[:1024],  # Ограничиваем длину подписи (макс 1024 символа)
+                                    caption=caption_text[:1024],  # Ограничиваем длину подписи (макс 1024 символа)
                                     parse_mode=None  # Не используем HTML парсинг для подписи
                                 )
                                 logger.info(f"✅ Статья с изображением успешно отправлена в канал: {channel['name']} ({channel['id']})")
@@ -1711,7 +1826,7 @@ def send_article():
                                                 await current_bot.send_photo(
                                                     chat_id=channel['id'],
                                                     photo=input_photo,
-                                                    caption=clean_article_text[:1024],
+                                                    caption=caption_text[:1024],
                                                     parse_mode=None  # Не используем HTML парсинг
                                                 )
                                                 logger.info(f"✅ Статья с изображением (скачанным) отправлена в канал: {channel['name']}")
@@ -1722,14 +1837,14 @@ def send_article():
                                     logger.warning(f"Не удалось отправить фото (скачивание тоже не помогло) в {channel['name']}: {download_error}, отправляем только текст")
                                     await current_bot.send_message(
                                         chat_id=channel['id'],
-                                        text=clean_article_text,
+                                        text=caption_text,
                                         parse_mode=None  # Не используем HTML парсинг
                                     )
                         else:
                             logger.info(f"📝 Отправка статьи БЕЗ ИЗОБРАЖЕНИЯ в канал {channel['name']} ({channel['id']})")
                             await current_bot.send_message(
                                 chat_id=channel['id'],
-                                text=clean_article_text,
+                                text=caption_text,
                                 parse_mode=None  # Не используем HTML парсинг
                             )
                         success_count += 1
@@ -2117,16 +2232,7 @@ def save_url():
             return jsonify({'success': False, 'error': 'Не удалось создать/найти пользователя'}), 500
         
         # Пытаемся извлечь заголовок из URL
-        title = None
-        try:
-            response = requests.get(article_url, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                title_tag = soup.find('title')
-                if title_tag:
-                    title = title_tag.get_text().strip()[:500]
-        except:
-            pass
+        title = extract_title_from_url(article_url)
         
         user_url = save_user_url(
             user_id=user.id,
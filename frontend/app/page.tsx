@@ -912,6 +912,10 @@ export default function Home() {
                       setSummarizeStatus('Подключение к серверу обработки...')
                       
                       // Проверяем доступность ML Service
+                      // /health отвечает 200 при любом статусе: ready - модель в памяти,
+                      // idle - модели ещё не загружались (загрузятся первым запросом),
+                      // loading - идёт загрузка, error - загрузка не удалась (запрос попробует снова)
+                      let healthStatus: string | undefined
                       try {
                         const healthCheck = await fetch(`${ML_SERVICE_URL}/health`, { 
                           method: 'GET',
@@ -920,6 +924,7 @@ export default function Home() {
                         if (!healthCheck.ok) {
                           throw new Error('ML Service недоступен')
                         }
+                        healthStatus = (await healthCheck.json())?.status
                       } catch (healthError) {
                         setSummarizeStatus('')
                         alert(`ML Service недоступен на ${ML_SERVICE_URL}. Проверьте, что сервис запущен: docker-compose up -d ml_service`)
@@ -928,7 +933,9 @@ export default function Home() {
                       
                       // Для NLP моделей показываем сообщение о загрузке модели
                       // Для LLM (Qwen, Yandex) это не нужно - они работают через промпты
-                      if (isNLPModel) {
+                      if (isNLPModel && healthStatus === 'error') {
+                        setSummarizeStatus('Повторная загрузка модели после ошибки (может занять 20-30 секунд)...')
+                      } else if (isNLPModel && healthStatus !== 'ready') {
                         setSummarizeStatus('Загрузка модели (первый раз может занять 20-30 секунд)...')
                       } else {
                         setSummarizeStatus('Обработка текста...')